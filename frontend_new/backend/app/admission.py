@@ -0,0 +1,202 @@
+# backend/app/admission.py
+"""
+Admission control for the CPU-heavy endpoints. Every accepted job holds a
+ticket with its estimated work (frames x measured seconds per frame for the
+tiers it will run) until it finishes. A new job is turned away when
+
+  - its client already has MAX_PER_CLIENT jobs running or queued  -> 429
+  - MAX_JOBS jobs are already admitted                            -> 503
+  - the work ahead of it would keep it waiting over MAX_WAIT_S    -> 503
+
+with a Retry-After of when the blocking work should have drained, so accepted
+jobs keep a predictable latency instead of the process piling up threads
+until it is OOM-killed. Accounting is per API process.
+"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import count
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import HTTPException, Request
+
+from app import workers
+from app.telemetry import ADMISSION_REJECTED, log
+
+ENABLED = os.getenv("ADMISSION_CONTROL", "1") == "1"
+# Longest an admitted job should wait behind work already accepted
+MAX_WAIT_S = float(os.getenv("ADMISSION_MAX_WAIT_S", "120"))
+MAX_JOBS = int(os.getenv("ADMISSION_MAX_JOBS", str(4 * workers.WORKER_PROCESSES)))
+MAX_PER_CLIENT = int(os.getenv("ADMISSION_MAX_PER_CLIENT", "2"))
+
+# A job past its estimate is assumed to need this fraction of it again
+OVERRUN_RATIO = 0.1
+MIN_RETRY_S = 1
+
+
+@dataclass
+class Ticket:
+    kind: str
+    client: str
+    estimated_s: float
+    admitted_at: float
+    started_at: Optional[float] = None
+    id: int = -1
+
+    def start(self) -> None:
+        """Mark the job as running (it may have queued behind others until now)."""
+        self.started_at = time.time()
+
+    def remaining(self, now: float) -> float:
+        if self.started_at is None:
+            return self.estimated_s
+        left = self.estimated_s - (now - self.started_at)
+        return left if left > 0 else OVERRUN_RATIO * self.estimated_s
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: float, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(int(math.ceil(retry_after)), MIN_RETRY_S)
+        self.detail = detail
+
+    def http(self) -> HTTPException:
+        return HTTPException(status_code=self.status_code, detail=self.detail,
+                             headers={"Retry-After": str(self.retry_after)})
+
+
+_lock = threading.Lock()
+_ids = count()
+_tickets: Dict[int, Ticket] = {}
+
+
+def backlog_s(now: Optional[float] = None) -> float:
+    """Wall seconds until the admitted work has drained, spread over the worker processes."""
+    now = time.time() if now is None else now
+    with _lock:
+        work = sum(t.remaining(now) for t in _tickets.values())
+    return work / max(workers.WORKER_PROCESSES, 1)
+
+
+def _check(kind: str, client: str, estimated_s: float, now: float) -> None:
+    tickets = list(_tickets.values())
+    mine = [t for t in tickets if t.client == client]
+    if len(mine) >= MAX_PER_CLIENT:
+        raise Rejected(429, "client_limit", min(t.remaining(now) for t in mine),
+                       f"At most {MAX_PER_CLIENT} jobs per client at a time; {len(mine)} still running")
+    if len(tickets) >= MAX_JOBS:
+        raise Rejected(503, "queue_full", min(t.remaining(now) for t in tickets),
+                       f"Server is at capacity ({len(tickets)} jobs admitted)")
+    backlog = sum(t.remaining(now) for t in tickets) / max(workers.WORKER_PROCESSES, 1)
+    # An idle server takes any job, however long
+    if tickets and backlog + estimated_s > MAX_WAIT_S:
+        raise Rejected(503, "backlog", min(backlog + estimated_s - MAX_WAIT_S, backlog),
+                       f"Server is busy: ~{backlog:.0f}s of work queued ahead of this "
+                       f"~{estimated_s:.0f}s job")
+
+
+def check(kind: str, client: str, estimated_s: float = 0.0) -> None:
+    """Raise Rejected if a job like this would be turned away now (without admitting it)."""
+    if not ENABLED:
+        return
+    with _lock:
+        try:
+            _check(kind, client, estimated_s, time.time())
+        except Rejected as e:
+            _rejected(kind, client, estimated_s, e)
+            raise
+
+
+def admit(kind: str, client: str, estimated_s: float, started: bool = False) -> Optional[Ticket]:
+    """Admit a job (or raise Rejected); release() the ticket when it finishes."""
+    if not ENABLED:
+        return None
+    now = time.time()
+    with _lock:
+        try:
+            _check(kind, client, estimated_s, now)
+        except Rejected as e:
+            _rejected(kind, client, estimated_s, e)
+            raise
+        ticket = Ticket(kind, client, estimated_s, admitted_at=now,
+                        started_at=now if started else None, id=next(_ids))
+        _tickets[ticket.id] = ticket
+    return ticket
+
+
+def release(ticket: Optional[Ticket]) -> None:
+    if ticket is None:
+        return
+    with _lock:
+        _tickets.pop(ticket.id, None)
+
+
+@contextmanager
+def admitted(kind: str, client: str, estimated_s: float) -> Iterator[Optional[Ticket]]:
+    """Admit a job that starts right away and release it when the block exits."""
+    ticket = admit(kind, client, estimated_s, started=True)
+    try:
+        yield ticket
+    finally:
+        release(ticket)
+
+
+def _rejected(kind: str, client: str, estimated_s: float, e: Rejected) -> None:
+    ADMISSION_REJECTED.labels(kind, e.reason).inc()
+    log("admission_rejected", kind=kind, client=client, reason=e.reason,
+        estimated_s=round(estimated_s, 1), retry_after=e.retry_after, admitted=len(_tickets))
+
+
+def status() -> Dict[str, Any]:
+    now = time.time()
+    with _lock:
+        tickets: List[Ticket] = list(_tickets.values())
+    return {"admitted": len(tickets), "running": sum(t.started_at is not None for t in tickets),
+            "backlog_s": round(backlog_s(now), 1), "max_jobs": MAX_JOBS, "max_wait_s": MAX_WAIT_S,
+            "max_per_client": MAX_PER_CLIENT}
+
+
+def client_id(request: Request) -> str:
+    """Who a request counts against: an explicit X-Client-Id, else the caller's address."""
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "unknown")
+
+
+# ---------------------------------------------------------------------------
+# Work estimates, from the same measured throughput the scheduler plans with
+# ---------------------------------------------------------------------------
+
+def estimate_upload_s(frame_count: int, tier: Optional[str] = None, overlay: bool = True,
+                      landmarks: bool = True) -> float:
+    """Landmark pass (unless the stored one is reused), plus the overlay pass when the video is rendered."""
+    from app.processing.policy import tier_fps
+    from app.processing.pose_estimator import tier_for_stage
+    frames = max(int(frame_count or 0), 1)
+    seconds = frames / tier_fps(tier_for_stage("landmarks", tier)) if landmarks else 0.0
+    if overlay:
+        seconds += frames / tier_fps(tier_for_stage("overlay", tier))
+    return seconds
+
+
+def estimate_analysis_s(probe: Dict[str, Any], tier: Optional[str] = None, offset: int = 0) -> float:
+    """Cascade: the cheap scan over the clip plus the configured tier over the swing window."""
+    from app.processing.cascade import SCAN_TIER, window_frames
+    from app.processing.policy import tier_fps
+    from app.processing.pose_estimator import tier_for_stage
+    frames = max(int(probe.get("frame_count") or 0), 1)
+    return (frames / tier_fps(SCAN_TIER)
+            + window_frames(probe.get("fps") or 25, offset) / tier_fps(tier_for_stage("analysis", tier)))
+
+
+def estimate_session_s(probe: Dict[str, Any], tier: Optional[str] = None) -> float:
+    """Scans over the whole recording plus one refine window per possible delivery."""
+    from app.processing.segmentation import MIN_GAP_S
+    fps = probe.get("fps") or 25
+    frames = max(int(probe.get("frame_count") or 0), 1)
+    deliveries = max(int(frames / (MIN_GAP_S * fps)), 1)
+    window_only = estimate_analysis_s({"frame_count": 0, "fps": fps}, tier)
+    return estimate_analysis_s(probe, tier) + (deliveries - 1) * window_only
@@ -0,0 +1,21 @@
+# Analysis module for cricket shot analysis
+from importlib import import_module
+from typing import Dict, Tuple, Type
+
+# Shot labels as sent by the frontend's shot selector -> (module, class). Analyzers
+# pull in cv2 and mediapipe, so they are imported only when a shot is analysed.
+ANALYZER_CLASSES: Dict[str, Tuple[str, str]] = {
+    "cover_drive": ("app.analysis.cover_drive_analyzer", "CoverDriveAnalyzer"),
+    "cut_shot": ("app.analysis.cut_shot_analyzer", "CutShotAnalyzer"),
+    "pull_shot": ("app.analysis.pull_shot_analyzer", "PullShotAnalyzer"),
+    "straight_drive": ("app.analysis.straight_drive_analyzer", "StraightDriveAnalyzer"),
+}
+SHOTS = tuple(ANALYZER_CLASSES)
+DEFAULT_SHOT = "cover_drive"
+
+
+def get_analyzer_class(shot: str) -> Type:
+    if shot not in ANALYZER_CLASSES:
+        raise ValueError(f"Unsupported shot '{shot}', expected one of {sorted(SHOTS)}")
+    module, name = ANALYZER_CLASSES[shot]
+    return getattr(import_module(module), name)
@@ -0,0 +1,78 @@
+# backend/app/analysis/scoring.py
+"""
+Scoring of metrics against threshold ranges: 10 inside the ideal range, 7
+inside the acceptable range, 4 outside both. feedback() builds the entries one
+analysis returns; score_matrix() scores any number of stored analyses in one
+array operation, which is what re-scoring against a new profile runs on.
+"""
+from typing import Any, Dict, List, Mapping, Sequence
+
+import numpy as np
+
+IDEAL_SCORE, ACCEPTABLE_SCORE, POOR_SCORE = 10, 7, 4
+
+Ranges = Mapping[str, Sequence[float]]
+
+
+def feedback(metrics: Mapping[str, float], ideal: Ranges, acceptable: Ranges) -> List[Dict[str, Any]]:
+    """One feedback entry per metric, in metric order."""
+    entries = []
+    for metric_name, value in metrics.items():
+        ideal_min, ideal_max = ideal[metric_name]
+        acceptable_min, acceptable_max = acceptable[metric_name]
+        label = metric_name.replace('_', ' ')
+
+        if ideal_min <= value <= ideal_max:
+            entries.append({
+                'category': label.title(),
+                'score': IDEAL_SCORE,
+                'message': f"Excellent {label} at {value:.1f}°",
+                'severity': 'good'
+            })
+        elif acceptable_min <= value <= acceptable_max:
+            entries.append({
+                'category': label.title(),
+                'score': ACCEPTABLE_SCORE,
+                'message': f"Good {label} at {value:.1f}°, room for improvement",
+                'severity': 'warning'
+            })
+        else:
+            if value < acceptable_min:
+                message = f"{label} too low at {value:.1f}°"
+            else:
+                message = f"{label} too high at {value:.1f}°"
+            entries.append({
+                'category': label.title(),
+                'score': POOR_SCORE,
+                'message': message,
+                'severity': 'error'
+            })
+    return entries
+
+
+def bounds(names: Sequence[str], ranges: Ranges) -> np.ndarray:
+    """(len(names), 2) float64 [low, high] per metric."""
+    return np.array([ranges[name] for name in names], dtype=np.float64).reshape(len(names), 2)
+
+
+def score_matrix(values: np.ndarray, ideal: np.ndarray, acceptable: np.ndarray) -> np.ndarray:
+    """
+    Scores for an (analyses, metrics) array of values against (metrics, 2) ideal
+    and acceptable bounds. Missing values (NaN) score NaN.
+    """
+    in_ideal = (values >= ideal[:, 0]) & (values <= ideal[:, 1])
+    in_acceptable = (values >= acceptable[:, 0]) & (values <= acceptable[:, 1])
+    scores = np.where(in_ideal, IDEAL_SCORE, np.where(in_acceptable, ACCEPTABLE_SCORE, POOR_SCORE))
+    return np.where(np.isnan(values), np.nan, scores.astype(np.float64))
+
+
+def overall(scores: np.ndarray) -> np.ndarray:
+    """Mean score per analysis over the metrics it has, NaN where it has none."""
+    counts = (~np.isnan(scores)).sum(axis=1)
+    totals = np.nansum(scores, axis=1)
+    return np.divide(totals, counts, out=np.full(len(scores), np.nan), where=counts > 0)
+
+
+def ranges_as_lists(ranges: Ranges) -> Dict[str, List[float]]:
+    """JSON-friendly copy with float bounds."""
+    return {name: [float(low), float(high)] for name, (low, high) in ranges.items()}
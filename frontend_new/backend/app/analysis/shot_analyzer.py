@@ -0,0 +1,257 @@
+
+import cv2
+import numpy as np
+import json
+import logging
+import math
+from typing import Dict, List, Tuple, Any, Optional
+from pathlib import Path
+
+from app.analysis import scoring
+from app.processing.embedding import phase_poses
+from app.processing.pose import JOINT_NAMES, LEFT_ELBOW, X, Y, Pose, PoseSequence
+from app.processing.pose_estimator import PoseEstimator
+from app.processing.cascade import WRIST, CascadeResult, peak_speed_frame, run_cascade
+from app.processing.phases import (SwingPhases, detect_phases, evaluate_follow_through, metric_series,
+                                   phase_metrics)
+from app.processing.policy import PoseConfig, default_config
+from app.telemetry import ANALYSIS_FAILURES, log, timed_step
+
+
+class ShotAnalyzer:
+    """
+    Shared keyframe detection, metric calculation, feedback and annotation for
+    all shot analyzers. Subclasses set shot_type and the ideal/acceptable ranges.
+    """
+
+    shot_type = "shot"
+    ideal_ranges: Dict[str, Tuple[float, float]] = {}
+    acceptable_ranges: Dict[str, Tuple[float, float]] = {}
+    # Extra frames the refine window must cover past the peak wrist speed
+    keyframe_offset = 0
+
+    def __init__(self, estimator: Optional[PoseEstimator] = None, config: Optional[PoseConfig] = None,
+                 scan_estimator: Optional[PoseEstimator] = None):
+        self.config = config or default_config("analysis")
+        # Estimators can be shared (e.g. warm per-worker instances); only close what we own
+        self._owns_pose = estimator is None
+        self.pose = estimator or self.config.create_estimator()
+        self._owns_scan = scan_estimator is None
+        self.scan_pose = scan_estimator or self.config.scan_config().create_estimator()
+        self.cascade: Optional[CascadeResult] = None
+        self.phases: Optional[SwingPhases] = None
+        # The poses the phases were detected on
+        self.track: Optional[PoseSequence] = None
+        self.frame_size: Tuple[int, int] = (0, 0)
+
+    def calculate_angle(self, point1: np.ndarray, point2: np.ndarray, point3: np.ndarray) -> float:
+        """Calculate angle between three points in degrees."""
+        vector1 = point1 - point2
+        vector2 = point3 - point2
+        
+        # Calculate angle using dot product
+        cos_angle = np.dot(vector1, vector2) / (np.linalg.norm(vector1) * np.linalg.norm(vector2))
+        cos_angle = np.clip(cos_angle, -1.0, 1.0)
+        angle = np.degrees(np.arccos(cos_angle))
+        
+        return angle
+
+    def detect_keyframe(self, video_path: str,
+                        frame_range: Optional[Tuple[int, int]] = None) -> Tuple[int, np.ndarray]:
+        """
+        Find the swing with a cheap full-clip scan, re-run the configured tier on that
+        window only, split the swing into phases and take the impact frame as keyframe.
+        frame_range limits the search to one delivery of a longer session.
+        """
+        self.cascade = run_cascade(video_path, self.scan_pose, self.pose,
+                                   stride=self.config.stride, min_after=self.keyframe_offset,
+                                   frame_range=frame_range)
+        cascade = self.cascade
+        first, last = frame_range or (0, max(cascade.total_frames - 1, 0))
+
+        cap = cv2.VideoCapture(video_path)
+        self.frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        with timed_step("analysis", "phases"):
+            self.phases = self.detect_phases()
+
+        if self.phases is not None:
+            keyframe_idx = self.phases.events["impact"]
+        else:
+            refined_track = [(idx, pose[WRIST][X], pose[WRIST][Y]) for idx, pose in sorted(cascade.landmarks.items())]
+            peak = peak_speed_frame(refined_track)
+            if peak is None:
+                peak = cascade.peak_frame
+            keyframe_idx = (first + last + 1) // 2 if peak is None else peak
+
+        # The refine pass keeps the frames around impact; seek only when it fell elsewhere
+        keyframe = cascade.frames.get(keyframe_idx)
+        if keyframe is None:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe_idx)
+            ret, keyframe = cap.read()
+        cap.release()
+        
+        return keyframe_idx, keyframe
+
+    def detect_phases(self) -> Optional[SwingPhases]:
+        """Swing phases over the scan's landmarks, with the refined ones where the window has them."""
+        poses = {**self.cascade.scan_poses, **self.cascade.landmarks}
+        self.track = PoseSequence.from_poses(poses)
+        width, height = self.frame_size
+        if not len(self.track) or not height:
+            return None
+        return detect_phases(self.track, self.cascade.fps, width / height)
+
+    def phase_analysis(self) -> Dict[str, Any]:
+        """Phases, metrics at each phase's key frame and the follow-through evaluation."""
+        if self.phases is None:
+            return {"phases": None, "phase_metrics": None, "phase_poses": None,
+                    "follow_through": evaluate_follow_through(None, None, {})}
+        series = metric_series(self.track.data, *self.frame_size)
+        width, height = self.frame_size
+        return {
+            "phases": self.phases.as_dict(),
+            "phase_metrics": phase_metrics(self.phases, self.track.frames, series),
+            # Body pose at each key frame, for the swing embedding (app.processing.embedding)
+            "phase_poses": phase_poses(self.track, self.phases, width / height),
+            "follow_through": evaluate_follow_through(self.phases, self.track, series),
+        }
+
+    def keyframe_landmarks(self, keyframe_idx: int, keyframe: np.ndarray) -> Optional[Pose]:
+        """Pose from the warmed-up refine pass, or a fresh detection outside the window."""
+        pose = self.cascade.landmarks.get(keyframe_idx) if self.cascade else None
+        if pose is None:
+            return self.extract_landmarks(keyframe)
+        return pose
+
+    def extract_landmarks(self, frame: np.ndarray) -> Optional[Pose]:
+        """Extract the pose from a frame."""
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return self.pose.process(rgb)
+
+    def calculate_metrics(self, landmarks: Pose, frame_shape: Tuple[int, int]) -> Dict[str, float]:
+        """Calculate all biomechanical metrics for the shot."""
+        height, width = frame_shape
+        
+        try:
+            # Same formulas as the per-phase series, on a single frame
+            series = metric_series(landmarks.data[None], width, height)
+            metrics = {name: float(values[0]) for name, values in series.items()}
+        except Exception as e:
+            ANALYSIS_FAILURES.labels(step="metrics").inc()
+            log("analysis_metrics_failed", level=logging.WARNING, shot=self.shot_type, error=str(e))
+            # Return default values if calculation fails
+            metrics = {key: 0.0 for key in self.ideal_ranges.keys()}
+        
+        return metrics
+
+    def generate_feedback(self, metrics: Dict[str, float]) -> List[Dict[str, Any]]:
+        """Generate feedback based on calculated metrics."""
+        return scoring.feedback(metrics, self.ideal_ranges, self.acceptable_ranges)
+
+    def draw_annotated_keyframe(self, frame: np.ndarray, landmarks: Pose,
+                              metrics: Dict[str, float], output_path: str) -> str:
+        """Draw annotated keyframe with landmarks and angles."""
+        annotated_frame = frame.copy()
+        height, width = frame.shape[:2]
+        
+        # Draw pose landmarks
+        for name, (x, y) in zip(JOINT_NAMES, landmarks.xy(width, height).astype(int).tolist()):
+            cv2.circle(annotated_frame, (x, y), 5, (0, 255, 0), -1)
+            cv2.putText(annotated_frame, name.split('_')[0], (x+5, y-5), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.3, (0, 255, 0), 1)
+        
+        # Draw key angles
+        try:
+            # Front elbow angle
+            left_elbow = landmarks.point(LEFT_ELBOW, width, height)
+            
+            # Draw angle arc
+            cv2.ellipse(annotated_frame, left_elbow, (20, 20), 0, 0, 
+                       int(metrics['front_elbow_angle']), (255, 0, 0), 2)
+            cv2.putText(annotated_frame, f"Elbow: {metrics['front_elbow_angle']:.1f}°", 
+                       (left_elbow[0]+10, left_elbow[1]-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+            
+        except Exception as e:
+            ANALYSIS_FAILURES.labels(step="draw").inc()
+            log("analysis_draw_failed", level=logging.WARNING, shot=self.shot_type, error=str(e))
+        
+        # Save annotated frame
+        cv2.imwrite(output_path, annotated_frame)
+        return output_path
+
+    def analyze(self, video_path: str, output_dir: str,
+                frame_range: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """
+        Main analysis function.
+        Returns comprehensive analysis results.
+        """
+        try:
+            # Detect keyframe
+            keyframe_idx, keyframe = self.detect_keyframe(video_path, frame_range)
+            
+            # Extract landmarks from keyframe
+            landmarks = self.keyframe_landmarks(keyframe_idx, keyframe)
+            if not landmarks:
+                raise RuntimeError("Could not detect pose in keyframe")
+            
+            # Calculate metrics
+            with timed_step("analysis", "metrics"):
+                metrics = self.calculate_metrics(landmarks, keyframe.shape[:2])
+            
+            # Generate feedback
+            feedback = self.generate_feedback(metrics)
+
+            # Metrics through the rest of the swing, from landmarks already inferred
+            with timed_step("analysis", "phases"):
+                phases = self.phase_analysis()
+            
+            # Create output directory
+            output_path = Path(output_dir)
+            output_path.mkdir(parents=True, exist_ok=True)
+            
+            # Save annotated keyframe
+            video_name = Path(video_path).stem
+            if frame_range:
+                # One keyframe per delivery of a session
+                video_name = f"{video_name}_{frame_range[0]}-{frame_range[1]}"
+            keyframe_path = output_path / f"{video_name}_keyframe.jpg"
+            with timed_step("analysis", "draw"):
+                self.draw_annotated_keyframe(keyframe, landmarks, metrics, str(keyframe_path))
+            
+            # Prepare results
+            results = {
+                'shot_type': self.shot_type,
+                'keyframe_index': keyframe_idx,
+                'metrics': metrics,
+                'feedback': feedback,
+                'keyframe_path': str(keyframe_path),
+                'analysis_timestamp': str(Path(video_path).stat().st_mtime),
+                'pose_model': {**self.pose.config(), **self.pose.stats()},
+                'pose_config': self.config.as_dict(),
+                'cascade': self.cascade.summary(),
+                **phases,
+            }
+            
+            return results
+            
+        except Exception as e:
+            ANALYSIS_FAILURES.labels(step="analysis").inc()
+            log("analysis_failed", level=logging.WARNING, shot=self.shot_type, video=video_path, error=str(e))
+            return {
+                'error': str(e),
+                'shot_type': self.shot_type,
+                'metrics': {},
+                'feedback': [],
+                'keyframe_path': None,
+                'pose_model': {**self.pose.config(), **self.pose.stats()},
+                'pose_config': self.config.as_dict(),
+                'cascade': self.cascade.summary() if self.cascade else None,
+            }
+        finally:
+            for pose, owned in ((self.pose, self._owns_pose), (self.scan_pose, self._owns_scan)):
+                if owned:
+                    pose.close()
+                else:
+                    # Keep the loaded model warm but drop tracking state from this clip
+                    pose.reset()
+
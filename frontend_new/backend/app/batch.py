@@ -0,0 +1,183 @@
+# backend/app/batch.py
+"""
+Academy batch analysis: many clips submitted at once are fanned out over the
+shared worker pool, tracked as one batch and collected into a single bundle.
+"""
+import csv
+import io
+import json
+import os
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+
+from app.analysis.registry import get_analyzer_class
+from app.db import SessionLocal
+from app.jobs import get_job, jobs_in_batch, mark_finished, status_counts, update_job
+from app.models.batch import Batch
+from app.models.history import AnalysisRecord
+from app.models.job import utcnow
+from app.pipeline import save_analysis
+from app.processing.policy import plan_cascade
+from app.processing.pose_estimator import record_throughput
+from app.admission import estimate_analysis_s
+from app.telemetry import job_finished, log
+from app.storage import result_dir
+from app import workers
+
+# Threads that save finished clips and write the bundle. Pool results arrive on the
+# executor's one result thread, which must not be held up by them: until it is free,
+# no other worker's result is delivered and no queued task is dispatched
+POST_THREADS = int(os.getenv("BATCH_POST_THREADS", "2"))
+
+_finalize_lock = threading.Lock()
+_post = ThreadPoolExecutor(max_workers=POST_THREADS, thread_name_prefix="batch-post")
+
+
+def create_batch(batch_id: str, academy_id: Optional[str], total: int) -> Batch:
+    batch = Batch(id=batch_id, academy_id=academy_id, status="running", total=total)
+    with SessionLocal() as session:
+        session.add(batch)
+        session.commit()
+    return batch
+
+
+def get_batch(batch_id: str) -> Optional[Batch]:
+    with SessionLocal() as session:
+        return session.get(Batch, batch_id)
+
+
+def schedule_clip(batch_id: str, job_id: str, shot: str, tier: Optional[str] = None,
+                  queue_depth: Optional[int] = None, request_class: str = "batch") -> Future:
+    """
+    Plan the clip's pose configuration and queue it. Pass the queue depth seen before the
+    batch was submitted so the batch's own clips do not degrade each other. request_class
+    is batch or backfill (re-analysis nobody is waiting on); the clip is fair-shared
+    with other academies' clips of the same class.
+    """
+    from app.processing.mediapipe_utils import probe_video
+    job = get_job(job_id)
+    try:
+        probe = probe_video(job.upload_path)
+        update_job(job_id, probe=probe)
+    except RuntimeError:
+        # Unreadable clips still go through the worker, which records the failure
+        probe = {"frame_count": 0}
+    offset = get_analyzer_class(shot).keyframe_offset
+    config = plan_cascade("batch", request_class, probe, offset, tier, queue_depth=queue_depth)
+    future = workers.submit(workers.analyze_clip, job.upload_path,
+                            str(result_dir(job_id)), shot, job_id, config,
+                            request_class=request_class, tenant=job.academy_id,
+                            cost=estimate_analysis_s(probe, config.tier, offset))
+    future.add_done_callback(lambda f: _post.submit(_clip_done, batch_id, job_id, shot, f))
+    return future
+
+
+def _clip_done(batch_id: str, job_id: str, shot: str, future: Future) -> None:
+    # Runs on a _post thread in the API process
+    error = None
+    try:
+        result = future.result()
+        record_throughput(result.get("pose_model"))
+        save_analysis(get_job(job_id), shot, result)
+        error = result.get("error")
+    except Exception as e:
+        error = str(e)
+    mark_finished(job_id, error=error)
+    job = get_job(job_id)
+    job_finished("batch", (job.finished_at - job.created_at).total_seconds(), error=error,
+                 job_id=job_id, batch_id=batch_id, shot=shot)
+
+    counts = status_counts(batch_id)
+    if counts.get("queued", 0) or counts.get("processing", 0):
+        return
+    with _finalize_lock:
+        batch = get_batch(batch_id)
+        if batch is not None and batch.status == "running":
+            finalize_batch(batch_id)
+
+
+def running_batches() -> int:
+    with SessionLocal() as session:
+        return session.scalar(select(func.count()).select_from(Batch).where(Batch.status == "running"))
+
+
+def batch_progress(batch_id: str) -> Dict[str, Any]:
+    batch = get_batch(batch_id)
+    counts = status_counts(batch_id)
+    done = counts.get("completed", 0) + counts.get("failed", 0)
+    return {
+        "batch_id": batch_id,
+        "status": batch.status,
+        "total": batch.total,
+        "completed": counts.get("completed", 0),
+        "failed": counts.get("failed", 0),
+        "processing": counts.get("processing", 0),
+        "queued": counts.get("queued", 0),
+        "progress": round(done / batch.total, 3) if batch.total else 1.0,
+        "bundle_ready": batch.bundle_path is not None,
+    }
+
+
+def batch_summary(batch_id: str) -> List[Dict[str, Any]]:
+    """One row per clip: identity, status, overall score and every metric."""
+    jobs = jobs_in_batch(batch_id)
+    with SessionLocal() as session:
+        records = {r.job_id: r for r in session.scalars(
+            select(AnalysisRecord).where(AnalysisRecord.job_id.in_([j.id for j in jobs])))}
+    rows = []
+    for job in jobs:
+        record = records.get(job.id)
+        row = {
+            "job_id": job.id,
+            "clip": job.filename,
+            "shot": job.shot,
+            "player_id": job.player_id,
+            "status": job.status,
+            "error": job.error,
+            "overall_score": round(record.overall_score, 2) if record and record.overall_score is not None else None,
+        }
+        if record:
+            row.update({k: round(v, 2) for k, v in record.metrics.items()})
+        rows.append(row)
+    return rows
+
+
+def summary_csv(rows: List[Dict[str, Any]]) -> str:
+    columns: List[str] = []
+    for row in rows:
+        columns.extend(k for k in row if k not in columns)
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=columns)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+def finalize_batch(batch_id: str) -> str:
+    """Write the consolidated bundle: summary table plus every clip's analysis and keyframe."""
+    rows = batch_summary(batch_id)
+    bundle_path = result_dir(batch_id) / f"{batch_id}_bundle.zip"
+    with zipfile.ZipFile(bundle_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("summary.csv", summary_csv(rows))
+        zf.writestr("summary.json", json.dumps(rows, indent=2))
+        for job in jobs_in_batch(batch_id):
+            folder = f"clips/{Path(job.filename).stem}_{job.id[:8]}"
+            for kind, name in (("analysis", "analysis.json"), ("keyframe", "keyframe.jpg")):
+                path = (job.artifacts or {}).get(kind)
+                if path and Path(path).exists():
+                    zf.write(path, f"{folder}/{name}")
+
+    failed = sum(1 for r in rows if r["status"] == "failed")
+    with SessionLocal() as session:
+        batch = session.get(Batch, batch_id)
+        batch.bundle_path = str(bundle_path)
+        batch.status = "completed" if failed < len(rows) else "failed"
+        batch.finished_at = utcnow()
+        session.commit()
+    log("batch_finished", batch_id=batch_id, clips=len(rows), failed=failed, status=batch.status)
+    return str(bundle_path)
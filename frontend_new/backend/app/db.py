@@ -0,0 +1,23 @@
+# backend/app/db.py
+import os
+from sqlalchemy import create_engine
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
+
+from app.storage import BASE
+
+# SQLite for local use; set DATABASE_URL=postgresql+psycopg2://... in production
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{BASE / 'athleterise.db'}")
+
+_connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+engine = create_engine(DATABASE_URL, connect_args=_connect_args, pool_pre_ping=True)
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+def init_db() -> None:
+    """Create any missing tables. Safe to call from every process at startup."""
+    import app.models  # noqa: F401  (registers the mapped classes)
+    Base.metadata.create_all(engine)
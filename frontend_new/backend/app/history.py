@@ -0,0 +1,252 @@
+# backend/app/history.py
+"""
+Incremental per-player performance history. Each completed analysis folds its
+metrics into all-time and weekly rollups (Welford mean/variance, extrema, and
+an online least-squares trend), so history and trend reads never touch the
+individual analysis files.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+
+from app.db import SessionLocal
+from app.models.history import AnalysisRecord, MetricRollup, MetricBucket, stats_dict
+from app.models.job import utcnow
+
+OVERALL = "overall_score"
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _as_utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _days(ts: datetime) -> float:
+    return (_as_utc(ts) - EPOCH).total_seconds() / 86400.0
+
+
+def week_start(ts: datetime) -> date:
+    d = _as_utc(ts).date()
+    return d - timedelta(days=d.weekday())
+
+
+def _init_stats(row) -> None:
+    row.count, row.mean, row.m2 = 0, 0.0, 0.0
+    row.min_value = row.max_value = None
+
+
+def _add(row, value: float) -> None:
+    row.count += 1
+    delta = value - row.mean
+    row.mean += delta / row.count
+    row.m2 += delta * (value - row.mean)
+    row.min_value = value if row.min_value is None else min(row.min_value, value)
+    row.max_value = value if row.max_value is None else max(row.max_value, value)
+
+
+def _remove(row, value: float) -> None:
+    """Exact inverse of _add for mean/m2. Extrema cannot be un-seen and are kept."""
+    if row.count <= 1:
+        row.count, row.mean, row.m2 = 0, 0.0, 0.0
+        return
+    old_mean = (row.count * row.mean - value) / (row.count - 1)
+    row.m2 = max(0.0, row.m2 - (value - old_mean) * (value - row.mean))
+    row.mean = old_mean
+    row.count -= 1
+
+
+def _add_trend(row: MetricRollup, x: float, y: float) -> None:
+    # Called after _add, so row.count and row.mean already include this sample
+    dx = x - row.mean_x
+    row.mean_x += dx / row.count
+    row.m2_x += dx * (x - row.mean_x)
+    row.c_xy += dx * (y - row.mean)
+
+
+def _remove_trend(row: MetricRollup, x: float, y: float) -> None:
+    # Called before _remove, so row.count and row.mean still include this sample
+    if row.count <= 1:
+        row.mean_x, row.m2_x, row.c_xy = 0.0, 0.0, 0.0
+        return
+    old_mean_x = (row.count * row.mean_x - x) / (row.count - 1)
+    row.c_xy -= (x - old_mean_x) * (y - row.mean)
+    row.m2_x = max(0.0, row.m2_x - (x - old_mean_x) * (x - row.mean_x))
+    row.mean_x = old_mean_x
+
+
+def _rows(session, model, player_id: str, shot: str, metrics: List[str], **extra) -> Dict[str, Any]:
+    query = select(model).where(model.player_id == player_id, model.shot == shot,
+                                model.metric.in_(metrics))
+    for column, value in extra.items():
+        query = query.where(getattr(model, column) == value)
+    rows = {row.metric: row for row in session.scalars(query.with_for_update())}
+    for metric in metrics:
+        if metric not in rows:
+            row = model(player_id=player_id, shot=shot, metric=metric, **extra)
+            _init_stats(row)
+            if model is MetricRollup:
+                row.mean_x, row.m2_x, row.c_xy = 0.0, 0.0, 0.0
+            session.add(row)
+            rows[metric] = row
+    return rows
+
+
+def _fold(session, player_id: str, shot: str, values: Dict[str, float],
+          when: datetime, sign: int) -> None:
+    names = list(values)
+    rollups = _rows(session, MetricRollup, player_id, shot, names)
+    buckets = _rows(session, MetricBucket, player_id, shot, names, bucket_start=week_start(when))
+    x = _days(when)
+    for metric, value in values.items():
+        rollup, bucket = rollups[metric], buckets[metric]
+        if sign > 0:
+            _add(rollup, value)
+            _add_trend(rollup, x, value)
+            _add(bucket, value)
+            if rollup.last_at is None or _as_utc(rollup.last_at) <= _as_utc(when):
+                rollup.last_value, rollup.last_at = value, when
+        else:
+            _remove_trend(rollup, x, value)
+            _remove(rollup, value)
+            _remove(bucket, value)
+
+
+def _values(metrics: Dict[str, float], overall: Optional[float]) -> Dict[str, float]:
+    values = dict(metrics)
+    if overall is not None:
+        values[OVERALL] = overall
+    return values
+
+
+def record_analysis(job_id: str, player_id: Optional[str], shot: str,
+                    metrics: Dict[str, float], feedback: List[Dict[str, Any]],
+                    when: Optional[datetime] = None, profile: Optional[str] = None,
+                    profile_version: Optional[int] = None) -> AnalysisRecord:
+    """
+    Store one analysis and fold it into the player's rollups. Re-recording a job
+    (e.g. re-analysis, or a retry served from the memo) first subtracts its
+    previous contribution and keeps its original time unless `when` is given, so
+    the session stays in its week. `profile` and `profile_version` name the
+    thresholds the feedback was scored against.
+    """
+    metrics = {k: float(v) for k, v in metrics.items()}
+    # generate_feedback emits one entry per metric, in metric order
+    scores = {name: float(fb["score"]) for name, fb in zip(metrics, feedback)}
+    overall = sum(scores.values()) / len(scores) if scores else None
+
+    with SessionLocal() as session:
+        previous = session.get(AnalysisRecord, job_id)
+        if previous is not None:
+            if previous.player_id:
+                _fold(session, previous.player_id, previous.shot,
+                      _values(previous.metrics, previous.overall_score), previous.recorded_at, -1)
+            session.delete(previous)
+            session.flush()
+            when = when or previous.recorded_at
+        when = when or utcnow()
+
+        record = AnalysisRecord(job_id=job_id, player_id=player_id, shot=shot, metrics=metrics,
+                                scores=scores, overall_score=overall, profile=profile,
+                                profile_version=profile_version, recorded_at=when)
+        session.add(record)
+        if player_id:
+            _fold(session, player_id, shot, _values(metrics, overall), when, +1)
+        session.commit()
+        return record
+
+
+def _stats(values: np.ndarray) -> Dict[str, Any]:
+    mean = float(values.mean())
+    return {"count": len(values), "mean": mean, "m2": float(((values - mean) ** 2).sum()),
+            "min_value": float(values.min()), "max_value": float(values.max())}
+
+
+def rebuild_overall(session, shot: str, player_ids: Iterable[str]) -> int:
+    """
+    Recompute the overall_score rollups and weekly buckets of these players for
+    one shot from their analysis records, replacing the incremental rows. Used
+    after a bulk re-score, where folding every record out and back in would cost
+    a locked read-modify-write per record. Returns the number of rollups written.
+    The caller commits.
+    """
+    player_ids = list(player_ids)
+    if not player_ids:
+        return 0
+    for model in (MetricRollup, MetricBucket):
+        session.execute(delete(model).where(model.shot == shot, model.metric == OVERALL,
+                                            model.player_id.in_(player_ids)))
+    rows = session.execute(
+        select(AnalysisRecord.player_id, AnalysisRecord.overall_score, AnalysisRecord.recorded_at)
+        .where(AnalysisRecord.shot == shot, AnalysisRecord.player_id.in_(player_ids),
+               AnalysisRecord.overall_score.is_not(None))
+        .order_by(AnalysisRecord.player_id, AnalysisRecord.recorded_at)).all()
+
+    by_player: Dict[str, List[Any]] = {}
+    for player_id, score, when in rows:
+        by_player.setdefault(player_id, []).append((score, when))
+
+    rollups, buckets = [], []
+    for player_id, samples in by_player.items():
+        y = np.array([score for score, _ in samples])
+        x = np.array([_days(when) for _, when in samples])
+        stats = _stats(y)
+        mean_x = float(x.mean())
+        # Ordered by recorded_at, so the last sample is the latest
+        rollups.append({"player_id": player_id, "shot": shot, "metric": OVERALL, **stats,
+                        "last_value": float(y[-1]), "last_at": samples[-1][1], "mean_x": mean_x,
+                        "m2_x": float(((x - mean_x) ** 2).sum()),
+                        "c_xy": float(((x - mean_x) * (y - stats["mean"])).sum())})
+        weeks = np.array([week_start(when).toordinal() for _, when in samples])
+        for week in np.unique(weeks):
+            buckets.append({"player_id": player_id, "shot": shot, "metric": OVERALL,
+                            "bucket_start": date.fromordinal(int(week)), **_stats(y[weeks == week])})
+    if rollups:
+        session.execute(insert(MetricRollup), rollups)
+        session.execute(insert(MetricBucket), buckets)
+    return len(rollups)
+
+
+def player_history(player_id: str, shot: Optional[str] = None, recent: int = 10) -> Dict[str, Any]:
+    """All-time rollups per shot and metric, plus the most recent sessions."""
+    with SessionLocal() as session:
+        query = select(MetricRollup).where(MetricRollup.player_id == player_id)
+        if shot:
+            query = query.where(MetricRollup.shot == shot)
+        shots: Dict[str, Dict[str, Any]] = {}
+        for row in session.scalars(query):
+            entry = stats_dict(row)
+            entry["last"] = row.last_value
+            entry["last_at"] = row.last_at.isoformat() if row.last_at else None
+            entry["trend_per_day"] = row.c_xy / row.m2_x if row.m2_x > 0 else None
+            shots.setdefault(row.shot, {})[row.metric] = entry
+
+        query = select(AnalysisRecord).where(AnalysisRecord.player_id == player_id)
+        if shot:
+            query = query.where(AnalysisRecord.shot == shot)
+        query = query.order_by(AnalysisRecord.recorded_at.desc()).limit(recent)
+        sessions = [{
+            "job_id": r.job_id,
+            "shot": r.shot,
+            "overall_score": r.overall_score,
+            "profile": {"name": r.profile, "version": r.profile_version} if r.profile else None,
+            "recorded_at": r.recorded_at.isoformat(),
+        } for r in session.scalars(query)]
+
+    return {"player_id": player_id, "shots": shots, "recent_sessions": sessions}
+
+
+def player_trend(player_id: str, shot: str, metric: str = OVERALL,
+                 since: Optional[date] = None) -> Dict[str, Any]:
+    """Weekly buckets of one metric, oldest first."""
+    with SessionLocal() as session:
+        query = select(MetricBucket).where(MetricBucket.player_id == player_id,
+                                           MetricBucket.shot == shot,
+                                           MetricBucket.metric == metric)
+        if since:
+            query = query.where(MetricBucket.bucket_start >= since)
+        buckets = [{"week_start": row.bucket_start.isoformat(), **stats_dict(row)}
+                   for row in session.scalars(query.order_by(MetricBucket.bucket_start))
+                   if row.count > 0]
+    return {"player_id": player_id, "shot": shot, "metric": metric, "buckets": buckets}
@@ -0,0 +1,126 @@
+# backend/app/jobs.py
+"""
+Job metadata store. Every lookup that used to glob the upload directory or
+probe candidate filenames is an indexed query on the jobs table instead.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, func, select
+
+from app.db import SessionLocal
+from app.models.job import Job, utcnow
+
+
+def create_job(job_id: str, filename: str, upload_path: str, content_hash: Optional[str] = None,
+               size_bytes: Optional[int] = None, academy_id: Optional[str] = None,
+               player_id: Optional[str] = None, shot: Optional[str] = None,
+               batch_id: Optional[str] = None) -> Job:
+    job = Job(
+        id=job_id,
+        filename=filename,
+        upload_path=upload_path,
+        content_hash=content_hash,
+        size_bytes=size_bytes,
+        academy_id=academy_id,
+        player_id=player_id,
+        batch_id=batch_id,
+        shot=shot,
+        status="queued",
+        probe={},
+        artifacts={},
+        timings={},
+    )
+    with SessionLocal() as session:
+        session.add(job)
+        session.commit()
+    return job
+
+
+def get_job(job_id: str) -> Optional[Job]:
+    with SessionLocal() as session:
+        return session.get(Job, job_id)
+
+
+def delete_jobs(job_ids: Iterable[str]) -> None:
+    """Drop job rows that never started (e.g. a batch whose request failed part-way)."""
+    ids = list(job_ids)
+    with SessionLocal() as session:
+        for i in range(0, len(ids), 500):
+            session.execute(delete(Job).where(Job.id.in_(ids[i:i + 500])))
+        session.commit()
+
+
+def update_job(job_id: str, **fields: Any) -> Optional[Job]:
+    with SessionLocal() as session:
+        job = session.get(Job, job_id)
+        if job is None:
+            return None
+        for key, value in fields.items():
+            setattr(job, key, value)
+        session.commit()
+        return job
+
+
+def set_artifact(job_id: str, kind: str, path: Optional[str]) -> None:
+    """Record (or with path=None, forget) where an artifact of a job lives."""
+    with SessionLocal() as session:
+        job = session.get(Job, job_id)
+        if job is None:
+            return
+        artifacts = dict(job.artifacts or {})
+        if path is None:
+            artifacts.pop(kind, None)
+        else:
+            artifacts[kind] = path
+        job.artifacts = artifacts
+        session.commit()
+
+
+def record_timing(job_id: str, stage: str, seconds: float) -> None:
+    with SessionLocal() as session:
+        job = session.get(Job, job_id)
+        if job is None:
+            return
+        job.timings = {**(job.timings or {}), stage: round(seconds, 4)}
+        session.commit()
+
+
+def mark_started(job_id: str) -> None:
+    update_job(job_id, status="processing", started_at=utcnow(), error=None)
+
+
+def mark_finished(job_id: str, error: Optional[str] = None) -> None:
+    update_job(job_id, status="failed" if error else "completed",
+               finished_at=utcnow(), error=error)
+
+
+def find_by_hash(content_hash: str) -> List[Job]:
+    with SessionLocal() as session:
+        return list(session.scalars(select(Job).where(Job.content_hash == content_hash)))
+
+
+def academies_for(job_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+    ids = list(set(job_ids))
+    out: Dict[str, Optional[str]] = {}
+    with SessionLocal() as session:
+        for i in range(0, len(ids), 500):
+            rows = session.execute(select(Job.id, Job.academy_id).where(Job.id.in_(ids[i:i + 500])))
+            out.update({job_id: academy for job_id, academy in rows})
+    return out
+
+
+def pinned_job_ids() -> Set[str]:
+    with SessionLocal() as session:
+        return set(session.scalars(select(Job.id).where(Job.pinned.is_(True))))
+
+
+def jobs_in_batch(batch_id: str) -> List[Job]:
+    with SessionLocal() as session:
+        return list(session.scalars(select(Job).where(Job.batch_id == batch_id).order_by(Job.created_at)))
+
+
+def status_counts(batch_id: str) -> Dict[str, int]:
+    with SessionLocal() as session:
+        rows = session.execute(select(Job.status, func.count()).where(Job.batch_id == batch_id)
+                               .group_by(Job.status))
+        return {status: count for status, count in rows}
@@ -1,15 +1,53 @@
-from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, BackgroundTasks, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from app.storage import gen_job_id, save_upload, result_path
-from app.processing.mediapipe_utils import analyze_shot
+from app.storage import gen_job_id, save_upload, result_path, static_url, UPLOAD_DIR, RESULT_DIR
+from app.processing.pose_estimator import TIERS
+from app.processing.policy import PoseConfig, plan
 from app.routes.analysis import router as analysis_router
-import json
+from app.routes.storage import router as storage_router
+from app.routes.players import router as players_router
+from app.routes.batch import router as batch_router
+from app.routes.pose import router as pose_router
+from app.routes.profiles import router as profiles_router
+from app.routes.references import router as references_router
+from app.routes.similarity import router as similarity_router
+from app import admission, similarity, threads, workers
+from app.retention import start_sweeper
+from app.db import engine, init_db
+from app.batch import running_batches
+from app.pipeline import OVERLAY_VIDEO, publish_track, render_overlay
+from app.telemetry import (CONTENT_TYPE_LATEST, ADMISSION_BACKLOG, OLDEST_WAIT, QUEUE_DEPTH, QUEUED,
+                           BATCHES_RUNNING, job_context, job_finished, log, render_metrics)
+from app.jobs import (create_job, get_job, update_job, set_artifact, record_timing,
+                      mark_started, mark_finished)
+from typing import Any, Dict, Optional
+from sqlalchemy import text
+import logging
+import math
+import time
 from pathlib import Path
 
 app = FastAPI(title="AthleteRise Backend - MVP")
 
+@app.middleware("http")
+async def admit_uploads(request: Request, call_next):
+    """
+    Turn an upload away when its client or the server is saturated, before the
+    body is read: the endpoint only runs once FastAPI has parsed (and spooled) the
+    whole multipart form. Registered before CORS, so rejections carry its headers.
+    """
+    if request.method == "POST" and request.url.path == "/upload":
+        try:
+            admission.check("upload", admission.client_id(request))
+        except admission.Rejected as e:
+            return JSONResponse(status_code=e.status_code, content={"detail": e.detail},
+                                headers={"Retry-After": str(e.retry_after)})
+    return await call_next(request)
+
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -28,20 +66,32 @@ app.add_middleware(
 
 # Include analysis router
 app.include_router(analysis_router)
+app.include_router(storage_router)
+app.include_router(players_router)
+app.include_router(batch_router)
+app.include_router(pose_router)
+app.include_router(profiles_router)
+app.include_router(references_router)
+app.include_router(similarity_router)
 
 # Mount static files for serving analysis images
-from pathlib import Path
-# Correct static directory for Render persistent storage
-storage_dir = Path("/storage")
-results_dir = storage_dir / "results"
-uploads_dir = storage_dir / "uploads"
+# Serve both results & uploads from the same storage root the pipeline writes to
+# (/storage on Render's persistent disk); files live in sharded ab/cd/ subdirectories
+app.mount("/static/results", StaticFiles(directory=str(RESULT_DIR)), name="static_results")
+app.mount("/static/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="static_uploads")
+
+
+@app.on_event("startup")
+async def startup():
+    init_db()
+    app.state.sweeper = start_sweeper()
+    if workers.WARM_ON_START:
+        workers.warm_up()
 
-results_dir.mkdir(parents=True, exist_ok=True)
-uploads_dir.mkdir(parents=True, exist_ok=True)
 
-# Serve both results & uploads
-app.mount("/static/results", StaticFiles(directory=str(results_dir)), name="static_results")
-app.mount("/static/uploads", StaticFiles(directory=str(uploads_dir)), name="static_uploads")
+@app.on_event("shutdown")
+async def shutdown():
+    workers.shutdown()
 
 
 @app.get("/health")
@@ -49,58 +99,163 @@ async def health_check():
     return {"status": "ok", "message": "Backend is running"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Ready to take work: the database answers and the worker pool has finished
+    loading and warming its pose models. /health only says the process is up.
+    """
+    checks = {"database": "ok", "workers": workers.warm_status()}
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+    ready = checks["database"] == "ok" and checks["workers"] in ("ready", "cold")
+    return JSONResponse(status_code=200 if ready else 503,
+                        content={"status": "ready" if ready else "not_ready", "checks": checks,
+                                 "admission": admission.status(), "scheduler": workers.queued_by_class(),
+                                 "threads": threads.plan(workers.WORKER_PROCESSES),
+                                 "similarity": similarity.status()})
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus exposition: stage/frame/job latency histograms, counters and queue gauges."""
+    QUEUE_DEPTH.set(workers.queue_depth())
+    ADMISSION_BACKLOG.set(admission.backlog_s())
+    for request_class, queued in workers.queued_by_class().items():
+        QUEUED.labels(request_class).set(queued["queued"])
+        OLDEST_WAIT.labels(request_class).set(queued["oldest_wait_s"])
+    BATCHES_RUNNING.set(running_batches())
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+def run_pipeline(job_id: str, video_path: str, landmarks_config: PoseConfig,
+                 overlay_config: PoseConfig, probe: Optional[Dict[str, Any]] = None,
+                 overlay_video: bool = OVERLAY_VIDEO) -> None:
+    """Landmarks, previews, data track, evaluation and (optionally) the overlay video for one uploaded clip."""
+    from app.processing.chunked import analyze_shot_chunked, parallelism
+    from app.processing.derivatives import PreviewCollector
+    from app.processing.mediapipe_utils import analyze_shot, probe_video
+    # Step 1 — Run landmark extraction, streaming frames to disk as they are inferred;
+    # the preview images are taken from the same decode
+    t0 = time.perf_counter()
+    out_path = result_path(job_id)
+    probe = probe or probe_video(video_path)
+    previews = PreviewCollector(probe["fps"], probe["frame_count"],
+                                probe["width"] / probe["height"] if probe["height"] else 1.0)
+    if parallelism(probe["frame_count"]) > 1:
+        # Long clip: chunks run on the worker pool and are merged into out_path at the end
+        analyze_shot_chunked(video_path, job_id, landmarks_config, out_path, probe, previews)
+        set_artifact(job_id, "landmarks", out_path)
+    else:
+        # Registered up front so /result?partial=true can read the file while it grows
+        set_artifact(job_id, "landmarks", out_path)
+        analyze_shot(video_path, job_id, config=landmarks_config, output_path=out_path, previews=previews)
+    record_timing(job_id, "landmarks", time.perf_counter() - t0)
+
+    # Step 2 — Data track for client-side drawing (reports too when there is no video),
+    # and the previews now that the swing's impact frame is known
+    t0 = time.perf_counter()
+    publish_track(job_id, video_path, out_path, evaluate=not overlay_video, previews=previews)
+    record_timing(job_id, "track", time.perf_counter() - t0)
+
+    # Step 3 — Generate overlay video and evaluation report
+    if overlay_video:
+        t0 = time.perf_counter()
+        render_overlay(job_id, video_path, out_path, overlay_config)
+        record_timing(job_id, "overlay", time.perf_counter() - t0)
+
+
 @app.post("/upload")
-async def upload_video(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    print(f"[Upload] Received file: {file.filename}")
+async def upload_video(request: Request, background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                       academy_id: Optional[str] = Form(None),
+                       shot_type: Optional[str] = Form(None),
+                       player_id: Optional[str] = Form(None),
+                       pose_tier: Optional[str] = Form(None),
+                       overlay_video: Optional[bool] = Form(None)):
+    log("upload_received", filename=file.filename)
     
     # === Basic validation ===
     if not file.filename.lower().endswith((".mp4", ".mov", ".mkv", ".avi", ".webm")):
-        print(f"[Upload] Invalid file type: {file.filename}")
+        log("upload_rejected", filename=file.filename, reason="unsupported file type")
         raise HTTPException(status_code=400, detail="Unsupported file type")
+    if pose_tier and pose_tier not in TIERS:
+        raise HTTPException(status_code=400, detail=f"pose_tier must be one of {TIERS}")
 
+    # A saturated client or server was already turned away by admit_uploads, before the body was read
+    client = admission.client_id(request)
     job_id = gen_job_id()
-    print(f"[Upload] Generated job ID: {job_id}")
+    render = OVERLAY_VIDEO if overlay_video is None else overlay_video
     
     try:
-        saved_path = await save_upload(job_id, file)  # saves uploaded file locally
-        print(f"[Upload] File saved to: {saved_path}")
+        saved_path, content_hash, size = await save_upload(job_id, file)  # saves uploaded file locally
+        log("upload_saved", job_id=job_id, path=saved_path, size_bytes=size)
+    except Exception as e:
+        log("upload_failed", level=logging.ERROR, job_id=job_id, error=str(e))
+        raise HTTPException(status_code=500, detail=f"Failed to save file: {e}")
+
+    # Now the clip's length is known, admit it against the work already queued
+    from app.processing.mediapipe_utils import probe_video
+    try:
+        probe = await run_in_threadpool(probe_video, saved_path)
+        ticket = admission.admit("upload", client,
+                                 admission.estimate_upload_s(probe["frame_count"], pose_tier, render))
+    except admission.Rejected as e:
+        Path(saved_path).unlink(missing_ok=True)
+        raise e.http()
     except Exception as e:
-        print(f"[Upload] Error saving file: {e}")
+        Path(saved_path).unlink(missing_ok=True)
+        log("upload_rejected", job_id=job_id, reason=f"unreadable video: {e}")
+        raise HTTPException(status_code=400, detail=f"Could not read video: {e}")
+
+    try:
+        create_job(job_id, file.filename, saved_path, content_hash=content_hash,
+                   size_bytes=size, academy_id=academy_id, player_id=player_id,
+                   shot=shot_type)
+    except Exception as e:
+        admission.release(ticket)
+        log("upload_failed", level=logging.ERROR, job_id=job_id, error=str(e))
         raise HTTPException(status_code=500, detail=f"Failed to save file: {e}")
 
     # === Background processing function ===
     def process_and_save(job_id_local=job_id, path_local=saved_path):
+        with job_context(job_id_local):
+            _process(job_id_local, path_local)
+
+    def _process(job_id_local, path_local):
+        if ticket:
+            ticket.start()
+        mark_started(job_id_local)
+        t0 = time.perf_counter()
         try:
-            # Step 1 — Run landmark extraction and save JSON
-            result = analyze_shot(path_local, job_id_local)
-            out_path = result_path(job_id_local)
-            with open(out_path, "w") as f:
-                json.dump(result, f)
-
-            # Step 2 — Generate overlay video and evaluation report
-            from app.processing.overlay_utils import (
-                generate_overlay_video,
-                generate_evaluation_json,
-            )
-
-            overlay_output = str(Path(out_path).with_name(f"{job_id_local}_overlay.mp4"))
-            issues_path = generate_overlay_video(
-                video_path=path_local,
-                landmarks_json_path=out_path,
-                output_path=overlay_output,
-            )
-
-            evaluation_path = str(Path(out_path).with_name(f"{job_id_local}_evaluation.json"))
-            generate_evaluation_json(issues_path, evaluation_path)
-
-            print(f"[Pipeline] Completed all outputs for job {job_id_local}")
+            update_job(job_id_local, probe=probe)
+
+            # Landmarks and overlay each decode the whole clip once; long clips'
+            # landmarks are split over the pool, so only one chunk's frames count
+            from app.processing.chunked import parallelism
+            chunk_frames = math.ceil(probe["frame_count"] / parallelism(probe["frame_count"]))
+            passes = 2 if render else 1
+            landmarks_config = plan("landmarks", "interactive", chunk_frames, pose_tier, passes=passes)
+            overlay_config = plan("overlay", "interactive", probe["frame_count"], pose_tier, passes=passes)
+
+            with workers.inflight():
+                run_pipeline(job_id_local, path_local, landmarks_config, overlay_config, probe, render)
+
+            mark_finished(job_id_local)
+            job_finished("upload", time.perf_counter() - t0)
 
         except Exception as e:
             # Step 3 — Log any processing error
             err_path = str(Path(result_path(job_id_local)).with_suffix(".error.txt"))
             with open(err_path, "w") as ef:
                 ef.write(str(e))
-            print(f"[Pipeline] Error in job {job_id_local}: {e}")
+            set_artifact(job_id_local, "error", err_path)
+            mark_finished(job_id_local, error=str(e))
+            job_finished("upload", time.perf_counter() - t0, error=str(e))
+        finally:
+            admission.release(ticket)
 
     # === Queue background processing ===
     background_tasks.add_task(process_and_save)
@@ -109,12 +264,54 @@ async def upload_video(background_tasks: BackgroundTasks, file: UploadFile = Fil
 
 
 @app.get("/result/{job_id}")
-async def get_result(job_id: str):
+async def get_result(job_id: str, partial: bool = False):
     """
     Returns the JSON landmark data for the given job_id if available.
+    With partial=true, the frames written so far while the job is still running.
     """
-    p = Path(result_path(job_id))
-    if p.exists():
-        return JSONResponse(status_code=200, content=json.loads(p.read_text()))
-    else:
-        return JSONResponse(status_code=404, content={"error": "result not ready"})
+    from app.processing.landmark_stream import is_complete, iter_json
+    job = get_job(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "unknown job"})
+    landmarks = job.artifacts.get("landmarks")
+    if not landmarks or not Path(landmarks).exists():
+        return JSONResponse(status_code=404, content={"error": "result not ready", "status": job.status})
+    if not partial and not is_complete(landmarks):
+        return JSONResponse(status_code=404, content={"error": "result not ready", "status": job.status})
+    # Streamed so a long clip's result is never held in memory whole
+    return StreamingResponse(iter_json(landmarks), media_type="application/json")
+
+
+@app.get("/track/{job_id}")
+async def get_track(job_id: str):
+    """
+    The job's data track: per-frame landmarks, HUD metrics and feedback cues, time-aligned
+    with the original video, for drawing the overlay in the browser.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "unknown job"})
+    track = job.artifacts.get("track")
+    if not track or not Path(track).exists():
+        return JSONResponse(status_code=404, content={"error": "track not ready", "status": job.status})
+    return FileResponse(track, media_type="application/json")
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Status, probe data, timings and artifact locations for a job."""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "error": job.error,
+        "shot": job.shot,
+        "academy_id": job.academy_id,
+        "probe": job.probe,
+        "timings": job.timings,
+        "artifacts": {kind: static_url(p) for kind, p in job.artifacts.items()},
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,136 @@
+# backend/app/memo.py
+"""
+Memoized shot analyses. A result is stored under a key built from everything
+that determines it: the upload's content hash, the analyzer class, a version
+hash of the scoring code and ranges, and the model configuration (tier,
+backend, thresholds, stride and cascade settings). Editing an analyzer, its
+ranges or the keyframe search changes the version, so stale entries are never
+served; storing a new version drops the old ones for that clip and analyzer.
+"""
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import shutil
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Type
+
+from sqlalchemy import delete, update
+
+from app.db import SessionLocal
+from app.models.job import Job
+from app.models.memo import AnalysisMemo
+from app.processing.policy import PoseConfig
+from app.storage import result_dir
+from app.telemetry import log
+
+# Bump to invalidate every entry (e.g. after changing the result shape)
+MEMO_VERSION = 1
+ENABLED = os.getenv("ANALYSIS_MEMO", "1") == "1"
+
+# Every module whose code shapes a stored result, besides the analyzer's own classes.
+# A fixed list, imported before hashing, so the version does not depend on import order.
+_SHARED_MODULES = (
+    "app.analysis.scoring",
+    "app.analysis.shot_analyzer",
+    "app.processing.cascade",
+    "app.processing.compare",
+    "app.processing.data_track",
+    "app.processing.embedding",
+    "app.processing.landmark_stream",
+    "app.processing.phases",
+    "app.processing.pose",
+)
+
+
+def _sha(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _name(analyzer_cls: Type) -> str:
+    return f"{analyzer_cls.__module__}.{analyzer_cls.__qualname__}"
+
+
+@lru_cache(maxsize=None)
+def analyzer_version(analyzer_cls: Type) -> str:
+    """Hash of the analyzer's ranges and the source of every module its scoring runs through."""
+    modules = {k.__module__ for k in analyzer_cls.__mro__ if k.__module__.startswith("app.")}
+    modules.update(_SHARED_MODULES)
+    sources = {m: inspect.getsource(importlib.import_module(m)) for m in sorted(modules)}
+    return _sha({
+        "memo": MEMO_VERSION,
+        "ideal_ranges": analyzer_cls.ideal_ranges,
+        "acceptable_ranges": analyzer_cls.acceptable_ranges,
+        "keyframe_offset": analyzer_cls.keyframe_offset,
+        "sources": {m: hashlib.sha256(s.encode()).hexdigest() for m, s in sources.items()},
+    })
+
+
+def model_key(config: PoseConfig) -> Dict[str, Any]:
+    """The parts of a configuration that change landmarks (not how it was chosen)."""
+    from app.processing import cascade
+    from app.processing.pose_estimator import default_backend
+    scan = config.scan_config()
+    return {
+        "tier": config.tier,
+        "backend": default_backend(config.tier),
+        "stride": config.stride,
+        "min_detection_confidence": config.min_detection_confidence,
+        "min_tracking_confidence": config.min_tracking_confidence,
+        "scan_tier": scan.tier,
+        "scan_backend": default_backend(scan.tier),
+        "scan_width": cascade.SCAN_WIDTH,
+        "window": [cascade.WINDOW_BEFORE_S, cascade.WINDOW_AFTER_S, cascade.WARMUP_FRAMES],
+    }
+
+
+def memo_key(content_hash: str, analyzer_cls: Type, config: PoseConfig) -> str:
+    return _sha([content_hash, _name(analyzer_cls), analyzer_version(analyzer_cls), model_key(config)])
+
+
+def lookup(job: Job, analyzer_cls: Type, config: PoseConfig) -> Optional[Dict[str, Any]]:
+    """
+    A stored result for this clip, analyzer and configuration, or None. The keyframe is
+    copied into the job's result directory when the entry came from another upload of
+    the same video; an entry whose keyframe has since been evicted counts as a miss.
+    """
+    if not ENABLED or not job.content_hash:
+        return None
+    key = memo_key(job.content_hash, analyzer_cls, config)
+    with SessionLocal() as session:
+        entry = session.get(AnalysisMemo, key)
+        if entry is None:
+            return None
+        result = dict(entry.result)
+        session.execute(update(AnalysisMemo).where(AnalysisMemo.key == key)
+                        .values(hits=AnalysisMemo.hits + 1))
+        session.commit()
+
+    source = result.get("keyframe_path")
+    if not source or not Path(source).exists():
+        return None
+    target = result_dir(job.id) / f"{Path(job.upload_path).stem}_keyframe.jpg"
+    if Path(source) != target:
+        shutil.copyfile(source, target)
+    result["keyframe_path"] = str(target)
+    result["memo"] = {"hit": True, "key": key}
+    log("analysis_memo_hit", job_id=job.id, analyzer=_name(analyzer_cls), key=key[:12])
+    return result
+
+
+def store(job: Job, analyzer_cls: Type, config: PoseConfig, result: Dict[str, Any]) -> None:
+    """Keep a successful result; degraded configurations are not worth serving again."""
+    if not ENABLED or not job.content_hash or result.get("error") or config.degraded:
+        return
+    key = memo_key(job.content_hash, analyzer_cls, config)
+    name, version = _name(analyzer_cls), analyzer_version(analyzer_cls)
+    with SessionLocal() as session:
+        # Entries from an older version of this analyzer can never be hit again
+        session.execute(delete(AnalysisMemo).where(AnalysisMemo.content_hash == job.content_hash,
+                                                   AnalysisMemo.analyzer == name,
+                                                   AnalysisMemo.version != version))
+        session.merge(AnalysisMemo(key=key, content_hash=job.content_hash, analyzer=name,
+                                   version=version, result=result, hits=0))
+        session.commit()
@@ -0,0 +1,7 @@
+from app.models.job import Job  # noqa: F401
+from app.models.history import AnalysisRecord, MetricRollup, MetricBucket  # noqa: F401
+from app.models.batch import Batch  # noqa: F401
+from app.models.memo import AnalysisMemo  # noqa: F401
+from app.models.profiles import ThresholdProfile, PlayerProfile  # noqa: F401
+from app.models.references import SwingReference  # noqa: F401
+from app.models.similarity import SwingEmbedding, SwingEmbeddingChange  # noqa: F401
@@ -0,0 +1,74 @@
+# backend/app/models/history.py
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import JSON, Date, DateTime, Float, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+from app.models.job import utcnow
+
+
+class AnalysisRecord(Base):
+    """Metrics and scores of one completed analysis, keyed by job."""
+    __tablename__ = "analysis_records"
+
+    job_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    player_id: Mapped[Optional[str]] = mapped_column(String(64), index=True)
+    shot: Mapped[str] = mapped_column(String(32), index=True)
+    metrics: Mapped[Dict[str, float]] = mapped_column(JSON, default=dict)
+    scores: Mapped[Dict[str, float]] = mapped_column(JSON, default=dict)
+    overall_score: Mapped[Optional[float]] = mapped_column(Float)
+    # Threshold profile the scores were computed against (see app.profiles)
+    profile: Mapped[Optional[str]] = mapped_column(String(64))
+    profile_version: Mapped[Optional[int]] = mapped_column(Integer)
+    recorded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, index=True)
+
+
+class _RunningStats:
+    """Columns for a Welford running mean/variance plus extrema."""
+    count: Mapped[int] = mapped_column(Integer, default=0)
+    mean: Mapped[float] = mapped_column(Float, default=0.0)
+    m2: Mapped[float] = mapped_column(Float, default=0.0)
+    min_value: Mapped[Optional[float]] = mapped_column(Float)
+    max_value: Mapped[Optional[float]] = mapped_column(Float)
+
+
+class MetricRollup(_RunningStats, Base):
+    """All-time rollup of one metric for one player and shot ("overall_score" included)."""
+    __tablename__ = "metric_rollups"
+    __table_args__ = (UniqueConstraint("player_id", "shot", "metric"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    player_id: Mapped[str] = mapped_column(String(64), index=True)
+    shot: Mapped[str] = mapped_column(String(32))
+    metric: Mapped[str] = mapped_column(String(64))
+    last_value: Mapped[Optional[float]] = mapped_column(Float)
+    last_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    # Trend: x is days since epoch, y is the metric value
+    mean_x: Mapped[float] = mapped_column(Float, default=0.0)
+    m2_x: Mapped[float] = mapped_column(Float, default=0.0)
+    c_xy: Mapped[float] = mapped_column(Float, default=0.0)
+
+
+class MetricBucket(_RunningStats, Base):
+    """Rollup of one metric for one player and shot within one calendar week."""
+    __tablename__ = "metric_buckets"
+    __table_args__ = (UniqueConstraint("player_id", "shot", "metric", "bucket_start"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    player_id: Mapped[str] = mapped_column(String(64), index=True)
+    shot: Mapped[str] = mapped_column(String(32))
+    metric: Mapped[str] = mapped_column(String(64))
+    bucket_start: Mapped[date] = mapped_column(Date)
+
+
+def stats_dict(row: Any) -> Dict[str, Any]:
+    variance = row.m2 / (row.count - 1) if row.count > 1 else 0.0
+    return {
+        "count": row.count,
+        "mean": row.mean,
+        "std": variance ** 0.5,
+        "min": row.min_value,
+        "max": row.max_value,
+    }
@@ -0,0 +1,41 @@
+# backend/app/models/job.py
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import JSON, Boolean, DateTime, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Job(Base):
+    """One uploaded clip and everything derived from it."""
+    __tablename__ = "jobs"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    filename: Mapped[str] = mapped_column(String(255))
+    upload_path: Mapped[str] = mapped_column(Text)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), index=True)
+    size_bytes: Mapped[Optional[int]] = mapped_column(Integer)
+    academy_id: Mapped[Optional[str]] = mapped_column(String(64), index=True)
+    player_id: Mapped[Optional[str]] = mapped_column(String(64), index=True)
+    batch_id: Mapped[Optional[str]] = mapped_column(String(32), index=True)
+    shot: Mapped[Optional[str]] = mapped_column(String(32))
+    status: Mapped[str] = mapped_column(String(16), default="queued", index=True)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    pinned: Mapped[bool] = mapped_column(Boolean, default=False)
+
+    # fps, frame_count, width, height, duration_s
+    probe: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    # artifact kind -> path on disk (landmarks, overlay, issues, evaluation, keyframe, analysis)
+    artifacts: Mapped[Dict[str, str]] = mapped_column(JSON, default=dict)
+    # stage name -> seconds
+    timings: Mapped[Dict[str, float]] = mapped_column(JSON, default=dict)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, index=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
@@ -0,0 +1,22 @@
+# backend/app/models/memo.py
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy import JSON, DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+from app.models.job import utcnow
+
+
+class AnalysisMemo(Base):
+    """A stored analyzer result, keyed by what determines it (see app.memo)."""
+    __tablename__ = "analysis_memo"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    content_hash: Mapped[str] = mapped_column(String(64), index=True)
+    analyzer: Mapped[str] = mapped_column(String(64))
+    version: Mapped[str] = mapped_column(String(64))
+    result: Mapped[Dict[str, Any]] = mapped_column(JSON)
+    hits: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
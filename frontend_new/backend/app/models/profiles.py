@@ -0,0 +1,37 @@
+# backend/app/models/profiles.py
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import JSON, DateTime, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+from app.models.job import utcnow
+
+
+class ThresholdProfile(Base):
+    """
+    One version of a named threshold profile for one shot. Versions are never
+    edited; a change is a new row with the next version number.
+    """
+    __tablename__ = "threshold_profiles"
+    __table_args__ = (UniqueConstraint("name", "shot", "version"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(64), index=True)
+    shot: Mapped[str] = mapped_column(String(32))
+    version: Mapped[int] = mapped_column(Integer)
+    # metric -> [low, high], every metric of the shot
+    ideal_ranges: Mapped[Dict[str, List[float]]] = mapped_column(JSON)
+    acceptable_ranges: Mapped[Dict[str, List[float]]] = mapped_column(JSON)
+    note: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+
+
+class PlayerProfile(Base):
+    """The threshold profile a player is scored against (unassigned players use "default")."""
+    __tablename__ = "player_profiles"
+
+    player_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    profile: Mapped[str] = mapped_column(String(64), index=True)
+    assigned_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
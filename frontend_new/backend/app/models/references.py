@@ -0,0 +1,35 @@
+# backend/app/models/references.py
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import JSON, DateTime, Float, Integer, LargeBinary, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+from app.models.job import utcnow
+
+
+class SwingReference(Base):
+    """
+    A reference swing (a pro's, or a player's own best) with its normalised,
+    resampled landmarks precomputed, so comparisons never re-read the source clip.
+    """
+    __tablename__ = "swing_references"
+    # Never reuse a deleted reference's id (SQLite otherwise hands out max(id) + 1 again)
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(128))
+    shot: Mapped[str] = mapped_column(String(32), index=True)
+    # None: shared with every player; else that player's own reference
+    player_id: Mapped[Optional[str]] = mapped_column(String(64), index=True)
+    job_id: Mapped[Optional[str]] = mapped_column(String(32))
+    # float32 (frames, joints, 2) as produced by app.processing.compare
+    frames: Mapped[int] = mapped_column(Integer)
+    joints: Mapped[int] = mapped_column(Integer)
+    data: Mapped[bytes] = mapped_column(LargeBinary)
+    start_frame: Mapped[float] = mapped_column(Float)
+    end_frame: Mapped[float] = mapped_column(Float)
+    fps: Mapped[float] = mapped_column(Float)
+    phases: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
@@ -0,0 +1,43 @@
+# backend/app/models/similarity.py
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Integer, LargeBinary, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+from app.models.job import utcnow
+
+
+class SwingEmbedding(Base):
+    """
+    The embedding of one analysed swing (app.processing.embedding). Re-analysis
+    replaces a job's row; every store and delete is also logged in
+    swing_embedding_changes, which is what API processes follow to keep their
+    in-memory indexes current.
+    """
+    __tablename__ = "swing_embeddings"
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_id: Mapped[str] = mapped_column(String(32), unique=True)
+    player_id: Mapped[Optional[str]] = mapped_column(String(64), index=True)
+    shot: Mapped[str] = mapped_column(String(32), index=True)
+    dim: Mapped[int] = mapped_column(Integer)
+    # float32 unit vector
+    vector: Mapped[bytes] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+
+
+class SwingEmbeddingChange(Base):
+    """
+    One job's embedding was stored, replaced or deleted under `shot`. seq never
+    reuses a value (SQLite AUTOINCREMENT, not max(rowid) + 1), so an index that
+    has applied every change up to a seq only needs the ones after it.
+    """
+    __tablename__ = "swing_embedding_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_id: Mapped[str] = mapped_column(String(32))
+    shot: Mapped[str] = mapped_column(String(32), index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
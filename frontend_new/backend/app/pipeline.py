@@ -0,0 +1,171 @@
+# backend/app/pipeline.py
+"""Steps shared by the single-upload, /analyze and batch paths."""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app import profiles, similarity, singleflight
+from app.history import record_analysis
+from app.jobs import get_job, set_artifact, update_job
+from app.models.job import Job
+from app.processing.policy import PoseConfig
+from app.storage import result_dir, static_url
+from app.telemetry import log, timed_step
+
+# Render the annotated video on every upload. Off by default: it is the costliest artifact
+# (a second decode and pose pass), the client draws the data track over the original video
+# instead, and the video is an on-demand export (/storage/regenerate/{job}/overlay)
+OVERLAY_VIDEO = os.getenv("OVERLAY_VIDEO", "0") == "1"
+
+
+def fresh_artifacts(job_id: str, kinds: Iterable[str], since: float) -> Optional[Dict[str, str]]:
+    """Paths of the job's artifacts if every one exists and was written at or after `since`."""
+    job = get_job(job_id)
+    paths = {kind: (job.artifacts or {}).get(kind) for kind in kinds} if job else {}
+    if not paths or not all(p and Path(p).exists() and Path(p).stat().st_mtime >= since
+                            for p in paths.values()):
+        return None
+    return paths
+
+
+def render_overlay(job_id: str, video_path: str, landmarks_path: str,
+                   config: PoseConfig) -> Dict[str, str]:
+    """
+    Overlay video, issues log and evaluation for a job, recorded as artifacts. The
+    upload pipeline and a regenerate request racing on the same job share a single render.
+    """
+    def compute() -> Dict[str, str]:
+        from app.processing.overlay_utils import generate_overlay_video, generate_evaluation_json
+        probe, swing = swing_from(video_path, landmarks_path)
+
+        overlay_path = str(result_dir(job_id) / f"{job_id}_overlay.mp4")
+        issues_path = generate_overlay_video(video_path, landmarks_path, overlay_path, config)
+        evaluation_path = str(result_dir(job_id) / f"{job_id}_evaluation.json")
+        generate_evaluation_json(issues_path, evaluation_path, config.as_dict(),
+                                 swing["follow_through"] if swing else None)
+        # generate_overlay_video writes MJPEG/AVI next to the issues log
+        paths = {"overlay": str(Path(overlay_path).with_suffix(".avi")), "issues": issues_path,
+                 "evaluation": evaluation_path}
+        for kind, path in paths.items():
+            set_artifact(job_id, kind, path)
+        return paths
+
+    return singleflight.run(f"overlay:{job_id}", compute,
+                            lambda since: fresh_artifacts(job_id, ("overlay", "issues", "evaluation"), since))
+
+
+def write_previews(job_id: str, previews, impact: Optional[int] = None) -> Optional[str]:
+    """Write the preview images a landmark pass collected and record the manifest as an artifact."""
+    with timed_step("landmarks", "preview_write"):
+        path = previews.write(str(result_dir(job_id)), job_id, impact)
+    if path:
+        set_artifact(job_id, "preview", path)
+    return path
+
+
+def regenerate_previews(job_id: str, video_path: str, landmarks_path: str) -> Optional[str]:
+    """Previews again from the stored landmarks: one decode, no inference."""
+    from app.processing.derivatives import collect_from_landmarks
+    _, swing = swing_from(video_path, landmarks_path)
+    return write_previews(job_id, collect_from_landmarks(video_path, landmarks_path), _impact(swing))
+
+
+def _impact(swing: Optional[Dict[str, Any]]) -> Optional[int]:
+    return swing["phases"]["events"]["impact"] if swing and swing["phases"] else None
+
+
+def publish_track(job_id: str, video_path: str, landmarks_path: str,
+                  evaluate: bool = False, previews=None) -> Dict[str, str]:
+    """
+    The job's data track (app.processing.data_track) from its stored landmarks. With
+    evaluate=True (no overlay video is rendered) the issues log and evaluation come from
+    the track too, so the job still gets every report without a decode pass. previews,
+    the PreviewCollector of the landmark pass, is written with the swing's impact frame.
+    """
+    from app.processing.data_track import build_track, write_track
+    probe, swing = swing_from(video_path, landmarks_path)
+    if previews is not None:
+        write_previews(job_id, previews, _impact(swing))
+    with timed_step("track", "build"):
+        track = build_track(landmarks_path, job_id, probe["fps"], probe["frame_count"],
+                            probe["width"], probe["height"])
+    track["phases"] = swing["phases"] if swing else None
+    with timed_step("track", "json_write"):
+        paths = {"track": write_track(str(result_dir(job_id) / f"{job_id}_track.json"), track)}
+
+    if evaluate:
+        from app.processing.overlay_utils import generate_evaluation_json
+        issues_path = str(result_dir(job_id) / f"{job_id}_track.issues.json")
+        with open(issues_path, "w") as f:
+            json.dump(track["issues"], f, indent=2)
+        evaluation_path = str(result_dir(job_id) / f"{job_id}_evaluation.json")
+        generate_evaluation_json(issues_path, evaluation_path,
+                                 follow_through=swing["follow_through"] if swing else None)
+        paths.update({"issues": issues_path, "evaluation": evaluation_path})
+    for kind, path in paths.items():
+        set_artifact(job_id, kind, path)
+    return paths
+
+
+def swing_from(video_path: str, landmarks_path: Optional[str]
+               ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """(probe, phases and follow-through from the stored landmarks, or None when there are none yet)."""
+    from app.processing.mediapipe_utils import probe_video
+    from app.processing.phases import analyze_file
+    probe = probe_video(video_path)
+    if not landmarks_path or not Path(landmarks_path).exists():
+        return probe, None
+    with timed_step("evaluation", "phases"):
+        return probe, analyze_file(landmarks_path, probe["width"], probe["height"], probe["fps"])
+
+
+def save_analysis(job: Job, shot: str, result: Dict[str, Any],
+                  player_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Score the metrics against the player's threshold profile, shape the result
+    for the frontend, write {job_id}_analysis.json, record artifacts on the job
+    and fold the scores into the player's history.
+    """
+    player_id = player_id or job.player_id
+    thresholds = None
+    if not result.get("error"):
+        thresholds = profiles.apply(result, shot, player_id)
+
+    if result.get("keyframe_path"):
+        set_artifact(job.id, "keyframe", result["keyframe_path"])
+
+    # ----------- RETURN ONLY THE ANNOTATED VIDEO PATH -------------
+
+    # Overlay location is recorded by the upload pipeline
+    overlay_file = (job.artifacts or {}).get("overlay")
+    if overlay_file and not Path(overlay_file).exists():
+        overlay_file = None
+
+    # Provide ONLY the field expected by the frontend
+    # Frontend constructs: backendUrl + "/static/" + video_path
+    result["video_path"] = static_url(overlay_file) if overlay_file else None
+
+    # Clean up any other fields we do not want to expose
+    for key in ("keyframe_path", "keyframe_url", "overlay_video_url"):
+        result.pop(key, None)
+
+    # Save results
+    result_file = result_dir(job.id) / f"{job.id}_analysis.json"
+    with timed_step("analysis", "json_write"), open(result_file, "w") as f:
+        json.dump(result, f, indent=2)
+    set_artifact(job.id, "analysis", str(result_file))
+
+    update_job(job.id, shot=shot, player_id=player_id)
+
+    # Fold into the player's performance history
+    if thresholds is not None:
+        record_analysis(job.id, player_id, shot, result["metrics"], result["feedback"],
+                        profile=thresholds.name, profile_version=thresholds.version)
+        # Make the swing searchable by similarity; a failure here must not fail the analysis
+        try:
+            similarity.record(job.id, player_id, shot, result)
+        except Exception as e:
+            log("embedding_failed", level=logging.WARNING, job_id=job.id, error=str(e))
+    return result
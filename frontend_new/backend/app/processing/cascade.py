@@ -0,0 +1,224 @@
+# backend/app/processing/cascade.py
+"""
+Two-stage pose inference for shot analysis. A cheap scan (lite tier, downscaled
+frames) runs over the whole clip to find the swing from the wrist trajectory;
+the expensive tier then runs only on that window. The refine pass starts a few
+frames early so the tracker has settled by the time the window begins.
+"""
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.processing.phases import IMPACT_AFTER_S, IMPACT_BEFORE_S, peak_speed
+from app.processing.pose import LEFT_WRIST, RIGHT_WRIST, X, Y, Pose
+from app.processing.pose_estimator import PoseEstimator
+from app.telemetry import StageClock
+
+SCAN_TIER = os.getenv("POSE_TIER_SCAN", "lite")
+SCAN_WIDTH = int(os.getenv("POSE_SCAN_WIDTH", "480"))
+
+# Swing window around the peak wrist speed, in seconds
+WINDOW_BEFORE_S = float(os.getenv("CASCADE_WINDOW_BEFORE_S", "0.6"))
+WINDOW_AFTER_S = float(os.getenv("CASCADE_WINDOW_AFTER_S", "0.5"))
+WARMUP_FRAMES = int(os.getenv("CASCADE_WARMUP_FRAMES", "6"))
+
+# Too few wrist detections in the scan to trust a peak
+MIN_TRACK_POINTS = 3
+# Decoded frames the refine pass keeps as keyframe candidates: those with the lowest
+# hands where phase detection will look for impact
+KEYFRAME_CANDIDATES = 3
+
+WRIST = LEFT_WRIST
+
+
+@dataclass
+class CascadeResult:
+    fps: float
+    total_frames: int
+    # Index of the fastest wrist movement found by the scan (None if not found)
+    peak_frame: Optional[int]
+    window: Tuple[int, int]
+    # Refined pose for every frame in the window with a detection
+    landmarks: Dict[int, Pose] = field(default_factory=dict)
+    # Pose of every scanned frame with a detection, for phase detection
+    scan_poses: Dict[int, Pose] = field(default_factory=dict)
+    # Refined frames kept as keyframe candidates; the keyframe needs no seek when it is one
+    frames: Dict[int, np.ndarray] = field(default_factory=dict)
+    scan_stats: Dict[str, Any] = field(default_factory=dict)
+    refine_stats: Dict[str, Any] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "peak_frame": self.peak_frame,
+            "window": list(self.window),
+            "refined_frames": len(self.landmarks),
+            "scan": self.scan_stats,
+            "refine": self.refine_stats,
+        }
+
+
+def window_frames(fps: float, extra: int = 0) -> int:
+    """Frames the refine pass decodes for a clip at this fps (window plus warm-up)."""
+    return int(math.ceil((WINDOW_BEFORE_S + WINDOW_AFTER_S) * (fps or 25))) + WARMUP_FRAMES + extra + 1
+
+
+def _downscale(frame: np.ndarray, width: int) -> np.ndarray:
+    h, w = frame.shape[:2]
+    if not width or w <= width:
+        return frame
+    return cv2.resize(frame, (width, int(h * width / w)), interpolation=cv2.INTER_AREA)
+
+
+def scan_wrist_track(video_path: str, estimator: PoseEstimator, stride: int = 1,
+                     frame_range: Optional[Tuple[int, int]] = None
+                     ) -> Tuple[float, int, Dict[int, Pose]]:
+    """
+    Stage 1: (fps, total frames, {frame: Pose}) over the whole clip, or over the
+    inclusive frame_range of it (one delivery of a session). Coordinates are normalised,
+    so downscaling does not change them.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+
+    poses = {}
+    idx, last = 0, None
+    if frame_range:
+        idx, last = frame_range
+        if idx:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+    clock = StageClock("scan")
+    while last is None or idx <= last:
+        if idx % stride:
+            if not cap.grab():
+                break
+            idx += 1
+            clock.lap("decode")
+            continue
+        ret, frame = cap.read()
+        clock.lap("decode")
+        if not ret:
+            break
+        rgb = cv2.cvtColor(_downscale(frame, SCAN_WIDTH), cv2.COLOR_BGR2RGB)
+        clock.lap("convert")
+        pose = estimator.process(rgb, int(idx * 1000 / fps))
+        clock.lap("inference")
+        if pose:
+            poses[idx] = pose
+        clock.frame_done(detected=bool(pose))
+        idx += 1
+    cap.release()
+    clock.finish(tier=estimator.tier, stride=stride)
+    return fps, max(total_frames, idx), poses
+
+
+def peak_speed_frame(track: Sequence[Tuple[int, float, float]]) -> Optional[int]:
+    """Frame at which the wrist moves fastest (per frame, so gaps in the track do not inflate it)."""
+    if len(track) < MIN_TRACK_POINTS:
+        return None
+    arr = np.asarray(track, dtype=float)
+    gaps = np.diff(arr[:, 0])
+    speed = np.hypot(np.diff(arr[:, 1]), np.diff(arr[:, 2])) / np.maximum(gaps, 1)
+    return int(arr[1 + int(np.argmax(speed)), 0])
+
+
+def swing_window(peak: Optional[int], fps: float, total_frames: int, min_after: int = 0,
+                 frame_range: Optional[Tuple[int, int]] = None) -> Tuple[int, int]:
+    """Inclusive frame range to refine; the clip's (or range's) middle when the scan found no swing."""
+    first, last = frame_range or (0, max(total_frames - 1, 0))
+    before = int(round(WINDOW_BEFORE_S * fps))
+    after = max(int(round(WINDOW_AFTER_S * fps)), min_after)
+    if peak is None:
+        peak = (first + last + 1) // 2
+        after = max(after, before)
+    return max(peak - before, first), min(peak + after, last)
+
+
+def refine_window(video_path: str, estimator: PoseEstimator, window: Tuple[int, int],
+                  fps: float, keep: Optional[Tuple[int, int]] = None
+                  ) -> Tuple[Dict[int, Pose], Dict[int, np.ndarray]]:
+    """
+    Stage 2: run the estimator over the window, starting WARMUP_FRAMES early. Returns
+    the poses and, of the frames in the inclusive `keep` range, the KEYFRAME_CANDIDATES
+    with the lowest hands (where impact is).
+    """
+    start, end = window
+    first = max(start - WARMUP_FRAMES, 0)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video: {video_path}")
+    if first:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+
+    landmarks = {}
+    candidates: List[Tuple[float, int, np.ndarray]] = []
+    clock = StageClock("refine")
+    for idx in range(first, end + 1):
+        ret, frame = cap.read()
+        clock.lap("decode")
+        if not ret:
+            break
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        clock.lap("convert")
+        result = estimator.process(rgb, int(idx * 1000 / fps))
+        clock.lap("inference")
+        # Warm-up frames only prime the tracker
+        if result and idx >= start:
+            landmarks[idx] = result
+            if keep and keep[0] <= idx <= keep[1]:
+                hands_y = float(np.nanmean(result.data[[LEFT_WRIST, RIGHT_WRIST], Y]))
+                candidates = sorted(candidates + [(hands_y, idx, frame)], key=lambda c: -c[0])[:KEYFRAME_CANDIDATES]
+        clock.frame_done(detected=bool(result))
+    cap.release()
+    clock.finish(tier=estimator.tier, window=[start, end])
+    return landmarks, {idx: frame for _, idx, frame in candidates}
+
+
+def run_cascade(video_path: str, scan_estimator: PoseEstimator, refine_estimator: PoseEstimator,
+                stride: int = 1, min_after: int = 0,
+                frame_range: Optional[Tuple[int, int]] = None) -> CascadeResult:
+    """Scan the clip (or frame_range) cheaply, then refine the swing window with the expensive estimator."""
+    scan_before = scan_estimator.stats()
+    fps, total_frames, poses = scan_wrist_track(video_path, scan_estimator, stride, frame_range)
+    track = [(idx, pose[WRIST][X], pose[WRIST][Y]) for idx, pose in sorted(poses.items())]
+    # Centre the window where phase detection will look for the swing
+    peak = peak_speed(poses, fps)
+    if peak is None:
+        peak = peak_speed_frame(track)
+    window = swing_window(peak, fps, total_frames, min_after, frame_range)
+
+    refine_before = refine_estimator.stats()
+    keep = None
+    if peak is not None:
+        keep = (peak - int(round(IMPACT_BEFORE_S * fps)), peak + int(round(IMPACT_AFTER_S * fps)))
+    landmarks, frames = refine_window(video_path, refine_estimator, window, fps, keep)
+    return CascadeResult(
+        fps=fps,
+        total_frames=total_frames,
+        peak_frame=peak,
+        window=window,
+        landmarks=landmarks,
+        scan_poses=poses,
+        frames=frames,
+        scan_stats=_delta(scan_estimator, scan_before, stride=stride, width=SCAN_WIDTH,
+                          detections=len(track)),
+        refine_stats=_delta(refine_estimator, refine_before, warmup_frames=WARMUP_FRAMES),
+    )
+
+
+def _delta(estimator: PoseEstimator, before: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+    # Estimators may be shared across clips, so report only this clip's share
+    after = estimator.stats()
+    return {
+        "tier": estimator.tier,
+        "backend": estimator.backend,
+        "frames": after["frames"] - before["frames"],
+        "seconds": round(after["seconds"] - before["seconds"], 4),
+        **extra,
+    }
@@ -0,0 +1,87 @@
+# backend/app/processing/chunked.py
+"""
+Landmark extraction for long clips, split across the worker pool. The frame
+range is cut into contiguous chunks; each worker infers its chunk on its own
+estimator, starting WARMUP_FRAMES sampled frames early so tracking has
+converged by the chunk's first frame. Chunk outputs are part files that are
+concatenated in frame order, so the merged result is the same on every run
+whatever order the chunks finish in.
+"""
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from app.processing.landmark_stream import LandmarkWriter
+from app.processing.policy import PoseConfig, tier_fps
+from app.processing.pose_estimator import record_throughput
+from app.telemetry import log
+
+# Clips shorter than two chunks of this many frames run sequentially
+MIN_CHUNK_FRAMES = int(os.getenv("LANDMARK_CHUNK_MIN_FRAMES", "750"))
+# Sampled frames inferred before each chunk and then discarded
+WARMUP_FRAMES = int(os.getenv("LANDMARK_CHUNK_WARMUP_FRAMES", "30"))
+ENABLED = os.getenv("LANDMARK_CHUNKING", "1") == "1"
+
+
+def chunk_ranges(total_frames: int, workers: int, stride: int = 1) -> List[Tuple[int, int, int]]:
+    """(warm-up start, start, end inclusive) per chunk; a single chunk when not worth splitting."""
+    count = min(max(workers, 1), max(total_frames // MIN_CHUNK_FRAMES, 1))
+    size = math.ceil(total_frames / count) if total_frames else 0
+    ranges = []
+    for start in range(0, total_frames, size or 1):
+        end = min(start + size, total_frames) - 1
+        ranges.append((max(start - WARMUP_FRAMES * stride, 0), start, end))
+    return ranges or [(0, 0, -1)]
+
+
+def parallelism(frame_count: int) -> int:
+    """How many chunks a clip of this length is split into (1 = sequential)."""
+    from app import workers
+    if not ENABLED:
+        return 1
+    return len(chunk_ranges(int(frame_count or 0), workers.WORKER_PROCESSES))
+
+
+def analyze_shot_chunked(video_path: str, job_id: str, config: PoseConfig, output_path: str,
+                         probe: Dict[str, Any], previews=None) -> Dict[str, Any]:
+    """
+    Same output file and summary as analyze_shot(..., output_path=...), inferred in
+    parallel. previews (a PreviewCollector) receives every chunk's preview frames.
+    """
+    from app import workers
+    total = int(probe.get("frame_count") or 0)
+    ranges = chunk_ranges(total, workers.WORKER_PROCESSES, config.stride)
+    parts = [f"{output_path}.part{i}" for i in range(len(ranges))]
+    futures = [workers.submit(workers.landmark_chunk, video_path, job_id, config, start, end, warm, part,
+                              previews is not None, cost=(end - warm) / config.stride / tier_fps(config.tier))
+               for (warm, start, end), part in zip(ranges, parts)]
+    log("landmarks_chunked", chunks=len(ranges), frames=total, warmup_frames=WARMUP_FRAMES)
+
+    header = {"job_id": job_id, "fps": probe.get("fps") or 25, "frame_count": total}
+    try:
+        chunks = [f.result() for f in futures]
+        with LandmarkWriter(output_path, header) as writer:
+            # Chunk order, not completion order: the merge is deterministic
+            for part in parts:
+                writer.append_frames(part)
+            pose_model = _merge_stats([c["pose_model"] for c in chunks])
+            if previews is not None:
+                for chunk in chunks:
+                    previews.absorb(chunk["previews"])
+            record_throughput(pose_model)
+            summary = {"pose_model": pose_model, "pose_config": config.as_dict(),
+                       "chunks": [{k: c[k] for k in ("start", "end", "frames_written")} for c in chunks]}
+            writer.close(summary)
+    finally:
+        for future in futures:
+            future.cancel()
+        for part in parts:
+            Path(part).unlink(missing_ok=True)
+    return {**header, **summary, "frames_written": writer.frames_written}
+
+
+def _merge_stats(stats: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # seconds is inference time summed over workers, not wall time
+    return {**stats[0], "frames": sum(s["frames"] for s in stats),
+            "seconds": round(sum(s["seconds"] for s in stats), 4)}
@@ -0,0 +1,274 @@
+# backend/app/processing/compare.py
+"""
+Whole-swing comparison of two landmark sequences by dynamic time warping.
+
+A swing is cut from backlift start to follow-through end (app.processing.phases),
+normalised for camera position (joints relative to the hip centre) and body
+scale (divided by the median torso length), and resampled to FRAMES frames, so
+every swing is one (FRAMES, joints, 2) array whatever its fps, speed or framing.
+
+DTW is restricted to a Sakoe-Chiba band of BAND x FRAMES frames and computed an
+anti-diagonal at a time, each diagonal one numpy operation over any number of
+candidate references. Searching a library first ranks references by LB_Keogh
+(squared distance of the query outside each reference's precomputed band
+envelope, a lower bound of the banded DTW cost) and only runs DTW while a
+reference's bound is below the best costs found so far.
+
+Costs are summed squared joint distances in torso lengths; `distance` is their
+root mean per frame. Deviation timelines give, per query frame and joint, the
+mean distance to the reference frames it was aligned with.
+"""
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.processing.phases import SwingPhases, _fill_gaps, detect_phases, poses_from_file
+from app.processing.pose import (JOINT_NAMES, LEFT_ANKLE, LEFT_ELBOW, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER,
+                                 LEFT_WRIST, NOSE, RIGHT_ANKLE, RIGHT_ELBOW, RIGHT_HIP, RIGHT_KNEE,
+                                 RIGHT_SHOULDER, RIGHT_WRIST, PoseSequence)
+
+# Frames every swing is resampled to
+FRAMES = int(os.getenv("COMPARE_FRAMES", "64"))
+# Sakoe-Chiba band half-width, as a fraction of FRAMES
+BAND = float(os.getenv("COMPARE_BAND", "0.1"))
+# References whose DTW is computed together once their lower bounds qualify
+DTW_BATCH = 32
+
+# The joints the shot metrics use
+JOINTS = (NOSE, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ELBOW, RIGHT_ELBOW, LEFT_WRIST, RIGHT_WRIST,
+          LEFT_HIP, RIGHT_HIP, LEFT_KNEE, RIGHT_KNEE, LEFT_ANKLE, RIGHT_ANKLE)
+JOINT_LABELS = tuple(JOINT_NAMES[j].lower() for j in JOINTS)
+_HIPS = [JOINTS.index(LEFT_HIP), JOINTS.index(RIGHT_HIP)]
+_SHOULDERS = [JOINTS.index(LEFT_SHOULDER), JOINTS.index(RIGHT_SHOULDER)]
+
+
+@dataclass
+class Swing:
+    """A normalised, resampled swing: `data` is (FRAMES, len(JOINTS), 2) float32."""
+    data: np.ndarray
+    # Source frame index of each resampled frame (fractional)
+    frames: np.ndarray
+    fps: float
+    phases: Optional[SwingPhases] = None
+
+    @property
+    def span(self) -> Tuple[int, int]:
+        return int(round(self.frames[0])), int(round(self.frames[-1]))
+
+
+def radius(frames: int = FRAMES) -> int:
+    return max(int(np.ceil(BAND * frames)), 1)
+
+
+# ---------------------------------------------------------------------------
+# Normalisation
+# ---------------------------------------------------------------------------
+
+def normalize(arr: np.ndarray, aspect: float = 1.0) -> np.ndarray:
+    """
+    (frames, 33, 4) landmarks -> (frames, len(JOINTS), 2) float64 relative to the
+    hip centre, in torso lengths, with x and y on one scale. Gaps are interpolated;
+    a joint never seen stays at the hip centre.
+    """
+    pts = arr[:, JOINTS, :2].astype(np.float64) * np.array([aspect, 1.0])
+    flat = _fill_gaps(pts.reshape(len(pts), -1)).reshape(pts.shape)
+    with np.errstate(invalid="ignore"):
+        hips = np.nanmean(flat[:, _HIPS], axis=1, keepdims=True)
+        torso = np.linalg.norm(np.nanmean(flat[:, _SHOULDERS], axis=1) - hips[:, 0], axis=1)
+    scale = np.nanmedian(torso) if np.any(torso > 0) else 1.0
+    return np.nan_to_num((flat - np.nan_to_num(hips)) / max(float(scale), 1e-6))
+
+
+def resample(values: np.ndarray, frames: int = FRAMES) -> np.ndarray:
+    """Linear resampling along the first axis to `frames` rows."""
+    n = len(values)
+    flat = values.reshape(n, -1)
+    if n == 1:
+        return np.repeat(values, frames, axis=0)
+    t = np.linspace(0, n - 1, frames)
+    i = np.minimum(t.astype(int), n - 2)
+    w = (t - i)[:, None]
+    out = flat[i] * (1 - w) + flat[i + 1] * w
+    return out.reshape((frames,) + values.shape[1:])
+
+
+def swing_from_sequence(seq: PoseSequence, fps: float, aspect: float = 1.0,
+                        frames: int = FRAMES) -> Optional[Swing]:
+    """The swing in a pose sequence (the whole sequence when no phases are found), or None if empty."""
+    if not len(seq) or not seq.detected().any():
+        return None
+    phases = detect_phases(seq, fps, aspect)
+    first = int(seq.frames[0])
+    if phases is not None:
+        start, end = phases.events["backlift_start"] - first, phases.events["follow_through_end"] - first
+    else:
+        start, end = 0, len(seq) - 1
+    window = seq.data[start:end + 1]
+    data = resample(normalize(window, aspect), frames).astype(np.float32)
+    return Swing(data, np.linspace(first + start, first + end, frames), fps, phases)
+
+
+def swing_from_file(path: str, width: int, height: int, fps: float,
+                    frame_range: Optional[Tuple[int, int]] = None) -> Optional[Swing]:
+    """The swing in a stored landmarks file."""
+    seq = PoseSequence.from_poses(poses_from_file(path, frame_range))
+    return swing_from_sequence(seq, fps, width / height)
+
+
+# ---------------------------------------------------------------------------
+# Lower bound and DTW
+# ---------------------------------------------------------------------------
+
+def envelope(refs: np.ndarray, r: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Upper and lower LB_Keogh envelopes of (refs, frames, dims) references: the max
+    and min of every dimension within r frames either side.
+    """
+    r = radius(refs.shape[1]) if r is None else r
+    upper = np.pad(refs, ((0, 0), (r, r), (0, 0)), constant_values=-np.inf)
+    lower = np.pad(refs, ((0, 0), (r, r), (0, 0)), constant_values=np.inf)
+    window = 2 * r + 1
+    upper = np.lib.stride_tricks.sliding_window_view(upper, window, axis=1).max(axis=-1)
+    lower = np.lib.stride_tricks.sliding_window_view(lower, window, axis=1).min(axis=-1)
+    return upper, lower
+
+
+def lb_keogh(query: np.ndarray, upper: np.ndarray, lower: np.ndarray) -> np.ndarray:
+    """(refs,) lower bounds of the banded DTW cost between a (frames, dims) query and each reference."""
+    above = np.maximum(query[None] - upper, 0.0)
+    below = np.maximum(lower - query[None], 0.0)
+    return np.einsum("rfd,rfd->r", above, above) + np.einsum("rfd,rfd->r", below, below)
+
+
+def _costs(query: np.ndarray, refs: np.ndarray) -> np.ndarray:
+    """(refs, query frames, ref frames) squared distances."""
+    q2 = np.einsum("fd,fd->f", query, query)
+    r2 = np.einsum("rfd,rfd->rf", refs, refs)
+    cross = np.einsum("id,rjd->rij", query, refs)
+    return np.maximum(q2[None, :, None] + r2[:, None, :] - 2 * cross, 0.0)
+
+
+@lru_cache(maxsize=16)
+def _diagonals(n: int, m: int, r: int) -> Tuple[Tuple[np.ndarray, np.ndarray], ...]:
+    """(i, j) cell indices of every anti-diagonal of the accumulated cost matrix within the band."""
+    out = []
+    for k in range(2, n + m + 1):
+        i = np.arange(max(1, k - m), min(n, k - 1) + 1)
+        j = k - i
+        keep = np.abs(i - j) <= r
+        if keep.any():
+            out.append((i[keep], j[keep]))
+    return tuple(out)
+
+
+def dtw(query: np.ndarray, refs: np.ndarray, r: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Banded DTW of a (n, dims) query against (refs, m, dims) references. Returns the
+    (refs,) total costs and the (refs, n + 1, m + 1) accumulated cost matrices
+    (inf outside the band) for alignment().
+    """
+    n, m = len(query), refs.shape[1]
+    r = max(radius(max(n, m)) if r is None else r, abs(n - m))
+    cost = _costs(query.astype(np.float64), refs.astype(np.float64))
+    acc = np.full((len(refs), n + 1, m + 1), np.inf)
+    acc[:, 0, 0] = 0.0
+    for i, j in _diagonals(n, m, r):
+        best = np.minimum(np.minimum(acc[:, i - 1, j - 1], acc[:, i - 1, j]), acc[:, i, j - 1])
+        acc[:, i, j] = cost[:, i - 1, j - 1] + best
+    return acc[:, n, m], acc
+
+
+def alignment(acc: np.ndarray) -> np.ndarray:
+    """Warping path of one accumulated cost matrix as (steps, 2) [query frame, reference frame]."""
+    i, j = acc.shape[0] - 1, acc.shape[1] - 1
+    path = [(i - 1, j - 1)]
+    while i > 1 or j > 1:
+        steps = ((i - 1, j - 1), (i - 1, j), (i, j - 1))
+        i, j = min(steps, key=lambda s: acc[s] if s[0] >= 1 and s[1] >= 1 else np.inf)
+        path.append((i - 1, j - 1))
+    return np.array(path[::-1])
+
+
+def distance(cost: float, frames: int) -> float:
+    """Root mean squared distance per frame, in torso lengths."""
+    return float(np.sqrt(max(cost, 0.0) / frames))
+
+
+# ---------------------------------------------------------------------------
+# Search and report
+# ---------------------------------------------------------------------------
+
+def nearest(query: np.ndarray, refs: np.ndarray, upper: np.ndarray, lower: np.ndarray,
+            k: int = 1) -> Tuple[List[Tuple[int, float]], Dict[str, int]]:
+    """
+    The k references with the smallest DTW cost to the (frames, dims) query, as
+    [(index, cost)], plus how many needed DTW. References are taken in lower-bound
+    order, DTW_BATCH at a time, until the next bound cannot beat the k-th best.
+    """
+    bounds = lb_keogh(query, upper, lower)
+    order = np.argsort(bounds, kind="stable")
+    best: List[Tuple[int, float]] = []
+    computed = 0
+    for lo in range(0, len(order), DTW_BATCH):
+        batch = order[lo:lo + DTW_BATCH]
+        if len(best) >= k:
+            batch = batch[bounds[batch] < best[-1][1]]
+            if not len(batch):
+                break
+        costs, _ = dtw(query, refs[batch])
+        computed += len(batch)
+        best = sorted(best + list(zip(batch.tolist(), costs.tolist())), key=lambda b: b[1])[:k]
+    return best, {"candidates": len(refs), "dtw": computed, "pruned": len(refs) - computed}
+
+
+def deviations(query: Swing, ref: Swing, acc: np.ndarray) -> Dict[str, Any]:
+    """
+    Per-joint deviation timelines along the warping path: for every resampled query
+    frame, the mean distance (torso lengths) of each joint from the reference frames
+    aligned to it, plus per-joint and per-phase summaries.
+    """
+    path = alignment(acc)
+    qi, rj = path[:, 0], path[:, 1]
+    dist = np.linalg.norm(query.data[qi].astype(np.float64) - ref.data[rj], axis=-1)
+    n = len(query.data)
+    counts = np.bincount(qi, minlength=n)[:, None]
+    timeline = np.zeros((n, len(JOINTS)))
+    np.add.at(timeline, qi, dist)
+    timeline /= np.maximum(counts, 1)
+    ref_frame = np.bincount(qi, weights=ref.frames[rj], minlength=n) / np.maximum(counts[:, 0], 1)
+
+    per_joint = {name: {"mean": round(float(timeline[:, j].mean()), 4), "max": round(float(timeline[:, j].max()), 4)}
+                 for j, name in enumerate(JOINT_LABELS)}
+    per_phase = {}
+    if query.phases is not None:
+        for name, span in query.phases.phases.items():
+            mask = (query.frames >= span[0]) & (query.frames <= span[1]) if span else None
+            if mask is not None and mask.any():
+                means = timeline[mask].mean(axis=0)
+                per_phase[name] = {"mean": round(float(means.mean()), 4),
+                                   "worst_joint": JOINT_LABELS[int(np.argmax(means))]}
+    return {
+        "joints": list(JOINT_LABELS),
+        "frames": np.round(query.frames, 2).tolist(),
+        "reference_frames": np.round(ref_frame, 2).tolist(),
+        # One row per query frame, one column per joint
+        "timeline": np.round(timeline, 4).tolist(),
+        "per_joint": per_joint,
+        "worst_joints": [JOINT_LABELS[j] for j in np.argsort(-timeline.mean(axis=0))[:3]],
+        "per_phase": per_phase,
+    }
+
+
+def flat(data: np.ndarray) -> np.ndarray:
+    """(..., frames, joints, 2) -> (..., frames, joints * 2), the layout DTW works on."""
+    return data.reshape(data.shape[:-2] + (data.shape[-2] * data.shape[-1],))
+
+
+def compare(query: Swing, ref: Swing) -> Dict[str, Any]:
+    """DTW distance and deviation timelines of one swing against one reference."""
+    costs, acc = dtw(flat(query.data), flat(ref.data)[None])
+    return {"distance": round(distance(float(costs[0]), len(query.data)), 4),
+            **deviations(query, ref, acc[0])}
@@ -0,0 +1,132 @@
+# backend/app/processing/data_track.py
+"""
+A compact, time-aligned data track per job for drawing the overlay in the
+browser over the original video: per-frame landmarks, the HUD metrics the
+server overlay shows (elbow, spine, head-knee, foot angles) and its feedback
+cue. Built from the stored landmarks, so it needs no decode or inference. The
+same HUD and cue functions drive generate_overlay_video, but that pass infers
+its own poses (with the overlay stage's tier and stride), so the video can
+differ from the track where the two passes' poses differ.
+
+    {"version": 1, "job_id", "fps", "frame_count", "width", "height",
+     "layout": ["x", "y", "z", "visibility"], "connections": [[11, 13], ...],
+     "hud": ["elbow", "spine", "head_knee_dx", "foot_angle"],
+     "cues": ["Adjust your elbow angle", ...],
+     "frames": [{"frame": 0, "t": 0.0, "pose": [[x, y, z, v], ...], "hud": [...], "cue": 0}, ...],
+     "issues": {"Elbow angle needs improvement": [0.4, ...]}, "phases": {...}}
+
+A frame without a detection has "pose": null and no hud or cue. cue indexes
+"cues". Coordinates are normalised to the frame, as in the landmarks result.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.processing.landmark_stream import iter_frames
+from app.processing.pose import (LEFT_ANKLE, LEFT_ELBOW, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, LEFT_WRIST, NOSE,
+                                 Pose, PoseSequence)
+
+FORMAT_VERSION = 1
+HUD_FIELDS = ("elbow", "spine", "head_knee_dx", "foot_angle")
+# Decimal places kept for coordinates (0.1 px at 1000 px) and visibility
+COORD_DECIMALS = 4
+VISIBILITY_DECIMALS = 2
+
+# First failing check wins; (cue shown on the frame, issue logged for the evaluation)
+FEEDBACK_RULES = (
+    (lambda h: not 100 <= h["elbow"] <= 145, "Adjust your elbow angle", "Elbow angle needs improvement"),
+    (lambda h: not 10 <= h["spine"] <= 25, "Maintain spine balance", "Posture is inconsistent"),
+    (lambda h: h["head_knee_dx"] > 50, "Bring head over front knee", "Head not aligned over knee"),
+    (lambda h: h["foot_angle"] >= 45, "Point front foot forward", "Front foot alignment off"),
+)
+GOOD_CUE = "Good posture!"
+CUES = tuple(rule[1] for rule in FEEDBACK_RULES) + (GOOD_CUE,)
+
+
+def hud_series(arr: np.ndarray, width: int, height: int) -> Dict[str, np.ndarray]:
+    """HUD metrics (whole degrees / pixels, as displayed) for every row of a (frames, 33, 4) array."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pts = arr[:, :, :2] * np.array([width, height])
+        shoulder, elbow, wrist = pts[:, LEFT_SHOULDER], pts[:, LEFT_ELBOW], pts[:, LEFT_WRIST]
+        hip, knee, ankle = pts[:, LEFT_HIP], pts[:, LEFT_KNEE], pts[:, LEFT_ANKLE]
+        nose = pts[:, NOSE]
+
+        ab, cb = shoulder - elbow, wrist - elbow
+        cos = np.einsum("ij,ij->i", ab, cb) / (np.linalg.norm(ab, axis=1) * np.linalg.norm(cb, axis=1))
+        elbow_angle = np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+        spine = shoulder - hip
+        spine_angle = np.degrees(np.arccos(np.clip(-spine[:, 1] / np.linalg.norm(spine, axis=1), -1.0, 1.0)))
+        head_knee_dx = np.abs(nose[:, 0] - knee[:, 0])
+        leg = ankle - knee
+        foot_angle = np.degrees(np.arccos(np.clip(leg[:, 0] / np.linalg.norm(leg, axis=1), -1.0, 1.0)))
+        # Displayed as int() of each value; the foot angle folds after truncation
+        hud = {"elbow": np.trunc(elbow_angle), "spine": np.trunc(spine_angle),
+               "head_knee_dx": np.trunc(head_knee_dx), "foot_angle": np.trunc(foot_angle)}
+        hud["foot_angle"] = np.where(hud["foot_angle"] > 90, 180 - hud["foot_angle"], hud["foot_angle"])
+    return hud
+
+
+def feedback_cue(hud: Dict[str, int]) -> Tuple[str, Optional[str]]:
+    """(cue for the frame, issue to log or None) for one frame's HUD values."""
+    for check, cue, issue in FEEDBACK_RULES:
+        if check(hud):
+            return cue, issue
+    return GOOD_CUE, None
+
+
+def _round_pose(pose: Pose) -> List[List[float]]:
+    return [[round(x, COORD_DECIMALS), round(y, COORD_DECIMALS), round(z, COORD_DECIMALS),
+             round(v, VISIBILITY_DECIMALS)] for x, y, z, v in pose.data.tolist()]
+
+
+def build_track(landmarks_path: str, job_id: str, fps: float, frame_count: int,
+                width: int, height: int) -> Dict[str, Any]:
+    """The data track for a landmarks file (see the module docstring)."""
+    records = list(iter_frames(landmarks_path))
+    detected = [r for r in records if r.get("pose")]
+    seq = PoseSequence.stack((Pose.from_dicts(r["pose"]) for r in detected), [r["frame"] for r in detected])
+    hud = hud_series(seq.data, width, height)
+    by_frame = {r["frame"]: i for i, r in enumerate(detected)}
+
+    frames, issues = [], {}
+    for r in records:
+        t = r["frame"] / fps
+        entry: Dict[str, Any] = {"frame": r["frame"], "t": round(t, 3), "pose": None}
+        i = by_frame.get(r["frame"])
+        if i is not None:
+            values = {k: int(hud[k][i]) for k in HUD_FIELDS if not np.isnan(hud[k][i])}
+            entry["pose"] = _round_pose(seq[i])
+            if len(values) == len(HUD_FIELDS):
+                cue, issue = feedback_cue(values)
+                entry["hud"] = [values[k] for k in HUD_FIELDS]
+                entry["cue"] = CUES.index(cue)
+                if issue:
+                    # Same log the overlay pass keeps: one entry per issue per 0.1 s
+                    times = issues.setdefault(issue, [])
+                    ts = round(float(t), 1)
+                    if ts not in times:
+                        times.append(ts)
+        frames.append(entry)
+
+    from app.processing.pose_estimator import POSE_CONNECTIONS
+    return {
+        "version": FORMAT_VERSION,
+        "job_id": job_id,
+        "fps": fps,
+        "frame_count": frame_count,
+        "width": width,
+        "height": height,
+        "layout": ["x", "y", "z", "visibility"],
+        "connections": [list(c) for c in sorted(POSE_CONNECTIONS)],
+        "hud": list(HUD_FIELDS),
+        "cues": list(CUES),
+        "frames": frames,
+        "issues": issues,
+    }
+
+
+def write_track(path: str, track: Dict[str, Any]) -> str:
+    with open(path, "w") as f:
+        json.dump(track, f, separators=(",", ":"))
+    return path
@@ -0,0 +1,239 @@
+# backend/app/processing/derivatives.py
+"""
+Preview images for the dashboard, captured from frames the landmark pass is
+already decoding: a poster (the clean source frame at impact), the same frame
+with the skeleton drawn, and a sprite sheet of small skeleton tiles for
+scrubbing, each as JPEG and, where OpenCV can write it, WebP. A
+{job_id}_preview.json manifest lists them with the sprite geometry, so no
+extra decode is needed, every upload gets previews whether or not an overlay
+video is rendered, and the browser never has to load a video just to preview it.
+
+Impact is placed by phase detection on the stored landmarks once the pass is
+done. While the frames go past, the collector keeps a poster candidate for each
+of the few fastest hand movements so far (the frame with the lowest hands
+around it, which is how phase detection finds impact), holding only the last
+IMPACT_BEFORE_S of frames; write() takes the candidate nearest the detected
+impact. Without a swing the poster is the clip's first frame.
+"""
+import json
+import math
+import os
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.processing.phases import IMPACT_AFTER_S, IMPACT_BEFORE_S
+from app.processing.pose import LEFT_WRIST, RIGHT_WRIST, Pose
+from app.processing.pose_estimator import draw_skeleton
+from app.storage import static_url
+
+SPRITE_INTERVAL_S = float(os.getenv("PREVIEW_SPRITE_INTERVAL_S", "0.5"))
+SPRITE_TILE_WIDTH = int(os.getenv("PREVIEW_SPRITE_TILE_WIDTH", "160"))
+SPRITE_COLUMNS = int(os.getenv("PREVIEW_SPRITE_COLUMNS", "10"))
+# Long clips sample more sparsely rather than growing the sheet
+MAX_SPRITE_TILES = int(os.getenv("PREVIEW_MAX_SPRITE_TILES", "100"))
+POSTER_MAX_WIDTH = int(os.getenv("PREVIEW_POSTER_MAX_WIDTH", "1280"))
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+# Weight of the newest hand position in the running average the speed is taken from
+HAND_SMOOTHING = 0.5
+# Fastest hand movements that keep a poster candidate
+POSTER_CANDIDATES = int(os.getenv("PREVIEW_POSTER_CANDIDATES", "3"))
+
+WEBP = cv2.haveImageWriter(".webp")
+
+
+def _resize(frame: np.ndarray, width: int) -> np.ndarray:
+    h, w = frame.shape[:2]
+    if w <= width:
+        return frame.copy()
+    return cv2.resize(frame, (width, max(int(round(h * width / w)), 1)), interpolation=cv2.INTER_AREA)
+
+
+def write_image(path: Path, image: np.ndarray) -> Dict[str, str]:
+    """Write path.jpg (and path.webp when supported); {format: static url}."""
+    out = {}
+    jpg = path.with_suffix(".jpg")
+    cv2.imwrite(str(jpg), image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    out["jpg"] = static_url(str(jpg))
+    if WEBP:
+        webp = path.with_suffix(".webp")
+        cv2.imwrite(str(webp), image, [cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY])
+        out["webp"] = static_url(str(webp))
+    return out
+
+
+def _hand(pose: Pose, aspect: float) -> Optional[np.ndarray]:
+    """Mean wrist position in frame heights, as phase detection takes it; None without one."""
+    hand = np.nanmean(pose.data[[LEFT_WRIST, RIGHT_WRIST], :2], axis=0, dtype=np.float64)
+    return None if np.isnan(hand).any() else hand * (aspect, 1.0)
+
+
+@dataclass
+class _Swing:
+    """A fast hand movement: its peak speed, how long impact is searched for after it, and the best frame."""
+    peak_speed: float
+    end: int
+    # (frame, image, pose, hand y); the lowest hands are the largest y
+    best: Tuple[int, np.ndarray, Pose, float]
+
+
+class PreviewCollector:
+    """
+    Fed every decoded frame of a landmark pass with the pose inferred on it:
+    frame(idx, image, pose). Only the frames it needs are kept or copied. A pass
+    split over pool workers collects per chunk; the chunks' state() is folded
+    into one collector with absorb(), in chunk order.
+    """
+
+    def __init__(self, fps: float, total_frames: int, aspect: float = 1.0):
+        self.fps = fps or 25
+        self.aspect = aspect or 1.0
+        self.step = max(int(round(SPRITE_INTERVAL_S * self.fps)),
+                        math.ceil(max(total_frames, 1) / MAX_SPRITE_TILES), 1)
+        self.before = max(int(round(IMPACT_BEFORE_S * self.fps)), 1)
+        self.after = max(int(round(IMPACT_AFTER_S * self.fps)), 1)
+        self.tiles: List[np.ndarray] = []
+        self.tile_frames: List[int] = []
+        self.next_tile = 0
+        self.first: Optional[Tuple[int, np.ndarray]] = None
+        # Smoothed hand position, the last IMPACT_BEFORE_S of frames with one, and
+        # the fastest movements so far (the last one is still open while end >= idx)
+        self.hand: Optional[np.ndarray] = None
+        self.hand_frame = 0
+        self.recent: deque = deque()
+        self.swings: List[_Swing] = []
+
+    def frame(self, idx: int, image: np.ndarray, pose: Optional[Pose]) -> None:
+        if self.first is None:
+            self.first = (idx, image)
+        if idx >= self.next_tile and len(self.tiles) < MAX_SPRITE_TILES:
+            tile = _resize(image, SPRITE_TILE_WIDTH)
+            if pose:
+                draw_skeleton(tile, pose)
+            self.tiles.append(tile)
+            self.tile_frames.append(idx)
+            self.next_tile = idx + self.step
+        hand = _hand(pose, self.aspect) if pose else None
+        if hand is None:
+            return
+
+        entry = (idx, image, pose, float(hand[1]))
+        speed = 0.0
+        if self.hand is not None:
+            hand = HAND_SMOOTHING * hand + (1 - HAND_SMOOTHING) * self.hand
+            speed = float(np.hypot(*(hand - self.hand))) / max(idx - self.hand_frame, 1)
+        self.hand, self.hand_frame = hand, idx
+        self.recent.append(entry)
+        while self.recent[0][0] < idx - self.before:
+            self.recent.popleft()
+
+        current = self.swings[-1] if self.swings and self.swings[-1].end >= idx else None
+        if current is not None:
+            if speed > current.peak_speed:
+                # Still speeding up: impact is searched for around the new peak
+                current.peak_speed, current.end = speed, idx + self.after
+                current.best = max([current.best, *self.recent], key=lambda e: e[3])
+            elif entry[3] > current.best[3]:
+                current.best = entry
+        elif speed > 0 and (len(self.swings) < POSTER_CANDIDATES
+                            or speed > min(s.peak_speed for s in self.swings)):
+            self.swings.append(_Swing(speed, idx + self.after, max(self.recent, key=lambda e: e[3])))
+            if len(self.swings) > POSTER_CANDIDATES:
+                self.swings.remove(min(self.swings[:-1], key=lambda s: s.peak_speed))
+
+    def state(self) -> Dict[str, Any]:
+        """What write() needs, small and picklable, for returning from a pool worker."""
+        first = (self.first[0], _resize(self.first[1], POSTER_MAX_WIDTH)) if self.first else None
+        swings = [(s.peak_speed, s.best[0], _resize(s.best[1], POSTER_MAX_WIDTH), s.best[2]) for s in self.swings]
+        return {"tiles": self.tiles, "tile_frames": self.tile_frames, "first": first, "swings": swings}
+
+    def absorb(self, state: Dict[str, Any]) -> None:
+        """Fold in a chunk's state; chunks must be absorbed in frame order."""
+        room = MAX_SPRITE_TILES - len(self.tiles)
+        self.tiles.extend(state["tiles"][:room])
+        self.tile_frames.extend(state["tile_frames"][:room])
+        if self.first is None and state["first"] is not None:
+            self.first = state["first"]
+        swings = self.swings + [_Swing(speed, idx, (idx, image, pose, 0.0)) for speed, idx, image, pose in state["swings"]]
+        self.swings = sorted(swings, key=lambda s: -s.peak_speed)[:POSTER_CANDIDATES]
+
+    def _sprite(self) -> np.ndarray:
+        th, tw = self.tiles[0].shape[:2]
+        columns = min(SPRITE_COLUMNS, len(self.tiles))
+        rows = math.ceil(len(self.tiles) / columns)
+        sheet = np.zeros((rows * th, columns * tw, 3), dtype=np.uint8)
+        for i, tile in enumerate(self.tiles):
+            r, c = divmod(i, columns)
+            h, w = tile.shape[:2]
+            sheet[r * th:r * th + h, c * tw:c * tw + w] = tile
+        return sheet
+
+    def write(self, output_dir: str, job_id: str, impact: Optional[int] = None) -> Optional[str]:
+        """
+        Write the images and the manifest; the manifest's path, or None if no frame
+        came past. The poster is the candidate nearest impact (detected on the stored
+        landmarks), else the one at the fastest movement.
+        """
+        if self.first is None and not self.tiles:
+            return None
+        prefix = Path(output_dir) / f"{job_id}_preview"
+        manifest: Dict[str, Any] = {"webp": WEBP}
+        if self.swings:
+            if impact is not None:
+                swing = min(self.swings, key=lambda s: abs(s.best[0] - impact))
+            else:
+                swing = max(self.swings, key=lambda s: s.peak_speed)
+            idx, image, pose = swing.best[:3]
+            poster = _resize(image, POSTER_MAX_WIDTH)
+            manifest["poster"] = {"frame": idx, **write_image(Path(f"{prefix}_poster"), poster)}
+            draw_skeleton(poster, pose)
+            manifest["keyframe"] = {"frame": idx, **write_image(Path(f"{prefix}_keyframe"), poster)}
+        elif self.first is not None:
+            manifest["poster"] = {"frame": self.first[0],
+                                  **write_image(Path(f"{prefix}_poster"), _resize(self.first[1], POSTER_MAX_WIDTH))}
+        if self.tiles:
+            th, tw = self.tiles[0].shape[:2]
+            manifest["sprite"] = {
+                "columns": min(SPRITE_COLUMNS, len(self.tiles)),
+                "tile_width": tw,
+                "tile_height": th,
+                "interval_s": round(self.step / self.fps, 3),
+                # Tile i shows this frame of the clip
+                "frames": self.tile_frames,
+                **write_image(Path(f"{prefix}_sprite"), self._sprite()),
+            }
+        path = f"{prefix}.json"
+        with open(path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        return path
+
+
+def collect_from_landmarks(video_path: str, landmarks_path: str) -> PreviewCollector:
+    """
+    Rebuild a clip's previews from its stored landmarks, decoding without inference
+    (for /storage/regenerate after the previews were evicted).
+    """
+    from app.processing.phases import poses_from_file
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video: {video_path}")
+    width, height = cap.get(cv2.CAP_PROP_FRAME_WIDTH), cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+    previews = PreviewCollector(cap.get(cv2.CAP_PROP_FPS) or 25, int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0),
+                                width / height if height else 1.0)
+    poses = poses_from_file(landmarks_path)
+    idx = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            previews.frame(idx, frame, poses.get(idx))
+            idx += 1
+    finally:
+        cap.release()
+    return previews
@@ -0,0 +1,64 @@
+# backend/app/processing/embedding.py
+"""
+Fixed-length swing embeddings for similarity search (app.similarity).
+
+Both halves are phase-aligned, so swings of any length, speed or framing line
+up: for each of the five phases, the shot metrics at the phase's key frame and
+the body pose there (app.processing.compare's normalisation: hip-centred, in
+torso lengths). Metrics are expressed relative to the shot's acceptable ranges
+((value - centre) / half-width), so a fault reads the same on every metric.
+Each half is scaled to unit length and the whole vector to unit length, so
+the dot product of two embeddings is their cosine similarity.
+"""
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from app.processing.compare import JOINTS, normalize
+from app.processing.phases import PHASES, SwingPhases
+from app.processing.pose import PoseSequence
+
+POSE_DIMS = len(JOINTS) * 2
+# Relative metric values are clipped to this many half-widths
+METRIC_CLIP = 5.0
+DTYPE = np.float32
+
+
+def dims(metrics: int) -> int:
+    return len(PHASES) * (metrics + POSE_DIMS)
+
+
+def phase_poses(seq: PoseSequence, phases: SwingPhases, aspect: float = 1.0) -> Dict[str, List[List[float]]]:
+    """Normalised (joints, 2) pose at each phase's key frame, rounded, for the analysis result."""
+    data = normalize(seq.data, aspect)
+    first = int(seq.frames[0])
+    return {name: np.round(data[frame - first], 4).tolist() for name, frame in phases.key_frames().items()}
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else v
+
+
+def embed(phase_metrics: Optional[Mapping[str, Any]], poses: Optional[Mapping[str, Sequence]],
+          acceptable_ranges: Mapping[str, Sequence[float]]) -> Optional[np.ndarray]:
+    """
+    The embedding of one analysed swing from its result's phase_metrics and
+    phase_poses, or None when the swing's phases were not found.
+    """
+    if not phase_metrics:
+        return None
+    names = list(acceptable_ranges)
+    bounds = np.array([acceptable_ranges[n] for n in names], dtype=np.float64)
+    centre, half = bounds.mean(axis=1), np.maximum((bounds[:, 1] - bounds[:, 0]) / 2, 1e-6)
+
+    metrics = np.zeros((len(PHASES), len(names)))
+    pose = np.zeros((len(PHASES), POSE_DIMS))
+    for p, phase in enumerate(PHASES):
+        values = (phase_metrics.get(phase) or {}).get("metrics") or {}
+        row = np.array([values.get(n, np.nan) for n in names], dtype=np.float64)
+        metrics[p] = np.nan_to_num(np.clip((row - centre) / half, -METRIC_CLIP, METRIC_CLIP))
+        if poses and poses.get(phase):
+            pose[p] = np.asarray(poses[phase], dtype=np.float64).reshape(-1)[:POSE_DIMS]
+    vector = np.concatenate([_unit(metrics.reshape(-1)), _unit(pose.reshape(-1))])
+    return _unit(vector).astype(DTYPE)
@@ -0,0 +1,159 @@
+# backend/app/processing/landmark_stream.py
+"""
+Landmark results as JSON Lines, written while the clip is being processed.
+
+    {"type": "header", "version": 1, "job_id": ..., "fps": ..., "frame_count": ...}
+    {"type": "frame", "frame": 0, "pose": [{"x": ..., "y": ..., "z": ..., "visibility": ...}, ...]}
+    ...
+    {"type": "footer", "frames_written": ..., "pose_model": {...}, "pose_config": {...}}
+
+Memory stays flat however long the clip is: each frame is written as soon as it
+has been inferred and the buffer is flushed every FLUSH_EVERY frames. A file
+without a footer is a partial result (still being written, or the job died);
+readers stop at the last complete line. Results written before this format
+(one *_landmarks.json document) are still readable.
+"""
+import json
+import os
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+FORMAT_VERSION = 1
+FLUSH_EVERY = int(os.getenv("LANDMARK_FLUSH_FRAMES", "25"))
+
+
+class LandmarkWriter:
+    """Append-only writer; use as a context manager and call close(footer) when done."""
+
+    def __init__(self, path: str, header: Dict[str, Any]):
+        self.path = path
+        self.frames_written = 0
+        self._f = open(path, "w")
+        self._write({"type": "header", "version": FORMAT_VERSION, **header})
+        self._f.flush()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(record, separators=(",", ":")))
+        self._f.write("\n")
+
+    def write_frame(self, frame: Dict[str, Any]) -> None:
+        self._write({"type": "frame", **frame})
+        self.frames_written += 1
+        if self.frames_written % FLUSH_EVERY == 0:
+            self._f.flush()
+
+    def append_frames(self, path: str) -> int:
+        """Copy the frame lines of another landmark file verbatim (merging chunk results)."""
+        copied = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if line.startswith(b'{"type":"frame"') and line.endswith(b"\n"):
+                    self._f.write(line.decode())
+                    copied += 1
+        self.frames_written += copied
+        self._f.flush()
+        return copied
+
+    def close(self, footer: Optional[Dict[str, Any]] = None) -> None:
+        """Write the footer (marks the result complete) and close; without one the file stays partial."""
+        if self._f.closed:
+            return
+        if footer is not None:
+            self._write({"type": "footer", "frames_written": self.frames_written, **footer})
+        self._f.close()
+
+    def __enter__(self) -> "LandmarkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # An exception leaves no footer, so readers see the result as partial
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def _is_legacy(path: str) -> bool:
+    return path.endswith(".json")
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Header, frame and footer records in file order, skipping a torn or corrupt line."""
+    if _is_legacy(path):
+        with open(path) as f:
+            doc = json.load(f)
+        frames = doc.pop("frames", [])
+        pose_model, pose_config = doc.pop("pose_model", None), doc.pop("pose_config", None)
+        yield {"type": "header", "version": 0, **doc}
+        for frame in frames:
+            yield {"type": "frame", **frame}
+        yield {"type": "footer", "frames_written": len(frames),
+               "pose_model": pose_model, "pose_config": pose_config}
+        return
+
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                # The writer is part-way through this line
+                break
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def iter_frames(path: str) -> Iterator[Dict[str, Any]]:
+    """{"frame", "pose"} dicts, one at a time."""
+    for record in iter_records(path):
+        if record.get("type") == "frame":
+            record.pop("type")
+            yield record
+
+
+def read_summary(path: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], int]:
+    """(header, footer or None if partial, frames readable so far) without keeping the frames."""
+    header, footer, frames = {}, None, 0
+    for record in iter_records(path):
+        kind = record.pop("type", None)
+        if kind == "header":
+            header = record
+        elif kind == "frame":
+            frames += 1
+        elif kind == "footer":
+            footer = record
+    return header, footer, frames
+
+
+def is_complete(path: str, tail_bytes: int = 65536) -> bool:
+    """Whether the writer has finished (last line is the footer), reading only the end of the file."""
+    if _is_legacy(path):
+        return True
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(f.tell() - tail_bytes, 0))
+        lines = f.read().splitlines()
+    return bool(lines) and lines[-1].startswith(b'{"type":"footer"')
+
+
+def iter_json(path: str) -> Iterator[str]:
+    """
+    The result as one JSON document ({job_id, fps, frame_count, frames: [...],
+    pose_model, pose_config, complete}), produced piecewise for a streaming response.
+    """
+    footer = None
+    records = iter_records(path)
+    # The header is always the first line; an empty file has none yet
+    header = {k: v for k, v in next(records, {}).items() if k not in ("type", "version")}
+
+    yield json.dumps(header)[:-1]
+    yield (", " if header else "") + '"frames": ['
+    first = True
+    for record in records:
+        kind = record.pop("type", None)
+        if kind == "frame":
+            yield ("" if first else ", ") + json.dumps(record)
+            first = False
+        elif kind == "footer":
+            footer = record
+    tail = {"pose_model": None, "pose_config": None, **(footer or {}), "complete": footer is not None}
+    yield "], " + json.dumps(tail)[1:]
@@ -1,21 +1,80 @@
 import cv2
-import mediapipe as mp
 import math
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-mp_pose = mp.solutions.pose
+from app.processing.landmark_stream import LandmarkWriter
+from app.processing.policy import PoseConfig, default_config
+from app.telemetry import StageClock
 
-def _landmarks_to_list(landmark_list, width, height):
-    out = []
-    for lm in landmark_list.landmark:
-        out.append({"x": lm.x, "y": lm.y, "z": lm.z, "visibility": getattr(lm, "visibility", None)})
-    return out
+def probe_video(video_path: str) -> Dict[str, Any]:
+    """Container-level facts about a clip, read without decoding any frames."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    probe = {
+        "fps": fps,
+        "frame_count": frame_count,
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "duration_s": round(frame_count / fps, 3) if fps else None,
+    }
+    cap.release()
+    return probe
+
+def _landmark_frames(cap, pose, fps: float, stride: int, clock: StageClock, start: int = 0,
+                     end: Optional[int] = None, warmup_from: Optional[int] = None,
+                     previews=None):
+    """
+    Yield {"frame", "pose"} for every stride-th frame from start to end (inclusive; None
+    runs to the end of the clip). Frames from warmup_from up to start are inferred only
+    to prime the tracker, so a chunk starting mid-clip has converged by its first frame.
+    previews (a PreviewCollector), if given, is handed each of those frames with its pose.
+    """
+    frame_idx = start if warmup_from is None else warmup_from
+    if frame_idx:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+    while end is None or frame_idx <= end:
+        if frame_idx % stride:
+            if not cap.grab():
+                break
+            frame_idx += 1
+            clock.lap("decode")
+            continue
+        ret, frame = cap.read()
+        clock.lap("decode")
+        if not ret:
+            break
+
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        clock.lap("convert")
+        landmarks = pose.process(rgb, int(frame_idx * 1000 / fps))
+        clock.lap("inference")
+        if frame_idx >= start:
+            if previews is not None:
+                previews.frame(frame_idx, frame, landmarks)
+                clock.lap("preview")
+            data = {"frame": frame_idx, "pose": None}
+            if landmarks:
+                data["pose"] = landmarks.as_dicts()
+            yield data
+            clock.lap("serialize")
+        clock.frame_done(detected=bool(landmarks))
+
+        frame_idx += 1
 
-def analyze_shot(video_path: str, job_id: str, max_frames: int = None) -> Dict[str, Any]:
+
+def analyze_shot(video_path: str, job_id: str, max_frames: int = None,
+                 config: Optional[PoseConfig] = None,
+                 output_path: Optional[str] = None, previews=None) -> Dict[str, Any]:
     """
     Process a video and extract per-frame pose landmarks.
-    Returns a dict (serializable) with frames -> landmarks and meta.
+    Returns a dict (serializable) with frames -> landmarks and meta. With
+    output_path the frames are streamed there as JSON Lines instead of being
+    kept, and the returned dict carries only the meta and frames_written.
+    previews (a PreviewCollector) collects the preview images from the same decode.
     """
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
@@ -31,29 +90,79 @@ def analyze_shot(video_path: str, job_id: str, max_frames: int = None) -> Dict[s
         "frames": []
     }
 
-    pose = mp_pose.Pose(static_image_mode=False, model_complexity=1,
-                        min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    config = config or default_config("landmarks")
+    writer = None
+    pose = None
+    # sample rate: config.stride, 1 => every frame; the policy raises it under load
+    clock = StageClock("landmarks")
+    try:
+        if output_path:
+            writer = LandmarkWriter(output_path, {k: v for k, v in results.items() if k != "frames"})
+            del results["frames"]
+        pose = config.create_estimator()
 
-    frame_idx = 0
-    sample_rate = 1  # 1 => every frame, set to 2 to sample every other frame for speed
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        if max_frames and frame_idx >= max_frames:
-            break
+        end = max_frames - 1 if max_frames else None
+        for data in _landmark_frames(cap, pose, fps, config.stride, clock, end=end, previews=previews):
+            if writer:
+                writer.write_frame(data)
+            else:
+                results["frames"].append(data)
 
-        if frame_idx % sample_rate == 0:
-            h, w = frame.shape[:2]
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            res = pose.process(rgb)
-            data = {"frame": frame_idx, "pose": None}
-            if res.pose_landmarks:
-                data["pose"] = _landmarks_to_list(res.pose_landmarks, w, h)
-            results["frames"].append(data)
+        # Read the counters before close() flushes them into the throughput table
+        results["pose_model"] = {**pose.config(), **pose.stats()}
+        results["pose_config"] = config.as_dict()
+        if writer:
+            writer.close({"pose_model": results["pose_model"], "pose_config": results["pose_config"]})
+            results["frames_written"] = writer.frames_written
+    finally:
+        # Released on failure too, so a warm worker does not leak captures or graphs
+        cap.release()
+        if pose is not None:
+            pose.close()
+        # No-op once the footer is written; after a failure the file stays a readable partial
+        if writer:
+            writer.close()
+    clock.finish(tier=config.tier, stride=config.stride)
+    return results
 
-        frame_idx += 1
 
-    cap.release()
-    pose.close()
-    return results
+def analyze_chunk(video_path: str, job_id: str, config: PoseConfig, start: int, end: int,
+                  warmup_from: int, output_path: str, pose=None,
+                  previews: bool = False) -> Dict[str, Any]:
+    """
+    Landmarks for frames start..end of a clip, written to output_path like analyze_shot.
+    pose may be a shared (warm) estimator; it is reset afterwards rather than closed.
+    With previews=True the result carries the chunk's PreviewCollector state.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    collector = None
+    if previews:
+        from app.processing.derivatives import PreviewCollector
+        height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        collector = PreviewCollector(fps, int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0),
+                                     cap.get(cv2.CAP_PROP_FRAME_WIDTH) / height if height else 1.0)
+
+    owned = pose is None
+    pose = pose or config.create_estimator()
+    clock = StageClock("landmarks")
+    try:
+        with LandmarkWriter(output_path, {"job_id": job_id, "fps": fps, "chunk": [start, end]}) as writer:
+            for data in _landmark_frames(cap, pose, fps, config.stride, clock, start, end, warmup_from,
+                                         collector):
+                writer.write_frame(data)
+            pose_model = {**pose.config(), **pose.stats()}
+            writer.close({"pose_model": pose_model})
+    finally:
+        cap.release()
+        if owned:
+            pose.close()
+        else:
+            pose.reset()
+    clock.finish(tier=config.tier, stride=config.stride, chunk=[start, end])
+    result = {"start": start, "end": end, "frames_written": writer.frames_written, "pose_model": pose_model}
+    if collector is not None:
+        result["previews"] = collector.state()
+    return result
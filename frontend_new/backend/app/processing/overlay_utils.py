@@ -1,13 +1,16 @@
 # backend/app/processing/overlay_utils.py
 
 import cv2
-import mediapipe as mp
 import numpy as np
 import json
 from pathlib import Path
+from typing import Optional
 
-mp_pose = mp.solutions.pose
-mp_drawing = mp.solutions.drawing_utils
+from app.processing.data_track import feedback_cue, hud_series
+from app.processing.pose import NOSE
+from app.processing.pose_estimator import draw_skeleton
+from app.processing.policy import PoseConfig, default_config
+from app.telemetry import StageClock, log, timed_step
 
 
 def calculate_angle(a, b, c):
@@ -18,7 +21,8 @@ def calculate_angle(a, b, c):
     return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
 
 
-def generate_overlay_video(video_path: str, landmarks_json_path: str, output_path: str):
+def generate_overlay_video(video_path: str, landmarks_json_path: str, output_path: str,
+                           config: Optional[PoseConfig] = None):
     """
     Processes a video frame-by-frame, runs pose detection, overlays skeletons, metrics,
     and feedback text. Returns the path to the generated .issues.json file.
@@ -32,8 +36,8 @@ def generate_overlay_video(video_path: str, landmarks_json_path: str, output_pat
     fps = cap.get(cv2.CAP_PROP_FPS) or 25
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
-    pose = mp_pose.Pose(static_image_mode=False, model_complexity=1,
-                        min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    config = config or default_config("overlay")
+    pose = config.create_estimator()
     # Force WebM VP9 output since H264 is not available on Render
     output_path = str(Path(output_path).with_suffix(".webm"))
 
@@ -56,6 +60,9 @@ def generate_overlay_video(video_path: str, landmarks_json_path: str, output_pat
 
     def log_issue(issue, t):
         """Log feedback issues along with timestamps."""
+        if not sampled:
+            # A held pose says nothing new; logging it would inflate the issue counts
+            return
         if issue not in persistent_issues:
             persistent_issues[issue] = []
         ts = round(float(t), 1)
@@ -63,44 +70,33 @@ def generate_overlay_video(video_path: str, landmarks_json_path: str, output_pat
             persistent_issues[issue].append(ts)
 
     frame_count = 0
+    lm, sampled = None, True
+    clock = StageClock("overlay")
     while cap.isOpened():
         ret, frame = cap.read()
+        clock.lap("decode")
         if not ret:
             break
 
         time_sec = frame_count / fps
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = pose.process(rgb)
-
-        if results.pose_landmarks:
-            lm = results.pose_landmarks.landmark
-
-            def pt(idx):
-                return [lm[idx].x * frame_width, lm[idx].y * frame_height]
-
-            # --- Key joints ---
-            shoulder, elbow, wrist = map(pt, [mp_pose.PoseLandmark.LEFT_SHOULDER.value,
-                                              mp_pose.PoseLandmark.LEFT_ELBOW.value,
-                                              mp_pose.PoseLandmark.LEFT_WRIST.value])
-            hip, knee, ankle = map(pt, [mp_pose.PoseLandmark.LEFT_HIP.value,
-                                        mp_pose.PoseLandmark.LEFT_KNEE.value,
-                                        mp_pose.PoseLandmark.LEFT_ANKLE.value])
-            nose = pt(mp_pose.PoseLandmark.NOSE.value)
-
-            # --- Metrics ---
-            elbow_angle = int(calculate_angle(shoulder, elbow, wrist))
-            spine_vec = np.array(shoulder) - np.array(hip)
-            spine_unit = spine_vec / np.linalg.norm(spine_vec)
-            spine_angle = int(np.degrees(np.arccos(np.clip(np.dot(spine_unit, [0, -1]), -1.0, 1.0))))
-            head_knee_dx = int(abs(nose[0] - knee[0]))
-            leg_vec = np.array(ankle) - np.array(knee)
-            leg_unit = leg_vec / np.linalg.norm(leg_vec)
-            foot_angle = int(np.degrees(np.arccos(np.clip(np.dot(leg_unit, [1, 0]), -1.0, 1.0))))
-            if foot_angle > 90:
-                foot_angle = 180 - foot_angle
+        # Every frame is written; with a stride > 1 the last pose is held in between
+        sampled = frame_count % config.stride == 0
+        if sampled:
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            clock.lap("convert")
+            lm = pose.process(rgb, int(time_sec * 1000))
+            clock.lap("inference")
+
+        if lm:
+            # --- Metrics (shared with the client data track) ---
+            hud = {k: int(v[0]) for k, v in hud_series(lm.data[None], frame_width, frame_height).items()}
+            elbow_angle, spine_angle = hud["elbow"], hud["spine"]
+            head_knee_dx, foot_angle = hud["head_knee_dx"], hud["foot_angle"]
+            nose = lm.xy(frame_width, frame_height)[NOSE]
+            clock.lap("metrics")
 
             # --- Pose Skeleton ---
-            mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+            draw_skeleton(frame, lm)
 
             # --- HUD Metrics ---
             hud_y = 30
@@ -111,21 +107,9 @@ def generate_overlay_video(video_path: str, landmarks_json_path: str, output_pat
             draw_text(frame, f'Foot Dir: {foot_angle} deg', (10, hud_y + 3 * spacing), font_scale=0.6)
 
             # --- Feedback Logic ---
-            msg = ""
-            if not 100 <= elbow_angle <= 145:
-                msg = "Adjust your elbow angle"
-                log_issue("Elbow angle needs improvement", time_sec)
-            elif not 10 <= spine_angle <= 25:
-                msg = "Maintain spine balance"
-                log_issue("Posture is inconsistent", time_sec)
-            elif head_knee_dx > 50:
-                msg = "Bring head over front knee"
-                log_issue("Head not aligned over knee", time_sec)
-            elif foot_angle >= 45:
-                msg = "Point front foot forward"
-                log_issue("Front foot alignment off", time_sec)
-            else:
-                msg = "Good posture!"
+            msg, issue = feedback_cue(hud)
+            if issue:
+                log_issue(issue, time_sec)
 
             # --- Centered Live Message ---
             text_size = cv2.getTextSize(msg, cv2.FONT_HERSHEY_SIMPLEX, 1.2, 2)[0]
@@ -145,26 +129,35 @@ def generate_overlay_video(video_path: str, landmarks_json_path: str, output_pat
                           (frame_width - 470, y_offset), font_scale=0.6, color=(0, 0, 0))
                 y_offset += 25
 
+            clock.lap("draw")
+
         out.write(frame)
+        clock.lap("encode")
+        clock.frame_done(detected=bool(lm) if sampled else None)
         frame_count += 1
 
     cap.release()
     out.release()
+    clock.lap("encode")
     pose.close()
 
     # --- Save issues log ---
     issues_path = str(Path(output_path).with_suffix(".issues.json"))
     with open(issues_path, "w") as f:
         json.dump(persistent_issues, f, indent=2)
+    clock.lap("json_write")
+    clock.finish(tier=config.tier, stride=config.stride)
 
-    print(f"[Overlay] Saved annotated video: {output_path}")
-    print(f"[Overlay] Saved issues log: {issues_path}")
+    log("overlay_saved", video=output_path, issues=issues_path)
     return issues_path
 
 
-def generate_evaluation_json(issue_log_path: str, output_json_path: str):
+def generate_evaluation_json(issue_log_path: str, output_json_path: str,
+                             pose_config: Optional[dict] = None, follow_through: Optional[dict] = None):
     """
     Reads the .issues.json log, scores each category, and saves a summarized evaluation JSON.
+    pose_config (the overlay pass's configuration) is stored alongside the scores;
+    follow_through is the swing-phase evaluation (app.processing.phases), when available.
     """
     with open(issue_log_path) as f:
         issues = json.load(f)
@@ -191,10 +184,13 @@ def generate_evaluation_json(issue_log_path: str, output_json_path: str):
                             evaluate_category("Posture is inconsistent",
                                               "Maintain a consistent forward lean with a stable spine."))),
         "Swing Control": {"score": None, "feedback": "Not evaluated — bat tracking not implemented."},
-        "Follow-through": {"score": None, "feedback": "Not evaluated — follow-through not measured."}
+        "Follow-through": follow_through or {"score": None, "feedback": "Not evaluated — follow-through not measured."}
     }
 
-    with open(output_json_path, "w") as f:
+    if pose_config:
+        evaluation["pose_config"] = pose_config
+
+    with timed_step("evaluation", "json_write"), open(output_json_path, "w") as f:
         json.dump(evaluation, f, indent=4)
 
-    print(f"[Evaluation] Saved summary: {output_json_path}")
+    log("evaluation_saved", path=output_json_path)
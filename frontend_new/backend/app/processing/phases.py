@@ -0,0 +1,293 @@
+# backend/app/processing/phases.py
+"""
+Swing phases from a landmark time series: stance, backlift, downswing, impact
+and follow-through. Works on a whole PoseSequence at once from
+landmarks that already exist (the cascade's scan and refine passes, or a stored
+*_landmarks.jsonl), so it costs milliseconds and no extra inference.
+
+The hands (mean of both wrists) are gap-filled, smoothed and differentiated.
+The peak hand speed anchors the swing; the top of the backlift is the highest
+hand position before it, impact the lowest one around it (bat meets ball under
+the eyes), and backlift start and follow-through end are where the hands come
+to rest (low speed and acceleration) on either side.
+"""
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.processing.landmark_stream import iter_frames, iter_records
+from app.processing.pose import (LEFT_ANKLE, LEFT_ELBOW, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, LEFT_WRIST, NOSE,
+                                 RIGHT_ANKLE, RIGHT_ELBOW, RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER, RIGHT_WRIST, Y,
+                                 Pose, PoseSequence)
+
+PHASES = ("stance", "backlift", "downswing", "impact", "follow_through")
+
+# Moving-average width for positions before differentiating
+SMOOTH_S = float(os.getenv("PHASE_SMOOTH_S", "0.12"))
+# Hands are at rest below this fraction of the peak speed...
+REST_SPEED_RATIO = 0.2
+# ...and with acceleration below this fraction of the peak acceleration
+REST_ACCEL_RATIO = 0.25
+# How far before the peak the top of the backlift is searched for
+BACKLIFT_MAX_S = 1.2
+# Impact is searched for this far either side of the peak
+IMPACT_BEFORE_S = 0.15
+IMPACT_AFTER_S = 0.3
+# Frames either side of impact that make up the impact phase
+IMPACT_HALF_WIDTH_S = 0.04
+# Fewer hand detections than this and no phases are reported
+MIN_POINTS = 5
+
+# A follow-through shorter than this was checked rather than completed
+FOLLOW_THROUGH_MIN_S = 0.25
+# Head over the front knee at the finish, in % of frame width
+FINISH_HEAD_OFFSET = 10.0
+
+WRISTS = [LEFT_WRIST, RIGHT_WRIST]
+SHOULDERS = [LEFT_SHOULDER, RIGHT_SHOULDER]
+
+
+@dataclass
+class SwingPhases:
+    fps: float
+    # Inclusive frame ranges; None when a phase did not happen in the clip
+    phases: Dict[str, Optional[Tuple[int, int]]] = field(default_factory=dict)
+    # backlift_start, backlift_top, peak_speed, impact, follow_through_end
+    events: Dict[str, int] = field(default_factory=dict)
+    peak_speed: float = 0.0
+
+    def key_frames(self) -> Dict[str, int]:
+        """The frame each phase's metrics are taken at: the position the phase ends in."""
+        e = self.events
+        return {"stance": e["backlift_start"], "backlift": e["backlift_top"],
+                "downswing": e["peak_speed"], "impact": e["impact"],
+                "follow_through": e["follow_through_end"]}
+
+    def as_dict(self) -> Dict[str, Any]:
+        out = asdict(self)
+        out["phases"] = {k: list(v) if v else None for k, v in self.phases.items()}
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Landmark series
+# ---------------------------------------------------------------------------
+
+def poses_from_file(path: str, frame_range: Optional[Tuple[int, int]] = None) -> Dict[int, Pose]:
+    """Stored landmarks (optionally one inclusive frame range of them) as {frame: Pose}."""
+    first, last = frame_range or (0, None)
+    poses = {}
+    for frame in iter_frames(path):
+        idx = frame["frame"]
+        if frame.get("pose") and idx >= first and (last is None or idx <= last):
+            poses[idx] = Pose.from_dicts(frame["pose"])
+    return poses
+
+
+def _fill_gaps(values: np.ndarray) -> np.ndarray:
+    """Linear interpolation over NaN rows, column by column (edges hold the nearest value)."""
+    out = values.copy()
+    t = np.arange(len(values))
+    for col in range(values.shape[1]):
+        ok = ~np.isnan(values[:, col])
+        if ok.any():
+            out[:, col] = np.interp(t, t[ok], values[ok, col])
+    return out
+
+
+def _smooth(values: np.ndarray, width: int) -> np.ndarray:
+    if width < 2 or len(values) < width:
+        return values
+    kernel = np.ones(width) / width
+    padded = np.pad(values, ((width // 2, width - 1 - width // 2), (0, 0)), mode="edge")
+    return np.stack([np.convolve(padded[:, c], kernel, mode="valid") for c in range(values.shape[1])], axis=1)
+
+
+def hand_kinematics(arr: np.ndarray, fps: float, aspect: float = 1.0
+                    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    (hand position, speed, acceleration) per frame, filtered; positions in frame
+    heights so x and y are on one scale (aspect = width / height). None if the
+    hands were hardly seen.
+    """
+    hands = np.nanmean(arr[:, WRISTS, :2], axis=1, dtype=np.float64) if len(arr) else np.zeros((0, 2))
+    if np.count_nonzero(~np.isnan(hands[:, 0])) < MIN_POINTS:
+        return None
+    hands = _fill_gaps(hands) * np.array([aspect, 1.0])
+    hands = _smooth(hands, max(int(round(SMOOTH_S * fps)), 1))
+    velocity = np.gradient(hands, axis=0) * fps
+    speed = np.hypot(velocity[:, 0], velocity[:, 1])
+    accel = np.gradient(speed) * fps
+    return hands, speed, accel
+
+
+def peak_speed(poses: Dict[int, Pose], fps: float, aspect: float = 1.0) -> Optional[int]:
+    """Frame of the fastest filtered hand movement, as detect_phases anchors the swing."""
+    seq = PoseSequence.from_poses(poses)
+    kinematics = hand_kinematics(seq.data, fps, aspect)
+    return None if kinematics is None else int(seq.frames[int(np.argmax(kinematics[1]))])
+
+
+# ---------------------------------------------------------------------------
+# Phase detection
+# ---------------------------------------------------------------------------
+
+def detect_phases(seq: PoseSequence, fps: float, aspect: float = 1.0) -> Optional[SwingPhases]:
+    """Phases of the swing in a pose sequence, or None without enough hand detections."""
+    kinematics = hand_kinematics(seq.data, fps, aspect)
+    if kinematics is None:
+        return None
+    hands, speed, accel = kinematics
+    n = len(speed)
+    y = hands[:, 1]
+
+    peak = int(np.argmax(speed))
+    at_rest = (speed < REST_SPEED_RATIO * speed[peak]) & \
+              (np.abs(accel) < REST_ACCEL_RATIO * max(float(np.abs(accel).max()), 1e-9))
+
+    # Highest hands (smallest y) before the peak
+    lo = max(peak - int(round(BACKLIFT_MAX_S * fps)), 0)
+    top = lo + int(np.argmin(y[lo:peak + 1]))
+    # Lowest hands around the peak, after the top
+    lo = max(peak - int(round(IMPACT_BEFORE_S * fps)), top)
+    hi = min(peak + int(round(IMPACT_AFTER_S * fps)), n - 1)
+    impact = lo + int(np.argmax(y[lo:hi + 1]))
+
+    # Last rest frame before the hands start going up, first one after the finish
+    still = np.flatnonzero(at_rest[:top])
+    start = int(still[-1]) if len(still) else 0
+    still = np.flatnonzero(at_rest[impact:])
+    end = impact + int(still[0]) if len(still) else n - 1
+
+    half = max(int(round(IMPACT_HALF_WIDTH_S * fps)), 1)
+    bounds = {
+        "stance": (0, start),
+        "backlift": (start + 1, top),
+        "downswing": (top + 1, impact - half - 1),
+        "impact": (max(impact - half, min(top + 1, impact)), min(impact + half, max(end, impact))),
+        "follow_through": (impact + half + 1, end),
+    }
+    first = int(seq.frames[0])
+    return SwingPhases(
+        fps=fps,
+        phases={k: (first + a, first + b) if a <= b else None for k, (a, b) in bounds.items()},
+        events={"backlift_start": first + start, "backlift_top": first + top,
+                "peak_speed": first + peak, "impact": first + impact, "follow_through_end": first + end},
+        peak_speed=round(float(speed[peak]), 4),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Metrics over the series
+# ---------------------------------------------------------------------------
+
+def _angle(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Angle at b in degrees, per row."""
+    ba, bc = a - b, c - b
+    cos = np.einsum("ij,ij->i", ba, bc) / (np.linalg.norm(ba, axis=1) * np.linalg.norm(bc, axis=1))
+    return np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+
+
+def _direction(v: np.ndarray, unit: Sequence[float]) -> np.ndarray:
+    """Angle in degrees between each row of v and a unit vector."""
+    return np.degrees(np.arccos(np.clip(v @ np.asarray(unit, dtype=float) / np.linalg.norm(v, axis=1), -1, 1)))
+
+
+def metric_series(arr: np.ndarray, width: int, height: int) -> Dict[str, np.ndarray]:
+    """The shot analyzers' biomechanical metrics for every frame at once (NaN where undetected)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Scaling by float64 sizes also lifts the float32 landmarks to float64
+        pts = arr[:, :, :2] * np.array([width, height])
+        (nose, l_shoulder, r_shoulder, l_elbow, r_elbow, l_wrist, r_wrist,
+         l_hip, r_hip, l_knee, r_knee, l_ankle, r_ankle) = (pts[:, j] for j in (
+            NOSE, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ELBOW, RIGHT_ELBOW, LEFT_WRIST, RIGHT_WRIST,
+            LEFT_HIP, RIGHT_HIP, LEFT_KNEE, RIGHT_KNEE, LEFT_ANKLE, RIGHT_ANKLE))
+
+        hip_center = (l_hip + r_hip) / 2
+        shoulder_center = (l_shoulder + r_shoulder) / 2
+        foot_center_x = (l_ankle[:, 0] + r_ankle[:, 0]) / 2
+        return {
+            "front_elbow_angle": _angle(l_shoulder, l_elbow, l_wrist),
+            "back_elbow_angle": _angle(r_shoulder, r_elbow, r_wrist),
+            "torso_lean": _direction(shoulder_center - hip_center, (0, -1)),
+            "shoulder_alignment": _direction(r_shoulder - l_shoulder, (1, 0)),
+            "front_knee_angle": _angle(l_hip, l_knee, l_ankle),
+            "back_knee_angle": _angle(r_hip, r_knee, r_ankle),
+            "hip_rotation": _direction(r_hip - l_hip, (1, 0)),
+            "wrist_angle": _angle(l_elbow, l_wrist, l_wrist + np.array([1, 0])),
+            "head_position": (nose[:, 0] - l_knee[:, 0]) / width * 100,
+            "center_of_mass": (hip_center[:, 0] - foot_center_x) / width * 100,
+        }
+
+
+def phase_metrics(phases: SwingPhases, frames: np.ndarray, series: Dict[str, np.ndarray]
+                  ) -> Dict[str, Dict[str, Any]]:
+    """Per phase: its frame range, the frame its metrics come from and the metrics there."""
+    first = int(frames[0])
+    out = {}
+    for name, frame in phases.key_frames().items():
+        values = {k: float(v[frame - first]) for k, v in series.items()}
+        out[name] = {
+            "range": list(phases.phases[name]) if phases.phases[name] else None,
+            "frame": frame,
+            # The key frame itself may be undetected (interpolated over for timing only)
+            "metrics": {k: round(v, 2) for k, v in values.items() if not np.isnan(v)},
+        }
+    return out
+
+
+def evaluate_follow_through(phases: Optional[SwingPhases], seq: Optional[PoseSequence],
+                            series: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """
+    Follow-through score in the evaluation's 10/8/6/4 scale: the swing is carried
+    through rather than checked, the hands finish above the shoulders, and the
+    head is still over the front knee at the finish.
+    """
+    if phases is None:
+        return {"score": None, "feedback": "Not evaluated — the swing could not be found in the landmarks."}
+    end = phases.events["follow_through_end"] - int(seq.frames[0])
+    span = phases.phases["follow_through"]
+    duration = (span[1] - span[0] + 1) / phases.fps if span else 0.0
+
+    with np.errstate(invalid="ignore"):
+        hands_y = np.nanmean(seq.data[end, WRISTS, Y], dtype=np.float64)
+        shoulders_y = np.nanmean(seq.data[end, SHOULDERS, Y], dtype=np.float64)
+    head = series["head_position"][end]
+
+    faults = []
+    if duration < FOLLOW_THROUGH_MIN_S:
+        faults.append("the swing is checked instead of carried through")
+    if not hands_y < shoulders_y:
+        faults.append("the hands finish below the shoulders")
+    if not abs(head) <= FINISH_HEAD_OFFSET:
+        faults.append("the head falls away from the front knee at the finish")
+
+    desc = "Carry the bat through to a high, balanced finish."
+    if not faults:
+        score, feedback = 10, f"✅ Excellent. {desc}"
+    elif len(faults) == 1:
+        score, feedback = 8, f"⚠️ Minor issue: {faults[0]}. {desc}"
+    elif len(faults) == 2:
+        score, feedback = 6, f"❌ Needs improvement: {'; '.join(faults)}. {desc}"
+    else:
+        score, feedback = 4, f"❌ Major issues: {'; '.join(faults)}. {desc}"
+    return {"score": score, "feedback": feedback, "duration_s": round(duration, 2)}
+
+
+def analyze_file(path: str, width: int, height: int, fps: Optional[float] = None,
+                 frame_range: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+    """Phases, per-phase metrics and the follow-through evaluation from a stored landmarks file."""
+    if fps is None:
+        # The header is the first record
+        fps = next(iter_records(path), {}).get("fps") or 25
+    seq = PoseSequence.from_poses(poses_from_file(path, frame_range))
+    phases = detect_phases(seq, fps, width / height) if len(seq) else None
+    series = metric_series(seq.data, width, height) if phases else {}
+    return {
+        "phases": phases.as_dict() if phases else None,
+        "phase_metrics": phase_metrics(phases, seq.frames, series) if phases else None,
+        "follow_through": evaluate_follow_through(phases, seq, series),
+    }
+
@@ -0,0 +1,134 @@
+# backend/app/processing/policy.py
+"""
+Per-job pose configuration. The scheduler picks a model tier and a sampling
+stride from the clip length, the latency budget of the request class and the
+current queue depth, stepping down a fixed ladder instead of letting the queue
+grow. The chosen configuration travels with the job and is written into its
+results so scores from different configurations can be told apart.
+"""
+import os
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.processing.pose_estimator import (TIERS, MIN_DETECTION_CONFIDENCE,
+                                           MIN_TRACKING_CONFIDENCE, create_estimator,
+                                           throughput, tier_for_stage)
+from app.telemetry import log
+
+# Seconds a job of each class may take end to end, queueing included
+REQUEST_CLASSES = {
+    "interactive": float(os.getenv("LATENCY_BUDGET_INTERACTIVE_S", "60")),
+    "batch": float(os.getenv("LATENCY_BUDGET_BATCH_S", "600")),
+    "backfill": float(os.getenv("LATENCY_BUDGET_BACKFILL_S", "3600")),
+}
+
+# Inference fps per tier used until enough frames have been measured
+NOMINAL_FPS = {"lite": 45.0, "full": 25.0, "heavy": 8.0}
+MIN_MEASURED_FRAMES = 300
+
+# Never sample sparser than this; the keyframe search needs the wrist trajectory
+MAX_STRIDE = int(os.getenv("POSE_MAX_STRIDE", "3"))
+
+
+@dataclass
+class PoseConfig:
+    tier: str
+    stride: int = 1
+    min_detection_confidence: float = MIN_DETECTION_CONFIDENCE
+    min_tracking_confidence: float = MIN_TRACKING_CONFIDENCE
+    # How the configuration was chosen; informational only
+    request_class: Optional[str] = None
+    budget_s: Optional[float] = None
+    queue_depth: Optional[int] = None
+    estimated_s: Optional[float] = None
+    degraded: bool = False
+    over_budget: bool = False
+
+    def create_estimator(self):
+        return create_estimator(self.tier,
+                                min_detection_confidence=self.min_detection_confidence,
+                                min_tracking_confidence=self.min_tracking_confidence)
+
+    def scan_config(self) -> "PoseConfig":
+        """Same thresholds on the cheap tier, for the full-clip scan of a cascade."""
+        from app.processing.cascade import SCAN_TIER
+        return replace(self, tier=SCAN_TIER)
+
+    def estimator_key(self) -> Tuple[str, float, float]:
+        return (self.tier, self.min_detection_confidence, self.min_tracking_confidence)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def default_config(stage: str, tier: Optional[str] = None) -> PoseConfig:
+    """Fixed configuration for a stage, without looking at load."""
+    return PoseConfig(tier=tier_for_stage(stage, tier))
+
+
+def plan_cascade(stage: str, request_class: str, probe: Dict[str, Any], offset: int = 0,
+                 requested_tier: Optional[str] = None,
+                 queue_depth: Optional[int] = None) -> PoseConfig:
+    """
+    Plan a shot analysis: the lite scan over the whole clip is a fixed overhead and the
+    planned tier only runs on the swing window, every frame of it.
+    """
+    from app.processing.cascade import SCAN_TIER, window_frames
+    scan_s = max(int(probe.get("frame_count") or 0), 1) / tier_fps(SCAN_TIER)
+    return plan(stage, request_class, window_frames(probe.get("fps") or 25, offset),
+                requested_tier, queue_depth=queue_depth, overhead_s=scan_s, max_stride=1)
+
+
+def tier_fps(tier: str) -> float:
+    """Measured inference fps for a tier (any backend), falling back to the nominal figure."""
+    frames = seconds = 0.0
+    for row in throughput():
+        if row["tier"] == tier:
+            frames += row["frames"]
+            seconds += row["seconds"]
+    if frames >= MIN_MEASURED_FRAMES and seconds:
+        return frames / seconds
+    return NOMINAL_FPS[tier]
+
+
+def _ladder(ceiling: str, pinned: bool, max_stride: int) -> List[Tuple[str, int]]:
+    # Drop to cheaper tiers first, then thin out the frames on the cheapest one
+    tiers = [ceiling] if pinned else list(reversed(TIERS[:TIERS.index(ceiling) + 1]))
+    rungs = [(t, 1) for t in tiers]
+    rungs += [(tiers[-1], s) for s in range(2, max_stride + 1)]
+    return rungs
+
+
+def plan(stage: str, request_class: str, frame_count: int, requested_tier: Optional[str] = None,
+         queue_depth: Optional[int] = None, passes: int = 1, overhead_s: float = 0.0,
+         max_stride: int = MAX_STRIDE) -> PoseConfig:
+    """
+    Choose the best configuration whose estimated time fits this job's share of the
+    budget. `passes` is how many times the stage runs the model over `frame_count`
+    frames; `overhead_s` is work that does not depend on the tier chosen here.
+    An explicitly requested tier is kept; only the stride adapts then.
+    """
+    from app import workers
+
+    if request_class not in REQUEST_CLASSES:
+        raise ValueError(f"Unknown request class '{request_class}', expected one of {list(REQUEST_CLASSES)}")
+    budget = REQUEST_CLASSES[request_class]
+    depth = workers.queue_depth() if queue_depth is None else queue_depth
+    # Work already queued shares the same cores, so this job gets a proportional slice
+    share = budget / (1 + depth / max(workers.WORKER_PROCESSES, 1))
+    frames = max(int(frame_count or 0), 1) * passes
+
+    ceiling = tier_for_stage(stage, requested_tier)
+    rungs = _ladder(ceiling, pinned=requested_tier is not None, max_stride=max_stride)
+    for i, (tier, stride) in enumerate(rungs):
+        estimated = overhead_s + frames / stride / tier_fps(tier)
+        if estimated <= share or i == len(rungs) - 1:
+            config = PoseConfig(tier=tier, stride=stride, request_class=request_class,
+                                budget_s=round(share, 2), queue_depth=depth,
+                                estimated_s=round(estimated, 2), degraded=i > 0,
+                                over_budget=estimated > share)
+            if config.degraded:
+                log("policy_degraded", stage=stage, request_class=request_class, frames=frames,
+                    queue_depth=depth, tier=tier, stride=stride, estimated_s=round(estimated, 1),
+                    budget_s=round(share, 1))
+            return config
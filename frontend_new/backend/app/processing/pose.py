@@ -0,0 +1,151 @@
+# backend/app/processing/pose.py
+"""
+Array-backed poses. A Pose is one (33, 4) float32 array of x, y, z, visibility
+in MediaPipe's landmark order; a PoseSequence is one contiguous (frames, 33, 4)
+float32 array for a run of frames, NaN where nothing was detected. Joints are
+addressed by the index constants below (NOSE, LEFT_WRIST, ...), and indexing
+either type returns views, so per-frame code does no dict building or string
+lookups and batch code works on the whole array at once.
+
+Coordinates are normalised to the frame, as the estimators return them.
+MediaPipe stores landmarks as float32, so holding them in float32 loses
+nothing; vectorised metrics scale them by float64 frame sizes before doing
+any arithmetic.
+"""
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# MediaPipe PoseLandmark order, without importing mediapipe
+JOINT_NAMES = (
+    "NOSE", "LEFT_EYE_INNER", "LEFT_EYE", "LEFT_EYE_OUTER", "RIGHT_EYE_INNER", "RIGHT_EYE",
+    "RIGHT_EYE_OUTER", "LEFT_EAR", "RIGHT_EAR", "MOUTH_LEFT", "MOUTH_RIGHT",
+    "LEFT_SHOULDER", "RIGHT_SHOULDER", "LEFT_ELBOW", "RIGHT_ELBOW", "LEFT_WRIST", "RIGHT_WRIST",
+    "LEFT_PINKY", "RIGHT_PINKY", "LEFT_INDEX", "RIGHT_INDEX", "LEFT_THUMB", "RIGHT_THUMB",
+    "LEFT_HIP", "RIGHT_HIP", "LEFT_KNEE", "RIGHT_KNEE", "LEFT_ANKLE", "RIGHT_ANKLE",
+    "LEFT_HEEL", "RIGHT_HEEL", "LEFT_FOOT_INDEX", "RIGHT_FOOT_INDEX",
+)
+NUM_JOINTS = len(JOINT_NAMES)
+JOINT_INDEX = {name: i for i, name in enumerate(JOINT_NAMES)}
+
+NOSE = 0
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+
+# Last axis of the arrays
+X, Y, Z, VISIBILITY = range(4)
+FIELDS = ("x", "y", "z", "visibility")
+
+DTYPE = np.float32
+
+
+class Pose:
+    """One detected pose. `data` is (33, 4) float32 and may be a view into a PoseSequence."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: np.ndarray):
+        self.data = data
+
+    @classmethod
+    def from_landmarks(cls, landmarks: Sequence[Any]) -> "Pose":
+        """From estimator output (objects with x, y, z and optional visibility)."""
+        data = np.empty((NUM_JOINTS, 4), dtype=DTYPE)
+        for i, lm in enumerate(landmarks):
+            data[i] = (lm.x, lm.y, lm.z, getattr(lm, "visibility", None) or 0.0)
+        return cls(data)
+
+    @classmethod
+    def from_dicts(cls, landmarks: Sequence[Mapping[str, Any]]) -> "Pose":
+        """From the stored form: a list of {"x", "y", "z", "visibility"}."""
+        return cls(np.array([(lm["x"], lm["y"], lm["z"], lm.get("visibility") or 0.0) for lm in landmarks],
+                            dtype=DTYPE))
+
+    @classmethod
+    def coerce(cls, pose: Union["Pose", Sequence[Any]]) -> "Pose":
+        if isinstance(pose, Pose):
+            return pose
+        if pose and isinstance(pose[0], Mapping):
+            return cls.from_dicts(pose)
+        return cls.from_landmarks(pose)
+
+    def __getitem__(self, joint: int) -> np.ndarray:
+        """(4,) view of one joint."""
+        return self.data[joint]
+
+    def __len__(self) -> int:
+        return NUM_JOINTS
+
+    def xy(self, width: float = 1.0, height: float = 1.0) -> np.ndarray:
+        """(33, 2) float64 positions, scaled to pixels when a frame size is given."""
+        return self.data[:, :2] * np.array([width, height])
+
+    def point(self, joint: int, width: float, height: float) -> Tuple[int, int]:
+        """Integer pixel position of a joint, for drawing."""
+        return int(self.data[joint, X] * width), int(self.data[joint, Y] * height)
+
+    def as_dicts(self) -> List[Dict[str, float]]:
+        """The stored form (landmarks JSONL, data track source)."""
+        return [dict(zip(FIELDS, row)) for row in self.data.tolist()]
+
+
+class PoseSequence:
+    """
+    Poses over consecutive frames: `frames` holds the frame indices, `data` the
+    (len(frames), 33, 4) float32 landmarks, NaN for frames without a detection.
+    """
+
+    __slots__ = ("frames", "data")
+
+    def __init__(self, frames: np.ndarray, data: np.ndarray):
+        self.frames = frames
+        self.data = data
+
+    @classmethod
+    def empty(cls) -> "PoseSequence":
+        return cls(np.zeros(0, dtype=int), np.zeros((0, NUM_JOINTS, 4), dtype=DTYPE))
+
+    @classmethod
+    def from_poses(cls, poses: Mapping[int, Union[Pose, np.ndarray]]) -> "PoseSequence":
+        """Every frame from the first to the last pose in `poses` ({frame: Pose})."""
+        if not poses:
+            return cls.empty()
+        first, last = min(poses), max(poses)
+        frames = np.arange(first, last + 1)
+        data = np.full((len(frames), NUM_JOINTS, 4), np.nan, dtype=DTYPE)
+        for idx, pose in poses.items():
+            data[idx - first] = pose.data if isinstance(pose, Pose) else pose
+        return cls(frames, data)
+
+    @classmethod
+    def stack(cls, poses: Iterable[Pose], frames: Optional[Sequence[int]] = None) -> "PoseSequence":
+        """Detected poses only, one row each (frames default to 0..n-1)."""
+        rows = [p.data for p in poses]
+        data = np.stack(rows).astype(DTYPE, copy=False) if rows else cls.empty().data
+        return cls(np.arange(len(rows)) if frames is None else np.asarray(frames), data)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, i: int) -> Pose:
+        """The i-th row (not frame index) as a Pose view."""
+        return Pose(self.data[i])
+
+    def at(self, frame: int) -> Optional[Pose]:
+        """The pose at a frame index, or None outside the sequence or where undetected."""
+        i = frame - int(self.frames[0]) if len(self.frames) else -1
+        if not 0 <= i < len(self.frames) or np.isnan(self.data[i, 0, X]):
+            return None
+        return Pose(self.data[i])
+
+    def joint(self, joint: int) -> np.ndarray:
+        """(frames, 4) view of one joint over the sequence."""
+        return self.data[:, joint]
+
+    def detected(self) -> np.ndarray:
+        """Boolean mask of rows with a pose."""
+        return ~np.isnan(self.data[:, 0, X])
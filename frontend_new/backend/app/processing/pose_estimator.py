@@ -0,0 +1,261 @@
+# backend/app/processing/pose_estimator.py
+"""
+Pose estimation behind one interface. Two backends:
+
+- "tasks": MediaPipe Tasks PoseLandmarker in VIDEO running mode, fed timestamped
+  frames, with the lite/full/heavy .task model bundles.
+- "solutions": the legacy mp.solutions.pose graph, where the tiers map to
+  model_complexity 0/1/2.
+
+Tiers are chosen per job or per pipeline stage; each estimator measures its
+own throughput so the cost of every tier can be reported.
+
+cv2 and mediapipe are imported on first use, so the API process can import
+this module (tiers, stage config, throughput) without loading them.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.processing.pose import VISIBILITY, Pose
+
+TIERS = ("lite", "full", "heavy")
+DEFAULT_TIER = os.getenv("POSE_TIER", "full")
+
+# Model bundles for the Tasks backend: pose_landmarker_{lite,full,heavy}.task
+MODEL_DIR = Path(os.getenv("POSE_MODEL_DIR", Path(__file__).resolve().parents[2] / "pose_models"))
+SOLUTIONS_COMPLEXITY = {"lite": 0, "full": 1, "heavy": 2}
+
+# Pipeline stages can pin their own tier, e.g. POSE_TIER_BATCH=lite
+STAGES = ("landmarks", "overlay", "analysis", "batch")
+# Shot analysis only runs the model on the swing window (see cascade.py), so it can
+# afford the heavy tier unless POSE_TIER or a stage override says otherwise
+STAGE_DEFAULT_TIERS = {"analysis": "heavy", "batch": "heavy"}
+
+# Single source for the detection/tracking thresholds of every estimator
+MIN_DETECTION_CONFIDENCE = float(os.getenv("POSE_MIN_DETECTION_CONFIDENCE", "0.5"))
+MIN_TRACKING_CONFIDENCE = float(os.getenv("POSE_MIN_TRACKING_CONFIDENCE", "0.5"))
+
+
+def _mediapipe():
+    import mediapipe as mp
+    return mp
+
+
+def __getattr__(name: str) -> Any:
+    # Lazy module attributes: `from app.processing.pose_estimator import mp_pose` loads mediapipe
+    if name == "mp_pose":
+        return _mediapipe().solutions.pose
+    if name == "POSE_CONNECTIONS":
+        return sorted(_mediapipe().solutions.pose.POSE_CONNECTIONS)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def tier_for_stage(stage: str, requested: Optional[str] = None) -> str:
+    """A job-level request wins, then POSE_TIER_<STAGE>, then POSE_TIER, then the stage default."""
+    tier = (requested or os.getenv(f"POSE_TIER_{stage.upper()}") or os.getenv("POSE_TIER")
+            or STAGE_DEFAULT_TIERS.get(stage) or DEFAULT_TIER)
+    if tier not in TIERS:
+        raise ValueError(f"Unknown pose tier '{tier}', expected one of {TIERS}")
+    return tier
+
+
+def model_path(tier: str) -> Path:
+    return MODEL_DIR / f"pose_landmarker_{tier}.task"
+
+
+def default_backend(tier: str) -> str:
+    backend = os.getenv("POSE_BACKEND")
+    if backend:
+        return backend
+    return "tasks" if model_path(tier).exists() else "solutions"
+
+
+class PoseEstimator:
+    """Feed RGB frames of one clip in order; get a Pose (33 x, y, z, visibility) or None."""
+
+    backend = "base"
+
+    def __init__(self, tier: str, min_detection_confidence: float = MIN_DETECTION_CONFIDENCE,
+                 min_tracking_confidence: float = MIN_TRACKING_CONFIDENCE):
+        self.tier = tier
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        self.frames = 0
+        self.seconds = 0.0
+        self._last_ts = -1
+
+    def process(self, rgb: np.ndarray, timestamp_ms: Optional[int] = None) -> Optional[Pose]:
+        # Timestamps must increase strictly in video mode
+        ts = self._last_ts + 1 if timestamp_ms is None else max(int(timestamp_ms), self._last_ts + 1)
+        self._last_ts = ts
+        t0 = time.perf_counter()
+        landmarks = self._infer(rgb, ts)
+        self.seconds += time.perf_counter() - t0
+        self.frames += 1
+        return Pose.from_landmarks(landmarks) if landmarks else None
+
+    def _infer(self, rgb: np.ndarray, timestamp_ms: int) -> Optional[Sequence[Any]]:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """Drop tracking state between clips while keeping the model loaded."""
+        self._flush_stats()
+        self._last_ts = -1
+
+    def close(self) -> None:
+        self._flush_stats()
+
+    def _flush_stats(self) -> None:
+        # Per-clip counters go into this process's throughput table
+        record_throughput(self.stats())
+        self.frames, self.seconds = 0, 0.0
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "tier": self.tier,
+            "min_detection_confidence": self.min_detection_confidence,
+            "min_tracking_confidence": self.min_tracking_confidence,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "tier": self.tier, "frames": self.frames,
+                "seconds": round(self.seconds, 4)}
+
+    def warm_up(self, size: int = 256) -> None:
+        """Run one blank frame so graph setup and allocation happen before the first real clip."""
+        self.process(np.zeros((size, size, 3), dtype=np.uint8))
+        # Not a real frame: keep it out of the throughput figures
+        self.frames, self.seconds = 0, 0.0
+        self.reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SolutionsPoseEstimator(PoseEstimator):
+    backend = "solutions"
+
+    def __init__(self, tier: str, **kwargs):
+        super().__init__(tier, **kwargs)
+        self._pose = _mediapipe().solutions.pose.Pose(
+            static_image_mode=False,
+            model_complexity=SOLUTIONS_COMPLEXITY[tier],
+            min_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence)
+
+    def _infer(self, rgb, timestamp_ms):
+        res = self._pose.process(rgb)
+        return res.pose_landmarks.landmark if res.pose_landmarks else None
+
+    def reset(self):
+        super().reset()
+        self._pose.reset()
+
+    def close(self):
+        super().close()
+        self._pose.close()
+
+
+class TasksPoseEstimator(PoseEstimator):
+    backend = "tasks"
+
+    def __init__(self, tier: str, **kwargs):
+        super().__init__(tier, **kwargs)
+        path = model_path(tier)
+        if not path.exists():
+            raise FileNotFoundError(f"Pose model bundle not found: {path}")
+        self._model = path.read_bytes()
+        self._landmarker = self._create()
+
+    def _create(self):
+        from mediapipe.tasks.python import BaseOptions, vision
+        options = vision.PoseLandmarkerOptions(
+            base_options=BaseOptions(model_asset_buffer=self._model),
+            running_mode=vision.RunningMode.VIDEO,
+            num_poses=1,
+            min_pose_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence,
+        )
+        return vision.PoseLandmarker.create_from_options(options)
+
+    def _infer(self, rgb, timestamp_ms):
+        mp = _mediapipe()
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(rgb))
+        res = self._landmarker.detect_for_video(image, timestamp_ms)
+        return res.pose_landmarks[0] if res.pose_landmarks else None
+
+    def reset(self):
+        # VIDEO mode has no reset; a fresh landmarker restarts tracking and timestamps
+        super().reset()
+        self._landmarker.close()
+        self._landmarker = self._create()
+
+    def close(self):
+        super().close()
+        self._landmarker.close()
+
+
+def create_estimator(tier: Optional[str] = None, backend: Optional[str] = None,
+                     min_detection_confidence: float = MIN_DETECTION_CONFIDENCE,
+                     min_tracking_confidence: float = MIN_TRACKING_CONFIDENCE) -> PoseEstimator:
+    tier = tier or DEFAULT_TIER
+    if tier not in TIERS:
+        raise ValueError(f"Unknown pose tier '{tier}', expected one of {TIERS}")
+    backend = backend or default_backend(tier)
+    cls = {"tasks": TasksPoseEstimator, "solutions": SolutionsPoseEstimator}[backend]
+    return cls(tier, min_detection_confidence=min_detection_confidence,
+               min_tracking_confidence=min_tracking_confidence)
+
+
+def draw_skeleton(frame: np.ndarray, pose: Pose, min_visibility: float = 0.5) -> None:
+    """Draw pose connections and joints in place (same look as mp drawing_utils defaults)."""
+    h, w = frame.shape[:2]
+    xy = pose.xy(w, h).astype(int).tolist()
+    visible = pose.data[:, VISIBILITY] >= min_visibility
+    points = {i: tuple(p) for i, p in enumerate(xy) if visible[i]}
+    import cv2
+    for a, b in __getattr__("POSE_CONNECTIONS"):
+        if a in points and b in points:
+            cv2.line(frame, points[a], points[b], (224, 224, 224), 2)
+    for p in points.values():
+        cv2.circle(frame, p, 2, (0, 0, 255), 2)
+
+
+# ---------------------------------------------------------------------------
+# Measured throughput per (backend, tier). Estimators record into the table of
+# the process they ran in; results from pool workers are merged by the caller.
+# ---------------------------------------------------------------------------
+
+_throughput: Dict[tuple, List[float]] = {}
+_throughput_lock = threading.Lock()
+
+
+def record_throughput(stats: Optional[Dict[str, Any]]) -> None:
+    if not stats or not stats.get("frames"):
+        return
+    key = (stats["backend"], stats["tier"])
+    with _throughput_lock:
+        totals = _throughput.setdefault(key, [0, 0.0])
+        totals[0] += stats["frames"]
+        totals[1] += stats["seconds"]
+
+
+def throughput() -> List[Dict[str, Any]]:
+    with _throughput_lock:
+        items = sorted(_throughput.items())
+    return [{
+        "backend": backend,
+        "tier": tier,
+        "frames": frames,
+        "seconds": round(seconds, 3),
+        "fps": round(frames / seconds, 2) if seconds else None,
+    } for (backend, tier), (frames, seconds) in items]
@@ -0,0 +1,186 @@
+# backend/app/processing/segmentation.py
+"""
+Split a net-session recording into per-delivery windows using cheap signals:
+the lead-wrist speed from the landmarks the upload pipeline already wrote, and
+the frame-difference motion energy of a heavily downscaled decode. Both are
+resampled to one value per frame, smoothed into an envelope and normalised;
+every envelope peak that stands out from the session's background motion and
+is at least SEGMENT_MIN_GAP_S from a stronger peak is one delivery.
+"""
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.processing.cascade import WRIST
+from app.processing.phases import poses_from_file
+from app.processing.pose import X, Y, PoseSequence
+from app.telemetry import StageClock
+
+# Two swings closer together than this are the same delivery
+MIN_GAP_S = float(os.getenv("SEGMENT_MIN_GAP_S", "4.0"))
+# Window around each peak handed to the analyzer (its cascade narrows it further)
+PAD_BEFORE_S = float(os.getenv("SEGMENT_PAD_BEFORE_S", "1.5"))
+PAD_AFTER_S = float(os.getenv("SEGMENT_PAD_AFTER_S", "1.5"))
+SMOOTH_S = float(os.getenv("SEGMENT_SMOOTH_S", "0.2"))
+MOTION_WIDTH = int(os.getenv("SEGMENT_MOTION_WIDTH", "160"))
+MOTION_STRIDE = int(os.getenv("SEGMENT_MOTION_STRIDE", "2"))
+
+# A peak must reach this fraction of the session's strongest swing...
+MIN_PEAK_RATIO = 0.35
+# ...and stand this many MADs above the median envelope
+PEAK_MAD_K = 4.0
+# Relative weight of the wrist signal when both are available
+WRIST_WEIGHT = 0.7
+
+
+@dataclass
+class Delivery:
+    index: int
+    peak_frame: int
+    # Inclusive frame range to analyze
+    start: int
+    end: int
+    # Envelope value at the peak, 1.0 ~ a typical full swing in this session
+    strength: float
+
+    def frame_range(self) -> Tuple[int, int]:
+        return self.start, self.end
+
+
+@dataclass
+class Segmentation:
+    fps: float
+    total_frames: int
+    deliveries: List[Delivery] = field(default_factory=list)
+    signals: List[str] = field(default_factory=list)
+    threshold: Optional[float] = None
+    # True when nothing stood out and the whole clip became one delivery
+    fallback: bool = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def wrist_speed(landmarks_path: str, total_frames: int) -> Optional[np.ndarray]:
+    """Per-frame lead-wrist speed (normalised image units per frame) from a landmarks file."""
+    poses = poses_from_file(landmarks_path)
+    if len(poses) < 3:
+        return None
+    # Detected frames only, one row each
+    seq = PoseSequence.stack(poses.values(), list(poses))
+    wrist = seq.joint(WRIST)
+    # Per-frame speed, so detection gaps and the landmark stride do not inflate it
+    speed = np.hypot(np.diff(wrist[:, X]), np.diff(wrist[:, Y])) / np.maximum(np.diff(seq.frames), 1)
+    return _resample(seq.frames[1:], speed, total_frames)
+
+
+def motion_energy(video_path: str, stride: int = MOTION_STRIDE,
+                  width: int = MOTION_WIDTH) -> Tuple[float, int, np.ndarray]:
+    """(fps, total frames, per-frame mean absolute difference of small grayscale frames)."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+
+    idx, prev = 0, None
+    frames, values = [], []
+    clock = StageClock("segment")
+    while True:
+        if not cap.grab():
+            break
+        if idx % stride == 0:
+            ret, frame = cap.retrieve()
+            clock.lap("decode")
+            if not ret:
+                break
+            h, w = frame.shape[:2]
+            small = cv2.resize(frame, (width, max(int(h * width / w), 1)), interpolation=cv2.INTER_AREA)
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+            if prev is not None:
+                frames.append(idx)
+                values.append(float(np.abs(gray - prev).mean()))
+            prev = gray
+            clock.lap("diff")
+            clock.frame_done()
+        else:
+            clock.lap("decode")
+        idx += 1
+    cap.release()
+    clock.finish(stride=stride, width=width)
+    total_frames = max(total_frames, idx)
+    if len(frames) < 2:
+        return fps, total_frames, np.zeros(total_frames)
+    return fps, total_frames, _resample(np.asarray(frames), np.asarray(values), total_frames)
+
+
+def _resample(idx: np.ndarray, values: np.ndarray, total_frames: int) -> np.ndarray:
+    return np.interp(np.arange(total_frames), idx, values)
+
+
+def envelope(signal: np.ndarray, fps: float, smooth_s: float = SMOOTH_S) -> np.ndarray:
+    """Moving average, scaled so the session's typical swing (99th percentile) is ~1."""
+    width = max(int(round(smooth_s * fps)), 1)
+    smoothed = np.convolve(signal, np.ones(width) / width, mode="same")
+    scale = np.percentile(smoothed, 99) if len(smoothed) else 0
+    return smoothed / scale if scale > 0 else np.zeros_like(smoothed)
+
+
+def find_peaks(env: np.ndarray, min_gap: int) -> Tuple[List[int], float]:
+    """Greedy non-maximum suppression: strongest first, each at least min_gap from those kept."""
+    if not len(env):
+        return [], 0.0
+    median = float(np.median(env))
+    mad = float(np.median(np.abs(env - median)))
+    threshold = max(MIN_PEAK_RATIO * float(env.max()), median + PEAK_MAD_K * mad)
+    # Local maxima only, so a broad plateau yields one candidate rather than many
+    interior = (env[1:-1] >= env[:-2]) & (env[1:-1] > env[2:]) & (env[1:-1] >= threshold)
+    candidates = np.flatnonzero(interior) + 1
+    kept: List[int] = []
+    for i in candidates[np.argsort(-env[candidates], kind="stable")]:
+        if all(abs(int(i) - k) >= min_gap for k in kept):
+            kept.append(int(i))
+    return sorted(kept), threshold
+
+
+def windows(peaks: List[int], fps: float, total_frames: int) -> List[Tuple[int, int]]:
+    """Pad each peak into a window, splitting the difference where neighbours would overlap."""
+    last = max(total_frames - 1, 0)
+    before, after = int(round(PAD_BEFORE_S * fps)), int(round(PAD_AFTER_S * fps))
+    out = []
+    for i, peak in enumerate(peaks):
+        start, end = max(peak - before, 0), min(peak + after, last)
+        if i > 0:
+            start = max(start, (peaks[i - 1] + peak) // 2 + 1)
+        if i + 1 < len(peaks):
+            end = min(end, (peak + peaks[i + 1]) // 2)
+        out.append((start, end))
+    return out
+
+
+def segment_session(video_path: str, landmarks_path: Optional[str] = None) -> Segmentation:
+    """Deliveries in a session recording; a clip with no clear swing is one delivery."""
+    fps, total_frames, motion = motion_energy(video_path)
+    signals, env = ["motion"], envelope(motion, fps)
+    if landmarks_path and os.path.exists(landmarks_path):
+        speed = wrist_speed(landmarks_path, total_frames)
+        if speed is not None:
+            signals.insert(0, "wrist")
+            env = WRIST_WEIGHT * envelope(speed, fps) + (1 - WRIST_WEIGHT) * env
+
+    peaks, threshold = find_peaks(env, max(int(round(MIN_GAP_S * fps)), 1))
+    result = Segmentation(fps=fps, total_frames=total_frames, signals=signals,
+                          threshold=round(threshold, 4))
+    if not peaks:
+        peak = int(np.argmax(env)) if len(env) else 0
+        result.deliveries = [Delivery(0, peak, 0, max(total_frames - 1, 0), 0.0)]
+        result.fallback = True
+        return result
+    result.deliveries = [
+        Delivery(index=i, peak_frame=peak, start=start, end=end, strength=round(float(env[peak]), 3))
+        for i, (peak, (start, end)) in enumerate(zip(peaks, windows(peaks, fps, total_frames)))
+    ]
+    return result
@@ -0,0 +1,264 @@
+# backend/app/profiles.py
+"""
+Versioned threshold profiles and re-scoring of stored analyses.
+
+A profile is a named set of ideal/acceptable ranges per shot ("juniors",
+"left_handers", ...). Every change is stored as a new version, and players are
+assigned a profile by name, always scored against its latest version. The
+built-in "default" profile is version 0 of each shot's analyzer ranges until a
+stored version replaces it.
+
+Thresholds only decide scores, not metrics, so re-scoring never touches video
+or landmarks: the metrics already stored in analysis_records are stacked into
+one (analyses, metrics) array per profile, scored in a single vectorised pass
+(app.analysis.scoring) and written back with one bulk UPDATE, after which the
+affected players' overall_score rollups are rebuilt from the new scores. The
+{job_id}_analysis.json files keep the feedback they were produced with.
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select, update
+
+from app.analysis import scoring
+from app.analysis.registry import DEFAULT_SHOT, SHOTS, get_analyzer_class
+from app.db import SessionLocal
+from app.history import rebuild_overall
+from app.models.history import AnalysisRecord
+from app.models.profiles import PlayerProfile, ThresholdProfile
+from app.telemetry import log
+
+DEFAULT_PROFILE = "default"
+
+
+@dataclass(frozen=True)
+class Thresholds:
+    name: str
+    shot: str
+    version: int
+    ideal_ranges: Dict[str, List[float]]
+    acceptable_ranges: Dict[str, List[float]]
+    note: Optional[str] = None
+
+    @property
+    def metrics(self) -> Tuple[str, ...]:
+        return tuple(self.ideal_ranges)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(metrics, 2) ideal and acceptable bounds, in `metrics` order."""
+        return (scoring.bounds(self.metrics, self.ideal_ranges),
+                scoring.bounds(self.metrics, self.acceptable_ranges))
+
+    def feedback(self, metrics: Dict[str, float]) -> List[Dict[str, Any]]:
+        return scoring.feedback(metrics, self.ideal_ranges, self.acceptable_ranges)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "shot": self.shot, "version": self.version,
+                "ideal_ranges": self.ideal_ranges, "acceptable_ranges": self.acceptable_ranges,
+                "note": self.note}
+
+
+def _check_shot(shot: str) -> None:
+    if shot not in SHOTS:
+        raise ValueError(f"Unsupported shot '{shot}', expected one of {sorted(SHOTS)}")
+
+
+def builtin(shot: str) -> Thresholds:
+    """Version 0 of the default profile: the analyzer class's ranges."""
+    _check_shot(shot)
+    analyzer_cls = get_analyzer_class(shot)
+    return Thresholds(DEFAULT_PROFILE, shot, 0, scoring.ranges_as_lists(analyzer_cls.ideal_ranges),
+                      scoring.ranges_as_lists(analyzer_cls.acceptable_ranges), "built-in")
+
+
+def _from_row(row: ThresholdProfile) -> Thresholds:
+    return Thresholds(row.name, row.shot, row.version, row.ideal_ranges, row.acceptable_ranges, row.note)
+
+
+def get_profile(name: str, shot: str, version: Optional[int] = None) -> Optional[Thresholds]:
+    """A profile version (latest by default), or None if it does not exist."""
+    _check_shot(shot)
+    with SessionLocal() as session:
+        query = select(ThresholdProfile).where(ThresholdProfile.name == name, ThresholdProfile.shot == shot)
+        if version is not None:
+            query = query.where(ThresholdProfile.version == version)
+        row = session.scalars(query.order_by(ThresholdProfile.version.desc()).limit(1)).first()
+    if row is not None:
+        return _from_row(row)
+    if name == DEFAULT_PROFILE and version in (None, 0):
+        return builtin(shot)
+    return None
+
+
+def _merge(base: Dict[str, List[float]], changes: Optional[Dict[str, Any]], kind: str) -> Dict[str, List[float]]:
+    merged = dict(base)
+    for metric, bounds in (changes or {}).items():
+        if metric not in base:
+            raise ValueError(f"Unknown metric '{metric}' in {kind}, expected one of {sorted(base)}")
+        low, high = (float(b) for b in bounds)
+        if low > high:
+            raise ValueError(f"{kind} for '{metric}' has low {low} above high {high}")
+        merged[metric] = [low, high]
+    return merged
+
+
+def create_version(name: str, shot: str, ideal_ranges: Optional[Dict[str, Any]] = None,
+                   acceptable_ranges: Optional[Dict[str, Any]] = None,
+                   note: Optional[str] = None) -> Thresholds:
+    """
+    Store the next version of a profile. Ranges not given are carried over from
+    the previous version (or, for a new profile, from the built-in ranges), so
+    every version covers every metric of the shot.
+    """
+    base = get_profile(name, shot) or builtin(shot)
+    ideal = _merge(base.ideal_ranges, ideal_ranges, "ideal_ranges")
+    acceptable = _merge(base.acceptable_ranges, acceptable_ranges, "acceptable_ranges")
+    with SessionLocal() as session:
+        latest = session.scalar(select(func.max(ThresholdProfile.version))
+                                .where(ThresholdProfile.name == name, ThresholdProfile.shot == shot))
+        row = ThresholdProfile(name=name, shot=shot, version=(latest or 0) + 1,
+                               ideal_ranges=ideal, acceptable_ranges=acceptable, note=note)
+        session.add(row)
+        session.commit()
+        return _from_row(row)
+
+
+def list_profiles(shot: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Latest version of every profile and shot, with its assigned player count."""
+    with SessionLocal() as session:
+        latest = (select(ThresholdProfile.name, ThresholdProfile.shot,
+                         func.max(ThresholdProfile.version).label("version"))
+                  .group_by(ThresholdProfile.name, ThresholdProfile.shot))
+        if shot:
+            latest = latest.where(ThresholdProfile.shot == shot)
+        versions = {(name, s): v for name, s, v in session.execute(latest)}
+        players = dict(session.execute(select(PlayerProfile.profile, func.count())
+                                       .group_by(PlayerProfile.profile)).all())
+    for s in ([shot] if shot else SHOTS):
+        versions.setdefault((DEFAULT_PROFILE, s), 0)
+    return [{"name": name, "shot": s, "version": v, "players": players.get(name, 0)}
+            for (name, s), v in sorted(versions.items())]
+
+
+def profile_for(player_id: Optional[str]) -> str:
+    if not player_id:
+        return DEFAULT_PROFILE
+    with SessionLocal() as session:
+        row = session.get(PlayerProfile, player_id)
+        return row.profile if row else DEFAULT_PROFILE
+
+
+def assign(player_id: str, name: str) -> bool:
+    """
+    Score a player against `name` from now on ("default" removes the assignment).
+    False, and nothing stored, if no shot has a profile of that name.
+    """
+    with SessionLocal() as session:
+        if name != DEFAULT_PROFILE and session.scalar(
+                select(ThresholdProfile.id).where(ThresholdProfile.name == name).limit(1)) is None:
+            return False
+        row = session.get(PlayerProfile, player_id)
+        if name == DEFAULT_PROFILE:
+            if row is not None:
+                session.delete(row)
+        elif row is None:
+            session.add(PlayerProfile(player_id=player_id, profile=name))
+        else:
+            row.profile = name
+        session.commit()
+    return True
+
+
+def resolve(player_id: Optional[str], shot: str) -> Thresholds:
+    """The thresholds a player's analyses of this shot are scored against."""
+    name = profile_for(player_id)
+    return get_profile(name, shot) or builtin(shot)
+
+
+def apply(result: Dict[str, Any], shot: str, player_id: Optional[str]) -> Thresholds:
+    """Re-score a fresh analyzer result against the player's profile, in place."""
+    # Unknown shots are analysed with the default shot's analyzer, so score them with its ranges
+    thresholds = resolve(player_id, shot if shot in SHOTS else DEFAULT_SHOT)
+    result["feedback"] = thresholds.feedback(result["metrics"])
+    result["threshold_profile"] = {"name": thresholds.name, "version": thresholds.version}
+    return thresholds
+
+
+def score_records(thresholds: Thresholds, metrics: List[Dict[str, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-metric scores (analyses, metrics) and overall scores (analyses,) for many
+    stored metric dicts at once. Metrics a record lacks score NaN and are left
+    out of its overall score.
+    """
+    names = thresholds.metrics
+    values = np.array([[m.get(name, np.nan) for name in names] for m in metrics],
+                      dtype=np.float64).reshape(len(metrics), len(names))
+    ideal, acceptable = thresholds.arrays()
+    scores = scoring.score_matrix(values, ideal, acceptable)
+    return scores, scoring.overall(scores)
+
+
+def rescore(shot: str, profile: Optional[str] = None,
+            player_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Re-score stored analyses of one shot against the latest version of the
+    profile each player is assigned. `profile` limits this to the players on
+    that profile (unassigned players and analyses without a player count as
+    "default"), `player_ids` to those players. Returns counts and timing.
+    """
+    _check_shot(shot)
+    t0 = time.perf_counter()
+    with SessionLocal() as session:
+        assigned = dict(session.execute(select(PlayerProfile.player_id, PlayerProfile.profile)).all())
+        query = select(AnalysisRecord.job_id, AnalysisRecord.player_id, AnalysisRecord.metrics) \
+            .where(AnalysisRecord.shot == shot)
+        if player_ids is not None:
+            query = query.where(AnalysisRecord.player_id.in_(list(player_ids)))
+        elif profile is not None and profile != DEFAULT_PROFILE:
+            query = query.where(AnalysisRecord.player_id.in_(
+                [p for p, name in assigned.items() if name == profile]))
+
+        groups: Dict[str, List[Any]] = {}
+        for row in session.execute(query):
+            name = assigned.get(row.player_id, DEFAULT_PROFILE) if row.player_id else DEFAULT_PROFILE
+            if profile is None or name == profile:
+                groups.setdefault(name, []).append(row)
+
+        updates, players, versions = [], set(), {}
+        for name, rows in groups.items():
+            thresholds = get_profile(name, shot) or builtin(shot)
+            versions[name] = thresholds.version
+            scores, overall = score_records(thresholds, [r.metrics for r in rows])
+            names = thresholds.metrics
+            for row, record_scores, record_overall in zip(rows, scores.tolist(), overall.tolist()):
+                updates.append({
+                    "job_id": row.job_id,
+                    "scores": {n: s for n, s in zip(names, record_scores) if s == s},
+                    "overall_score": None if record_overall != record_overall else record_overall,
+                    "profile": thresholds.name,
+                    "profile_version": thresholds.version,
+                })
+                if row.player_id:
+                    players.add(row.player_id)
+        scored_s = time.perf_counter() - t0
+
+        if updates:
+            # Bulk UPDATE by primary key: one executemany, no ORM objects loaded
+            session.execute(update(AnalysisRecord), updates)
+        rollups = rebuild_overall(session, shot, players)
+        session.commit()
+
+    elapsed = time.perf_counter() - t0
+    summary = {"shot": shot, "profiles": versions, "records": len(updates), "players": len(players),
+               "rollups": rollups, "score_s": round(scored_s, 4), "seconds": round(elapsed, 4),
+               "records_per_s": round(len(updates) / elapsed, 1) if elapsed > 0 else None}
+    log("rescored", **summary)
+    return summary
+
+
+def rescore_all(profile: Optional[str] = None, player_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """rescore() for every shot."""
+    player_ids = list(player_ids) if player_ids is not None else None
+    return [rescore(shot, profile, player_ids) for shot in SHOTS]
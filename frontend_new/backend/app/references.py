@@ -0,0 +1,197 @@
+# backend/app/references.py
+"""
+Reference swing library for whole-swing comparison (app.processing.compare).
+
+Adding a reference normalises and resamples the source job's swing once and
+stores the result, so a reference outlives its clip's retention and costs
+nothing to prepare at query time. Each API process keeps one in-memory library
+per shot, every reference stacked into one (refs, frames, dims) array with its
+LB_Keogh envelopes; the library is rebuilt when the references table changes
+(count, highest id and newest created_at are checked on every query with one
+indexed lookup).
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app.db import SessionLocal
+from app.models.job import Job
+from app.models.references import SwingReference
+from app.processing import compare
+from app.processing.compare import JOINTS, Swing
+
+
+def job_swing(job: Job) -> Swing:
+    """The normalised swing in a job's stored landmarks. ValueError if there is none."""
+    landmarks_path = (job.artifacts or {}).get("landmarks")
+    if not landmarks_path:
+        raise ValueError("Job has no landmarks yet")
+    probe = job.probe
+    if not probe:
+        from app.processing.mediapipe_utils import probe_video
+        probe = probe_video(job.upload_path)
+    swing = compare.swing_from_file(landmarks_path, probe["width"], probe["height"], probe["fps"])
+    if swing is None:
+        raise ValueError("No pose was detected in the job's landmarks")
+    return swing
+
+
+def _as_dict(row: SwingReference) -> Dict[str, Any]:
+    return {"id": row.id, "name": row.name, "shot": row.shot, "player_id": row.player_id,
+            "job_id": row.job_id, "frames": [row.start_frame, row.end_frame], "fps": row.fps,
+            "created_at": row.created_at.isoformat() if row.created_at else None}
+
+
+def add_reference(job: Job, shot: str, name: str, player_id: Optional[str] = None) -> Dict[str, Any]:
+    """Precompute and store a job's swing as a reference (player_id: that player's own)."""
+    swing = job_swing(job)
+    with SessionLocal() as session:
+        row = SwingReference(name=name, shot=shot, player_id=player_id, job_id=job.id,
+                             frames=len(swing.data), joints=len(JOINTS),
+                             data=swing.data.astype(np.float32).tobytes(),
+                             start_frame=float(swing.frames[0]), end_frame=float(swing.frames[-1]),
+                             fps=swing.fps, phases=swing.phases.as_dict() if swing.phases else None)
+        session.add(row)
+        session.commit()
+        return _as_dict(row)
+
+
+def list_references(shot: Optional[str] = None, player_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """References of a shot; with player_id, the shared ones plus that player's own."""
+    with SessionLocal() as session:
+        query = select(SwingReference).order_by(SwingReference.id)
+        if shot:
+            query = query.where(SwingReference.shot == shot)
+        if player_id:
+            query = query.where((SwingReference.player_id.is_(None)) | (SwingReference.player_id == player_id))
+        return [_as_dict(row) for row in session.scalars(query)]
+
+
+def delete_reference(reference_id: int) -> bool:
+    with SessionLocal() as session:
+        row = session.get(SwingReference, reference_id)
+        if row is None:
+            return False
+        session.delete(row)
+        session.commit()
+        return True
+
+
+# ---------------------------------------------------------------------------
+# In-memory library
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Library:
+    ids: np.ndarray
+    player_ids: List[Optional[str]]
+    names: List[str]
+    # (refs, FRAMES, joints, 2) swings and their source frame spans
+    data: np.ndarray
+    spans: np.ndarray
+    fps: np.ndarray
+    # LB_Keogh envelopes over the flattened (refs, FRAMES, joints * 2) swings
+    upper: np.ndarray
+    lower: np.ndarray
+
+    def swing(self, i: int) -> Swing:
+        return Swing(self.data[i], np.linspace(*self.spans[i], self.data.shape[1]), float(self.fps[i]))
+
+    def describe(self, i: int) -> Dict[str, Any]:
+        return {"id": int(self.ids[i]), "name": self.names[i], "player_id": self.player_ids[i],
+                "frames": self.spans[i].tolist()}
+
+
+_libraries: Dict[str, Tuple[Tuple[Any, ...], Library]] = {}
+_lock = threading.Lock()
+
+
+def _stamp(session, shot: str) -> Tuple[Any, ...]:
+    """
+    Changes whenever the shot's references do: a delete lowers the count, an add
+    moves the newest created_at. Ids alone are not enough; a table created before
+    sqlite_autoincrement reuses a deleted newest id.
+    """
+    count, last, newest = session.execute(
+        select(func.count(), func.max(SwingReference.id), func.max(SwingReference.created_at))
+        .where(SwingReference.shot == shot)).one()
+    return int(count), int(last or 0), newest
+
+
+def _build(rows: List[SwingReference]) -> Library:
+    swings = []
+    for row in rows:
+        data = np.frombuffer(row.data, dtype=np.float32).reshape(row.frames, row.joints, 2)
+        # References stored before COMPARE_FRAMES changed are resampled to the current length
+        swings.append(data if row.frames == compare.FRAMES else compare.resample(data).astype(np.float32))
+    data = np.stack(swings) if swings else np.zeros((0, compare.FRAMES, len(JOINTS), 2), dtype=np.float32)
+    upper, lower = compare.envelope(compare.flat(data).astype(np.float64))
+    return Library(np.array([r.id for r in rows], dtype=int), [r.player_id for r in rows],
+                   [r.name for r in rows], data,
+                   np.array([(r.start_frame, r.end_frame) for r in rows], dtype=float).reshape(-1, 2),
+                   np.array([r.fps for r in rows], dtype=float), upper, lower)
+
+
+def library(shot: str) -> Library:
+    """This process's library for a shot, rebuilt if references were added or removed."""
+    with SessionLocal() as session:
+        stamp = _stamp(session, shot)
+        with _lock:
+            cached = _libraries.get(shot)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            rows = list(session.scalars(select(SwingReference).where(
+                SwingReference.shot == shot, SwingReference.joints == len(JOINTS)).order_by(SwingReference.id)))
+            lib = _build(rows)
+            _libraries[shot] = (stamp, lib)
+            return lib
+
+
+def compare_job(job: Job, shot: str, reference_id: Optional[int] = None,
+                player_id: Optional[str] = None, k: int = 3) -> Optional[Dict[str, Any]]:
+    """
+    Compare a job's swing with one reference, or search the shot's library (shared
+    references plus the player's own) for the k closest. The closest comes with
+    per-joint deviation timelines. None if reference_id is not in the library.
+    """
+    t0 = time.perf_counter()
+    query = job_swing(job)
+    t1 = time.perf_counter()
+    lib = library(shot)
+
+    if reference_id is not None:
+        hits = np.flatnonzero(lib.ids == reference_id)
+        if not len(hits):
+            return None
+        search = {"candidates": 1, "dtw": 1, "pruned": 0}
+        matches = [(int(hits[0]), None)]
+    else:
+        candidates = np.array([i for i, owner in enumerate(lib.player_ids)
+                               if owner is None or (player_id and owner == player_id)], dtype=int)
+        if not len(candidates):
+            return {"job_id": job.id, "shot": shot, "matches": [], "comparison": None,
+                    "search": {"candidates": 0, "dtw": 0, "pruned": 0}}
+        found, search = compare.nearest(compare.flat(query.data).astype(np.float64),
+                                        compare.flat(lib.data[candidates]),
+                                        lib.upper[candidates], lib.lower[candidates], k)
+        matches = [(int(candidates[i]), cost) for i, cost in found]
+
+    best = lib.swing(matches[0][0])
+    comparison = compare.compare(query, best)
+    t2 = time.perf_counter()
+    frames = len(query.data)
+    return {
+        "job_id": job.id,
+        "shot": shot,
+        "swing_frames": list(query.span),
+        "matches": [{**lib.describe(i),
+                     "distance": comparison["distance"] if cost is None else round(compare.distance(cost, frames), 4)}
+                    for i, cost in matches],
+        "comparison": {"reference": lib.describe(matches[0][0]), **comparison},
+        "search": search,
+        "timings_ms": {"features": round((t1 - t0) * 1000, 2), "compare": round((t2 - t1) * 1000, 2)},
+    }
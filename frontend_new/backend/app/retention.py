@@ -0,0 +1,295 @@
+# backend/app/retention.py
+"""
+Retention for /storage: TTL and LRU eviction per artifact class, per-academy
+quotas and a background sweeper. Every sweep produces a report; with
+dry_run=True nothing is deleted.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from app.storage import UPLOAD_DIR, RESULT_DIR
+from app.jobs import academies_for, pinned_job_ids, set_artifact
+from app.telemetry import log
+
+DAY = 24 * 3600
+MB = 1024 * 1024
+
+JOB_FILE_RE = re.compile(r"^([0-9a-f]{32})_(.+)$")
+
+
+@dataclass
+class ArtifactPolicy:
+    ttl_days: Optional[float]       # None => never expires by age
+    max_mb: Optional[float]         # None => no class-wide size cap
+    regenerable: bool               # derived from other artifacts, safe to evict first
+
+
+# Defaults; each can be overridden with RETENTION_<CLASS>_TTL_DAYS / RETENTION_<CLASS>_MAX_MB
+DEFAULT_POLICIES: Dict[str, ArtifactPolicy] = {
+    "upload": ArtifactPolicy(ttl_days=30, max_mb=None, regenerable=False),
+    "landmarks": ArtifactPolicy(ttl_days=90, max_mb=None, regenerable=False),
+    "overlay": ArtifactPolicy(ttl_days=7, max_mb=20 * 1024, regenerable=True),
+    "issues": ArtifactPolicy(ttl_days=30, max_mb=None, regenerable=True),
+    "evaluation": ArtifactPolicy(ttl_days=30, max_mb=None, regenerable=True),
+    # The analyzer's annotated keyframe is only rebuilt by re-running the analysis
+    "keyframe": ArtifactPolicy(ttl_days=30, max_mb=2 * 1024, regenerable=False),
+    "preview": ArtifactPolicy(ttl_days=30, max_mb=1024, regenerable=True),
+    "track": ArtifactPolicy(ttl_days=90, max_mb=None, regenerable=True),
+    "analysis": ArtifactPolicy(ttl_days=None, max_mb=None, regenerable=False),
+    "error": ArtifactPolicy(ttl_days=7, max_mb=None, regenerable=False),
+    "bundle": ArtifactPolicy(ttl_days=7, max_mb=None, regenerable=True),
+}
+
+
+def load_policies() -> Dict[str, ArtifactPolicy]:
+    policies = {}
+    for name, default in DEFAULT_POLICIES.items():
+        ttl = os.getenv(f"RETENTION_{name.upper()}_TTL_DAYS")
+        max_mb = os.getenv(f"RETENTION_{name.upper()}_MAX_MB")
+        policies[name] = ArtifactPolicy(
+            ttl_days=default.ttl_days if ttl is None else (float(ttl) or None),
+            max_mb=default.max_mb if max_mb is None else (float(max_mb) or None),
+            regenerable=default.regenerable,
+        )
+    return policies
+
+
+def load_academy_quotas() -> Dict[str, float]:
+    """
+    Quotas in MB. ACADEMY_QUOTAS is a JSON object {academy_id: mb};
+    "*" applies to every academy not listed explicitly.
+    """
+    raw = os.getenv("ACADEMY_QUOTAS", '{"*": 51200}')
+    return {k: float(v) for k, v in json.loads(raw).items()}
+
+
+def classify(path: Path) -> Optional[str]:
+    """Map a file in the upload/result directories to its artifact class."""
+    if path.is_relative_to(UPLOAD_DIR):
+        return "upload"
+    name = path.name
+    if name.endswith("_landmarks.error.txt"):
+        return "error"
+    if name.endswith(("_landmarks.jsonl", "_landmarks.json")):
+        return "landmarks"
+    if name.endswith(".issues.json"):
+        return "issues"
+    if "_overlay." in name:
+        return "overlay"
+    if name.endswith("_track.json"):
+        return "track"
+    if name.endswith("_evaluation.json"):
+        return "evaluation"
+    if "_preview" in name:
+        # Poster, keyframe and sprite images are listed by the {job}_preview.json manifest
+        return "preview"
+    if name.endswith("_keyframe.jpg"):
+        return "keyframe"
+    if name.endswith(("_analysis.json", "_session.json")):
+        return "analysis"
+    if name.endswith("_bundle.zip"):
+        return "bundle"
+    return None
+
+
+@dataclass
+class Artifact:
+    path: Path
+    job_id: str
+    kind: str
+    size: int
+    last_used: float
+    academy: str = "unassigned"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "bytes": self.size,
+            "last_used": self.last_used,
+            "academy": self.academy,
+        }
+
+
+@dataclass
+class SweepReport:
+    dry_run: bool
+    scanned: int = 0
+    scanned_bytes: int = 0
+    evicted: List[Dict[str, Any]] = field(default_factory=list)
+    freed_bytes: int = 0
+    usage_by_academy: Dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "dry_run": self.dry_run,
+            "scanned": self.scanned,
+            "scanned_bytes": self.scanned_bytes,
+            "evicted": self.evicted,
+            "evicted_count": len(self.evicted),
+            "freed_bytes": self.freed_bytes,
+            "usage_by_academy": self.usage_by_academy,
+        }
+
+
+def scan() -> List[Artifact]:
+    """One pass over both (sharded) storage trees; pinned jobs are left out entirely."""
+    found = []
+    for root in (UPLOAD_DIR, RESULT_DIR):
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                m = JOB_FILE_RE.match(name)
+                if not m:
+                    continue
+                path = Path(dirpath) / name
+                kind = classify(path)
+                if kind is not None:
+                    found.append((path, m.group(1), kind))
+
+    pinned = pinned_job_ids()
+    academies = academies_for(job_id for _, job_id, _ in found)
+    artifacts = []
+    for path, job_id, kind in found:
+        if job_id in pinned:
+            continue
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        artifacts.append(Artifact(
+            path=path,
+            job_id=job_id,
+            kind=kind,
+            size=st.st_size,
+            last_used=max(st.st_atime, st.st_mtime),
+            academy=academies.get(job_id) or "unassigned",
+        ))
+    return artifacts
+
+
+def plan_evictions(artifacts: List[Artifact], now: float,
+                   policies: Dict[str, ArtifactPolicy],
+                   quotas: Dict[str, float]) -> List[tuple]:
+    """Return [(artifact, reason)] in the order they should be deleted."""
+    evict: Dict[Path, tuple] = {}
+
+    # 1. TTL per class
+    for a in artifacts:
+        ttl = policies[a.kind].ttl_days
+        if ttl is not None and now - a.last_used > ttl * DAY:
+            evict[a.path] = (a, "ttl")
+
+    # 2. LRU per class down to the class size cap
+    for kind, policy in policies.items():
+        if policy.max_mb is None:
+            continue
+        remaining = sorted((a for a in artifacts if a.kind == kind and a.path not in evict),
+                           key=lambda a: a.last_used)
+        total = sum(a.size for a in remaining)
+        for a in remaining:
+            if total <= policy.max_mb * MB:
+                break
+            evict[a.path] = (a, "class_lru")
+            total -= a.size
+
+    # 3. Per-academy quotas: every artifact counts towards the quota, but only
+    #    regenerable ones are evicted for it, least recently used first. Uploads,
+    #    landmarks and results only ever leave by TTL.
+    by_academy: Dict[str, List[Artifact]] = {}
+    for a in artifacts:
+        if a.path not in evict:
+            by_academy.setdefault(a.academy, []).append(a)
+    for academy, items in by_academy.items():
+        quota = quotas.get(academy, quotas.get("*"))
+        if quota is None:
+            continue
+        total = sum(a.size for a in items)
+        candidates = sorted((a for a in items if policies[a.kind].regenerable), key=lambda a: a.last_used)
+        for a in candidates:
+            if total <= quota * MB:
+                break
+            evict[a.path] = (a, "academy_quota")
+            total -= a.size
+
+    return sorted(evict.values(), key=lambda item: item[0].last_used)
+
+
+def sweep(dry_run: bool = True, now: Optional[float] = None) -> SweepReport:
+    """Apply all retention rules once and report what was (or would be) removed."""
+    now = time.time() if now is None else now
+    artifacts = scan()
+    report = SweepReport(dry_run=dry_run)
+    report.scanned = len(artifacts)
+    report.scanned_bytes = sum(a.size for a in artifacts)
+    for a in artifacts:
+        report.usage_by_academy[a.academy] = report.usage_by_academy.get(a.academy, 0) + a.size
+
+    for a, reason in plan_evictions(artifacts, now, load_policies(), load_academy_quotas()):
+        if not dry_run:
+            try:
+                a.path.unlink()
+            except FileNotFoundError:
+                continue
+            if a.kind != "upload":
+                set_artifact(a.job_id, a.kind, None)
+        entry = a.as_dict()
+        entry["reason"] = reason
+        report.evicted.append(entry)
+        report.freed_bytes += a.size
+
+    log("retention_sweep", dry_run=dry_run, scanned=report.scanned,
+        evicted=len(report.evicted), freed_mb=round(report.freed_bytes / MB, 1))
+    return report
+
+
+def usage() -> Dict[str, Any]:
+    artifacts = scan()
+    by_kind: Dict[str, int] = {}
+    by_academy: Dict[str, int] = {}
+    for a in artifacts:
+        by_kind[a.kind] = by_kind.get(a.kind, 0) + a.size
+        by_academy[a.academy] = by_academy.get(a.academy, 0) + a.size
+    return {"bytes_by_kind": by_kind, "bytes_by_academy": by_academy,
+            "quotas_mb": load_academy_quotas()}
+
+
+class Sweeper:
+    """Background thread that runs a sweep every RETENTION_SWEEP_INTERVAL_S seconds."""
+
+    def __init__(self, interval_s: float, dry_run: bool):
+        self.interval_s = interval_s
+        self.dry_run = dry_run
+        self.last_report: Optional[SweepReport] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="retention-sweeper", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.last_report = sweep(dry_run=self.dry_run)
+            except Exception as e:
+                log("retention_sweep_failed", level=logging.ERROR, error=str(e))
+
+
+def start_sweeper() -> Optional[Sweeper]:
+    interval = float(os.getenv("RETENTION_SWEEP_INTERVAL_S", "3600"))
+    if interval <= 0:
+        return None
+    dry_run = os.getenv("RETENTION_DRY_RUN", "false").lower() in ("1", "true", "yes")
+    sweeper = Sweeper(interval, dry_run)
+    sweeper.start()
+    return sweeper
@@ -1,85 +1,140 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import Dict, Any
-import json
+from typing import Dict, Any, Optional
 from pathlib import Path
-import sys
-import os
-
-# Add the app directory to the path so we can import our analysis module
-sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from app.analysis.cover_drive_analyzer import analyze_cover_drive_video
-
-# ===============================
-# FIX: Use Render storage folders
-# ===============================
-UPLOAD_DIR = "/storage/uploads"
-RESULT_DIR = "/storage/results"
+import json
+import time
+
+from app.analysis.registry import DEFAULT_SHOT, SHOTS, get_analyzer_class
+from app.processing.pose_estimator import TIERS
+from app.processing.policy import default_config, plan_cascade
+from app import admission, memo, singleflight, workers
+from app.telemetry import job_context, job_finished
+from app.storage import result_dir
+from app.jobs import get_job
+from app.pipeline import fresh_artifacts, save_analysis
+from app.session import analyze_session
 
 router = APIRouter(prefix="/analyze", tags=["Analysis"])
 
 class AnalysisRequest(BaseModel):
     job_id: str
     shot: str
+    player_id: Optional[str] = None
+    pose_tier: Optional[str] = None  # lite | full | heavy; defaults to POSE_TIER_ANALYSIS
+
+def _reuse(job_id: str, artifact: str, shot: str):
+    """The result another API process finished for this job and shot while we waited for its lock."""
+    def reuse(since: float) -> Optional[Dict[str, Any]]:
+        paths = fresh_artifacts(job_id, (artifact,), since)
+        if paths is None:
+            return None
+        result = json.loads(Path(paths[artifact]).read_text())
+        return result if result.get("shot_type") == shot else None
+    return reuse
+
 
 @router.post("/")
-async def analyze_video(request: AnalysisRequest):
+async def analyze_video(request: AnalysisRequest, http_request: Request):
+    if request.pose_tier and request.pose_tier not in TIERS:
+        raise HTTPException(status_code=400, detail=f"pose_tier must be one of {TIERS}")
     try:
         # Locate uploaded video
-        upload_dir = Path(UPLOAD_DIR)
-        video_files = list(upload_dir.glob(f"{request.job_id}_*"))
-
-        if not video_files:
+        job = get_job(request.job_id)
+        if job is None or not Path(job.upload_path).exists():
             raise HTTPException(status_code=404, detail="Video file not found")
 
-        video_path = video_files[0]
-        original_filename = video_path.name
+        video_path = Path(job.upload_path)
 
         # Output directory for results
-        output_dir = Path(RESULT_DIR)
-        output_dir.mkdir(parents=True, exist_ok=True)
-
-        # Shot-specific analysis
-        if request.shot == "cover_drive":
-            result = analyze_cover_drive_video(str(video_path), str(output_dir))
-        else:
-            result = analyze_cover_drive_video(str(video_path), str(output_dir))
+        output_dir = result_dir(request.job_id)
+        client = admission.client_id(http_request)
+
+        def compute() -> Dict[str, Any]:
+            # Shot-specific analysis (unknown shots fall back to the cover drive profile)
+            analyzer_cls = get_analyzer_class(request.shot if request.shot in SHOTS else DEFAULT_SHOT)
+            # Same video, analyzer version and undegraded model config: the result cannot differ
+            cached = memo.lookup(job, analyzer_cls, default_config("analysis", request.pose_tier))
+            if cached is not None:
+                cached["shot_type"] = request.shot
+                return save_analysis(job, request.shot, cached, request.player_id)
+
+            if job.probe:
+                probe = job.probe
+            else:
+                from app.processing.mediapipe_utils import probe_video
+                probe = probe_video(str(video_path))
+            config = plan_cascade("analysis", "interactive", probe, analyzer_cls.keyframe_offset,
+                                  request.pose_tier)
+            analyzer = analyzer_cls(config=config)
+            estimate = admission.estimate_analysis_s(probe, config.tier, analyzer_cls.keyframe_offset)
+            t0 = time.perf_counter()
+            try:
+                with admission.admitted("analyze", client, estimate), \
+                        workers.inflight(), job_context(request.job_id):
+                    result = analyzer.analyze(str(video_path), str(output_dir))
+                    job_finished("analyze", time.perf_counter() - t0, error=result.get("error"),
+                                 shot=request.shot, tier=config.tier)
+            except admission.Rejected as e:
+                raise e.http()
             result["shot_type"] = request.shot
+            memo.store(job, analyzer_cls, config, result)
 
-        # ----------- RETURN ONLY THE ANNOTATED VIDEO PATH -------------
+            return save_analysis(job, request.shot, result, request.player_id)
 
-        # Detect overlay video (prefer .avi since that's what is generated)
-        overlay_avi = Path(RESULT_DIR) / f"{request.job_id}_overlay.avi"
-        overlay_mp4 = Path(RESULT_DIR) / f"{request.job_id}_overlay.mp4"
+        # Retries, double clicks and reloads attach to the analysis already running
+        key = f"analyze:{request.job_id}:{request.shot}:{request.pose_tier}:{request.player_id}"
+        return await run_in_threadpool(singleflight.run, key, compute,
+                                       _reuse(request.job_id, "analysis", request.shot))
 
-        if overlay_avi.exists():
-            overlay_file = overlay_avi
-        elif overlay_mp4.exists():
-            overlay_file = overlay_mp4
-        else:
-            overlay_file = None
-
-        # Provide ONLY the field expected by the frontend
-        if overlay_file:
-            # Frontend constructs: backendUrl + "/static/" + video_path
-            result["video_path"] = f"results/{overlay_file.name}"
-        else:
-            result["video_path"] = None
-
-        # Clean up any other fields we do not want to expose
-        if "keyframe_path" in result:
-            del result["keyframe_path"]
-        if "keyframe_url" in result:
-            del result["keyframe_url"]
-        if "overlay_video_url" in result:
-            del result["overlay_video_url"]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
-        # Save results
-        result_file = Path(RESULT_DIR) / f"{request.job_id}_analysis.json"
-        with open(result_file, "w") as f:
-            json.dump(result, f, indent=2)
 
-        return result
+class SessionRequest(BaseModel):
+    job_id: str
+    shot: str = DEFAULT_SHOT
+    pose_tier: Optional[str] = None
+
+
+@router.post("/session")
+async def analyze_net_session(request: SessionRequest, http_request: Request):
+    """
+    Analyse a net-session recording with many deliveries: split it into per-delivery
+    windows, analyse each in parallel and return per-delivery scores plus session
+    consistency statistics.
+    """
+    if request.pose_tier and request.pose_tier not in TIERS:
+        raise HTTPException(status_code=400, detail=f"pose_tier must be one of {TIERS}")
+    if request.shot not in SHOTS:
+        raise HTTPException(status_code=400, detail=f"shot must be one of {SHOTS}")
+    job = get_job(request.job_id)
+    if job is None or not Path(job.upload_path).exists():
+        raise HTTPException(status_code=404, detail="Video file not found")
+    client = admission.client_id(http_request)
+
+    def compute() -> Dict[str, Any]:
+        if job.probe:
+            probe = job.probe
+        else:
+            from app.processing.mediapipe_utils import probe_video
+            probe = probe_video(job.upload_path)
+        try:
+            with admission.admitted("session", client, admission.estimate_session_s(probe, request.pose_tier)):
+                return analyze_session(job, request.shot, request.pose_tier)
+        except admission.Rejected as e:
+            raise e.http()
 
+    try:
+        with job_context(request.job_id):
+            # Blocks on the worker pool; keep the event loop free meanwhile
+            return await run_in_threadpool(
+                singleflight.run, f"session:{job.id}:{request.shot}:{request.pose_tier}",
+                compute, _reuse(job.id, "session", request.shot))
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Session analysis failed: {str(e)}")
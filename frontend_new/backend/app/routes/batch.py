@@ -0,0 +1,173 @@
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import zipfile
+
+from app.analysis.registry import SHOTS
+from app.batch import (create_batch, get_batch, schedule_clip, batch_progress,
+                       batch_summary, summary_csv)
+from app.jobs import create_job, delete_jobs
+from app.processing.pose_estimator import TIERS
+from app.storage import gen_job_id, save_stream, upload_dir
+from app import workers
+from app.telemetry import log
+
+router = APIRouter(prefix="/batch", tags=["Batch"])
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi", ".webm")
+MAX_CLIPS = 200
+BATCH_PRIORITIES = ("batch", "backfill")
+
+
+def _parse_labels(raw: Optional[str]) -> Any:
+    """
+    `shots` is JSON: either a list aligned with the clip order, or an object keyed by
+    clip filename. Each label is a shot name or {"shot": ..., "player_id": ...}.
+    """
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="shots must be valid JSON")
+
+
+def _label_for(labels: Any, index: int, filename: str, default_shot: str,
+               default_player: Optional[str]) -> Tuple[str, Optional[str]]:
+    label = None
+    if isinstance(labels, list) and index < len(labels):
+        label = labels[index]
+    elif isinstance(labels, dict):
+        label = labels.get(filename, labels.get(Path(filename).name))
+    if isinstance(label, dict):
+        return label.get("shot", default_shot), label.get("player_id", default_player)
+    return label or default_shot, default_player
+
+
+def _collect(files: List[UploadFile], labels: Any, default_shot: str,
+             default_player: Optional[str]) -> Tuple[List[Dict[str, Any]], Dict[int, zipfile.ZipFile]]:
+    """
+    Every clip in the request with its label, validated before anything is written:
+    file types, archive contents, the clip limit and each clip's shot. Returns the
+    clips and the opened archives by upload index.
+    """
+    clips: List[Dict[str, Any]] = []
+    archives: Dict[int, zipfile.ZipFile] = {}
+    for i, upload in enumerate(files):
+        name = upload.filename or ""
+        if name.lower().endswith(".zip"):
+            try:
+                archive = archives[i] = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"Not a valid zip archive: {name}")
+            clips.extend({"clip": member, "upload": i, "member": member}
+                         for member in sorted(archive.namelist())
+                         if member.lower().endswith(VIDEO_EXTENSIONS) and not member.startswith("__MACOSX"))
+        elif name.lower().endswith(VIDEO_EXTENSIONS):
+            clips.append({"clip": name, "upload": i, "member": None})
+        else:
+            raise HTTPException(status_code=400, detail=f"Unsupported file type: {name}")
+        if len(clips) > MAX_CLIPS:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_CLIPS} clips per batch")
+
+    if not clips:
+        raise HTTPException(status_code=400, detail="No video clips found in the request")
+    for index, clip in enumerate(clips):
+        clip["shot"], clip["player_id"] = _label_for(labels, index, clip["clip"], default_shot, default_player)
+        if clip["shot"] not in SHOTS:
+            raise HTTPException(status_code=400, detail=f"Unsupported shot '{clip['shot']}' for {clip['clip']}")
+    return clips, archives
+
+
+def _discard(job_ids: List[str]) -> None:
+    """Remove the uploads and job rows of a batch whose request failed part-way."""
+    for job_id in job_ids:
+        for path in upload_dir(job_id).glob(f"{job_id}_*"):
+            path.unlink(missing_ok=True)
+    delete_jobs(job_ids)
+
+
+@router.post("/")
+def submit_batch(files: List[UploadFile] = File(...),
+                 shots: Optional[str] = Form(None),
+                 default_shot: str = Form("cover_drive"),
+                 academy_id: Optional[str] = Form(None),
+                 player_id: Optional[str] = Form(None),
+                 pose_tier: Optional[str] = Form(None),
+                 priority: str = Form("batch")):
+    """
+    Accept many clips (and/or .zip archives of clips) with per-clip shot labels,
+    and schedule them all on the worker pool as one batch. priority is batch, or
+    backfill for re-analysis of old footage that should only use spare capacity.
+    The whole request is validated before any clip is stored; if storing fails
+    part-way, the clips already stored are removed again.
+    """
+    if pose_tier and pose_tier not in TIERS:
+        raise HTTPException(status_code=400, detail=f"pose_tier must be one of {TIERS}")
+    if priority not in BATCH_PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of {BATCH_PRIORITIES}")
+    labels = _parse_labels(shots)
+    batch_id = gen_job_id()
+    archives: Dict[int, zipfile.ZipFile] = {}
+    job_ids: List[str] = []
+    try:
+        clips, archives = _collect(files, labels, default_shot, player_id)
+        for clip in clips:
+            job_id = gen_job_id()
+            job_ids.append(job_id)
+            archive = archives.get(clip["upload"])
+            with archive.open(clip["member"]) if archive else nullcontext(files[clip["upload"]].file) as source:
+                path, content_hash, size = save_stream(job_id, clip["clip"], source)
+            create_job(job_id, Path(clip["clip"]).name, path, content_hash=content_hash, size_bytes=size,
+                       academy_id=academy_id, player_id=clip["player_id"], shot=clip["shot"],
+                       batch_id=batch_id)
+            clip["job_id"] = job_id
+        create_batch(batch_id, academy_id, len(clips))
+    except BaseException:
+        _discard(job_ids)
+        raise
+    finally:
+        for archive in archives.values():
+            archive.close()
+        for upload in files:
+            upload.file.close()
+
+    depth = workers.queue_depth()
+    for clip in clips:
+        schedule_clip(batch_id, clip["job_id"], clip["shot"], pose_tier, queue_depth=depth,
+                      request_class=priority)
+    log("batch_queued", batch_id=batch_id, clips=len(clips), queue_depth=depth, priority=priority)
+
+    return {"batch_id": batch_id, "status": "running",
+            "clips": [{"job_id": c["job_id"], "clip": c["clip"], "shot": c["shot"]} for c in clips]}
+
+
+@router.get("/{batch_id}")
+def get_batch_progress(batch_id: str):
+    if get_batch(batch_id) is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch_progress(batch_id)
+
+
+@router.get("/{batch_id}/summary")
+def get_batch_summary(batch_id: str, format: str = "json"):
+    if get_batch(batch_id) is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    rows = batch_summary(batch_id)
+    if format == "csv":
+        return PlainTextResponse(summary_csv(rows), media_type="text/csv")
+    return {"batch_id": batch_id, "rows": rows}
+
+
+@router.get("/{batch_id}/bundle")
+def get_batch_bundle(batch_id: str):
+    batch = get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if not batch.bundle_path or not Path(batch.bundle_path).exists():
+        raise HTTPException(status_code=409, detail="Batch still running")
+    return FileResponse(batch.bundle_path, media_type="application/zip",
+                        filename=f"batch_{batch_id}.zip")
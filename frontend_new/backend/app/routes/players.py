@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from datetime import date
+from typing import Optional
+
+from app import profiles
+from app.history import player_history, player_trend, OVERALL
+
+router = APIRouter(prefix="/players", tags=["Players"])
+
+
+@router.get("/{player_id}/history")
+def history(player_id: str, shot: Optional[str] = None, recent: int = 10):
+    return player_history(player_id, shot=shot, recent=recent)
+
+
+@router.get("/{player_id}/trend/{shot}")
+def trend(player_id: str, shot: str, metric: str = OVERALL, since: Optional[date] = None):
+    return player_trend(player_id, shot, metric=metric, since=since)
+
+
+class AssignProfileRequest(BaseModel):
+    profile: str
+    rescore: bool = True
+
+
+@router.get("/{player_id}/profile")
+def get_player_profile(player_id: str):
+    return {"player_id": player_id, "profile": profiles.profile_for(player_id)}
+
+
+@router.put("/{player_id}/profile")
+def assign_profile(player_id: str, request: AssignProfileRequest):
+    """Score the player against another threshold profile, re-scoring their stored analyses."""
+    if not profiles.assign(player_id, request.profile):
+        raise HTTPException(status_code=404, detail=f"No threshold profile named '{request.profile}'")
+    response = {"player_id": player_id, "profile": request.profile}
+    if request.rescore:
+        response["rescore"] = profiles.rescore_all(None, [player_id])
+    return response
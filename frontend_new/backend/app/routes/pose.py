@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+
+from app.processing.pose_estimator import (TIERS, STAGES, tier_for_stage, default_backend,
+                                           model_path, throughput)
+
+router = APIRouter(prefix="/pose", tags=["Pose"])
+
+
+@router.get("/tiers")
+async def pose_tiers():
+    """Available model tiers, the tier each pipeline stage uses, and measured throughput."""
+    return {
+        "tiers": [{"tier": t, "backend": default_backend(t), "tasks_model": model_path(t).exists()}
+                  for t in TIERS],
+        "stages": {stage: tier_for_stage(stage) for stage in STAGES},
+        "throughput": throughput(),
+    }
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+from app import profiles
+
+router = APIRouter(prefix="/profiles", tags=["Profiles"])
+
+
+class ProfileVersionRequest(BaseModel):
+    # metric -> [low, high]; metrics left out keep the previous version's ranges
+    ideal_ranges: Dict[str, List[float]] = {}
+    acceptable_ranges: Dict[str, List[float]] = {}
+    note: Optional[str] = None
+    # Re-score the stored analyses of players on this profile straight away
+    rescore: bool = True
+
+
+class RescoreRequest(BaseModel):
+    shot: Optional[str] = None  # every shot when omitted
+    profile: Optional[str] = None
+    player_ids: Optional[List[str]] = None
+
+
+@router.get("/")
+def list_profiles(shot: Optional[str] = None):
+    return {"profiles": profiles.list_profiles(shot)}
+
+
+@router.get("/{name}/{shot}")
+def get_profile(name: str, shot: str, version: Optional[int] = None):
+    try:
+        thresholds = profiles.get_profile(name, shot, version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if thresholds is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return thresholds.as_dict()
+
+
+@router.post("/{name}/{shot}")
+async def create_profile_version(name: str, shot: str, request: ProfileVersionRequest):
+    """Store a new version of a profile and re-score the analyses it applies to."""
+    try:
+        thresholds = await run_in_threadpool(profiles.create_version, name, shot, request.ideal_ranges,
+                                             request.acceptable_ranges, request.note)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response: Dict[str, Any] = thresholds.as_dict()
+    if request.rescore:
+        response["rescore"] = await run_in_threadpool(profiles.rescore, shot, name)
+    return response
+
+
+@router.post("/rescore")
+async def rescore(request: RescoreRequest):
+    """Re-score stored analyses against their players' current profiles, without re-processing video."""
+    try:
+        if request.shot:
+            results = [await run_in_threadpool(profiles.rescore, request.shot, request.profile,
+                                               request.player_ids)]
+        else:
+            results = await run_in_threadpool(profiles.rescore_all, request.profile, request.player_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"results": results}
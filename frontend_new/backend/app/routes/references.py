@@ -0,0 +1,77 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+
+from app.analysis.registry import DEFAULT_SHOT, SHOTS
+from app.jobs import get_job
+from app import references
+
+router = APIRouter(prefix="/references", tags=["References"])
+
+
+class ReferenceRequest(BaseModel):
+    job_id: str
+    name: str
+    shot: str = DEFAULT_SHOT
+    # Set for a player's own best; leave empty for a reference shared with everyone (e.g. a pro)
+    player_id: Optional[str] = None
+
+
+class CompareRequest(BaseModel):
+    job_id: str
+    shot: Optional[str] = None  # defaults to the job's analysed shot
+    reference_id: Optional[int] = None  # search the library when omitted
+    player_id: Optional[str] = None  # include this player's own references (defaults to the job's player)
+    k: int = 3
+
+
+def _shot(shot: Optional[str], job) -> str:
+    shot = shot or job.shot or DEFAULT_SHOT
+    if shot not in SHOTS:
+        raise HTTPException(status_code=400, detail=f"shot must be one of {SHOTS}")
+    return shot
+
+
+@router.post("/")
+def add_reference(request: ReferenceRequest):
+    """Store a job's swing as a reference technique clip."""
+    job = get_job(request.job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        return references.add_reference(job, _shot(request.shot, job), request.name, request.player_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/")
+def list_references(shot: Optional[str] = None, player_id: Optional[str] = None):
+    return {"references": references.list_references(shot, player_id)}
+
+
+@router.delete("/{reference_id}")
+def delete_reference(reference_id: int):
+    if not references.delete_reference(reference_id):
+        raise HTTPException(status_code=404, detail="Reference not found")
+    return {"deleted": reference_id}
+
+
+@router.post("/compare")
+def compare(request: CompareRequest):
+    """
+    DTW comparison of a job's whole swing against a reference, or against the closest
+    references in the library, with per-joint deviation timelines.
+    """
+    if request.k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1")
+    job = get_job(request.job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        result = references.compare_job(job, _shot(request.shot, job), request.reference_id,
+                                        request.player_id or job.player_id, request.k)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Reference not found")
+    return result
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+
+from app import similarity
+from app.vector_index import NPROBE
+
+router = APIRouter(prefix="/similar", tags=["Similarity"])
+
+MAX_K = 500
+
+
+def _check_k(k: int) -> None:
+    if not 1 <= k <= MAX_K:
+        raise HTTPException(status_code=400, detail=f"k must be between 1 and {MAX_K}")
+
+
+def _check_nprobe(nprobe: int) -> None:
+    if nprobe < 1:
+        raise HTTPException(status_code=400, detail="nprobe must be at least 1")
+
+
+async def _search(fn, *args):
+    try:
+        result = await run_in_threadpool(fn, *args)
+    except similarity.StaleEmbedding as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="No swing embedding for this job (not analysed, or no swing found)")
+    return result
+
+
+@router.get("/{job_id}")
+async def similar_swings(job_id: str, k: int = 10, player_id: Optional[str] = None,
+                         exclude_player: Optional[str] = None, nprobe: int = NPROBE):
+    """The analysed swings most like this job's (optionally only one player's, or not one player's)."""
+    _check_k(k)
+    _check_nprobe(nprobe)
+    return await _search(similarity.similar, job_id, k, player_id, exclude_player, nprobe)
+
+
+@router.get("/{job_id}/players")
+async def similar_players(job_id: str, k: int = 10, swings: int = 200, nprobe: int = NPROBE):
+    """Other players whose swings share this swing's pattern."""
+    _check_k(k)
+    _check_k(swings)
+    _check_nprobe(nprobe)
+    return await _search(similarity.similar_players, job_id, k, swings, nprobe)
+
+
+@router.post("/backfill")
+async def backfill(limit: Optional[int] = None):
+    """Embed swings analysed before embeddings were stored."""
+    return await run_in_threadpool(similarity.backfill, limit)
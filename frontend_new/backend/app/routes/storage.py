@@ -0,0 +1,72 @@
+from fastapi import APIRouter, HTTPException, Request
+from pathlib import Path
+
+from app.storage import result_path
+from app.jobs import get_job, update_job, set_artifact
+from app.telemetry import job_context
+from app import admission, retention, workers
+
+router = APIRouter(prefix="/storage", tags=["Storage"])
+
+REGENERABLE = ("landmarks", "overlay", "issues", "evaluation", "preview", "track")
+# Rebuilt by the overlay pass, which decodes and draws every frame again
+OVERLAY_ARTIFACTS = ("overlay", "issues", "evaluation")
+
+
+@router.get("/usage")
+def storage_usage():
+    return retention.usage()
+
+
+@router.post("/sweep")
+def run_sweep(dry_run: bool = True):
+    """Run a retention sweep now. Defaults to a dry run that only reports."""
+    return retention.sweep(dry_run=dry_run).as_dict()
+
+
+@router.post("/pin/{job_id}")
+def pin(job_id: str):
+    if update_job(job_id, pinned=True) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, "pinned": True}
+
+
+@router.delete("/pin/{job_id}")
+def unpin(job_id: str):
+    if update_job(job_id, pinned=False) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, "pinned": False}
+
+
+@router.post("/regenerate/{job_id}/{artifact}")
+def regenerate(job_id: str, artifact: str, request: Request):
+    """Rebuild an evicted derived artifact from the original upload, on the worker pool."""
+    if artifact not in REGENERABLE:
+        raise HTTPException(status_code=400, detail=f"Artifact must be one of {REGENERABLE}")
+
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not Path(job.upload_path).exists():
+        raise HTTPException(status_code=410, detail="Original upload no longer retained")
+    video_path = job.upload_path
+
+    landmarks_path = job.artifacts.get("landmarks") or result_path(job_id)
+    rerun = artifact == "landmarks" or not Path(landmarks_path).exists()
+    if rerun:
+        landmarks_path = result_path(job_id)
+        set_artifact(job_id, "landmarks", landmarks_path)
+
+    if job.probe:
+        probe = job.probe
+    else:
+        from app.processing.mediapipe_utils import probe_video
+        probe = probe_video(video_path)
+    estimate = admission.estimate_upload_s(probe["frame_count"], overlay=artifact in OVERLAY_ARTIFACTS,
+                                           landmarks=rerun)
+    try:
+        with admission.admitted("regenerate", admission.client_id(request), estimate), job_context(job_id):
+            return workers.submit(workers.regenerate_artifact, video_path, job_id, artifact, landmarks_path,
+                                  rerun, tenant=job.academy_id, cost=estimate).result()
+    except admission.Rejected as e:
+        raise e.http()
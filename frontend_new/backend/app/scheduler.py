@@ -0,0 +1,131 @@
+# backend/app/scheduler.py
+"""
+Order in which queued pool tasks are handed to the worker processes.
+
+Classes are served in strict priority (interactive, then batch, then backfill),
+so a single athlete's clip never queues behind an academy's 200-clip batch.
+Within a class, tenants (academies) share the workers by weighted fair queuing:
+each task gets a virtual finish time of max(class clock, tenant's last finish)
++ cost / weight, and the smallest finish time goes first, so a tenant with a
+big batch takes its turn alongside one with a single clip instead of ahead of
+it. Pool tasks cannot be preempted once running; instead a task that has
+waited longer than its class's aging limit is promoted one class per limit
+waited, so a steady interactive load cannot starve batches forever. Virtual
+times are only comparable within a class (each has its own clock), so a
+promoted task is not ranked by them in the class it joins: promoted tasks go
+first, longest waiting first.
+"""
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+CLASSES = ("interactive", "batch", "backfill")
+# Seconds waited before a task is promoted one class
+AGING_S = {
+    "batch": float(os.getenv("SCHEDULER_AGING_BATCH_S", "300")),
+    "backfill": float(os.getenv("SCHEDULER_AGING_BACKFILL_S", "1800")),
+}
+DEFAULT_TENANT = "default"
+
+
+def _weights(spec: str) -> Dict[str, float]:
+    """'academy-a=2,academy-b=0.5' -> {tenant: weight}; unlisted tenants weigh 1."""
+    weights = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        tenant, _, weight = part.partition("=")
+        weights[tenant.strip()] = float(weight)
+    return weights
+
+
+TENANT_WEIGHTS = _weights(os.getenv("SCHEDULER_TENANT_WEIGHTS", ""))
+
+
+@dataclass(order=True)
+class Task:
+    finish: float
+    seq: int
+    request_class: str = field(compare=False)
+    tenant: str = field(compare=False)
+    start: float = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    payload: Any = field(compare=False, default=None)
+
+    def effective_class(self, now: float) -> int:
+        """Index into CLASSES after aging."""
+        rank = CLASSES.index(self.request_class)
+        aging = AGING_S.get(self.request_class)
+        if aging:
+            rank -= int((now - self.enqueued_at) // aging)
+        return max(rank, 0)
+
+    def priority(self, now: float) -> Tuple:
+        """Sort key, smallest first: effective class, then promoted tasks by wait, then virtual finish."""
+        rank = self.effective_class(now)
+        if rank < CLASSES.index(self.request_class):
+            return (rank, 0, self.enqueued_at, self.seq)
+        return (rank, 1, self.finish, self.seq)
+
+
+class FairQueue:
+    """Not thread-safe; the caller (app.workers) serialises access."""
+
+    def __init__(self):
+        self._tasks: Dict[str, List[Task]] = {c: [] for c in CLASSES}
+        self._clock: Dict[str, float] = {c: 0.0 for c in CLASSES}
+        self._last_finish: Dict[Tuple[str, str], float] = {}
+        self._seq = 0
+
+    def push(self, payload: Any, request_class: str = "interactive", tenant: Optional[str] = None,
+             cost: float = 1.0, now: Optional[float] = None) -> Task:
+        if request_class not in CLASSES:
+            raise ValueError(f"Unknown request class '{request_class}', expected one of {list(CLASSES)}")
+        tenant = tenant or DEFAULT_TENANT
+        start = max(self._clock[request_class], self._last_finish.get((request_class, tenant), 0.0))
+        finish = start + max(cost, 1e-3) / TENANT_WEIGHTS.get(tenant, 1.0)
+        self._last_finish[(request_class, tenant)] = finish
+        self._seq += 1
+        task = Task(finish, self._seq, request_class, tenant, start,
+                    time.time() if now is None else now, payload)
+        self._tasks[request_class].append(task)
+        return task
+
+    def pop(self, max_class: int = len(CLASSES) - 1, now: Optional[float] = None) -> Optional[Task]:
+        """
+        Next task to run: the highest effective class present; within it, tasks promoted
+        into it by the longest wait, then its own by smallest virtual finish. Only
+        classes up to max_class (after aging) are eligible.
+        """
+        now = time.time() if now is None else now
+        best: Optional[Task] = None
+        best_key: Optional[Tuple] = None
+        for tasks in self._tasks.values():
+            for task in tasks:
+                key = task.priority(now)
+                if key[0] > max_class:
+                    continue
+                if best_key is None or key < best_key:
+                    best, best_key = task, key
+        if best is None:
+            return None
+        self._tasks[best.request_class].remove(best)
+        # The class clock follows the task in service, so idle tenants do not bank credit
+        self._clock[best.request_class] = max(self._clock[best.request_class], best.start)
+        return best
+
+    def depth(self) -> Dict[str, int]:
+        return {c: len(tasks) for c, tasks in self._tasks.items()}
+
+    def oldest_wait(self, now: Optional[float] = None) -> Dict[str, float]:
+        now = time.time() if now is None else now
+        return {c: max((now - t.enqueued_at for t in tasks), default=0.0)
+                for c, tasks in self._tasks.items()}
+
+    def drain(self) -> List[Task]:
+        tasks = [t for ts in self._tasks.values() for t in ts]
+        for ts in self._tasks.values():
+            ts.clear()
+        return tasks
+
+    def __len__(self) -> int:
+        return sum(len(ts) for ts in self._tasks.values())
@@ -0,0 +1,125 @@
+# backend/app/session.py
+"""
+Net-session analysis: a continuous recording with many deliveries is split into
+per-delivery windows on the worker pool, every window is analysed in parallel
+like a single clip, and the per-delivery scores are summarised into session
+consistency statistics.
+"""
+import json
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+from app import workers
+from app.admission import estimate_analysis_s
+from app.analysis.registry import get_analyzer_class
+from app.jobs import set_artifact
+from app.models.job import Job
+from app.processing.policy import plan_cascade
+from app.storage import result_dir, static_url
+from app.telemetry import job_finished, log, timed_step
+
+
+def delivery_score(result: Dict[str, Any]) -> Optional[float]:
+    """Mean feedback score of one delivery, as the player history computes overall_score."""
+    scores = [fb["score"] for fb in result.get("feedback", [])]
+    return sum(scores) / len(scores) if scores else None
+
+
+def _spread(values: List[float]) -> Dict[str, Any]:
+    n = len(values)
+    mean = sum(values) / n
+    std = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1)) if n > 1 else 0.0
+    return {"mean": mean, "std": std, "min": min(values), "max": max(values)}
+
+
+def session_stats(shot: str, deliveries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Per-metric spread across the analysed deliveries. A metric's consistency is
+    1 - std / (width of its acceptable range), floored at 0, so a batter whose
+    elbow angle wanders across the whole acceptable band scores 0 on it.
+    """
+    ok = [d for d in deliveries if not d.get("error")]
+    stats: Dict[str, Any] = {"deliveries": len(deliveries), "analysed": len(ok),
+                             "failed": len(deliveries) - len(ok)}
+    if not ok:
+        return stats
+
+    acceptable = get_analyzer_class(shot).acceptable_ranges
+    metrics: Dict[str, Any] = {}
+    consistency = []
+    for name in ok[0]["metrics"]:
+        values = [float(d["metrics"][name]) for d in ok if name in d["metrics"]]
+        entry = _spread(values)
+        low, high = acceptable.get(name, (0.0, 0.0))
+        if len(values) > 1 and high > low:
+            entry["consistency"] = max(0.0, 1 - entry["std"] / (high - low))
+            consistency.append(entry["consistency"])
+        metrics[name] = {k: round(v, 3) for k, v in entry.items()}
+    stats["metrics"] = metrics
+
+    scored = [(d["index"], d["overall_score"]) for d in ok if d["overall_score"] is not None]
+    if scored:
+        stats["overall_score"] = {k: round(v, 3) for k, v in _spread([s for _, s in scored]).items()}
+        stats["best_delivery"] = max(scored, key=lambda s: s[1])[0]
+        stats["worst_delivery"] = min(scored, key=lambda s: s[1])[0]
+    # 0-100; None with a single delivery, where there is nothing to compare
+    stats["consistency_score"] = round(100 * sum(consistency) / len(consistency), 1) if consistency else None
+    return stats
+
+
+def analyze_session(job: Job, shot: str, tier: Optional[str] = None) -> Dict[str, Any]:
+    """Segment the job's upload into deliveries, analyse them in parallel and summarise."""
+    t0 = time.perf_counter()
+    output_dir = str(result_dir(job.id))
+    landmarks_path = (job.artifacts or {}).get("landmarks")
+    segmentation = workers.submit(workers.segment_clip, job.upload_path, landmarks_path,
+                                  job.id, tenant=job.academy_id).result()
+    deliveries = segmentation.deliveries
+    log("session_segmented", job_id=job.id, deliveries=len(deliveries),
+        signals=segmentation.signals, fallback=segmentation.fallback)
+
+    # Plan against the queue as it was, plus this session's own deliveries queued behind each other
+    depth = workers.queue_depth() + len(deliveries) - 1
+    offset = get_analyzer_class(shot).keyframe_offset
+    futures = []
+    for d in deliveries:
+        probe = {"frame_count": d.end - d.start + 1, "fps": segmentation.fps}
+        config = plan_cascade("analysis", "interactive", probe, offset, tier, queue_depth=depth)
+        futures.append(workers.submit(workers.analyze_clip, job.upload_path, output_dir, shot,
+                                      job.id, config, d.frame_range(), tenant=job.academy_id,
+                                      cost=estimate_analysis_s(probe, config.tier, offset)))
+
+    rows = []
+    for d, future in zip(deliveries, futures):
+        row = {"index": d.index, "start_frame": d.start, "end_frame": d.end,
+               "peak_frame": d.peak_frame, "strength": d.strength,
+               "start_s": round(d.start / segmentation.fps, 2),
+               "end_s": round(d.end / segmentation.fps, 2)}
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"error": str(e), "metrics": {}, "feedback": []}
+        keyframe = result.pop("keyframe_path", None)
+        row.update(result)
+        row["keyframe_url"] = static_url(keyframe) if keyframe else None
+        row["overall_score"] = None if result.get("error") else delivery_score(result)
+        rows.append(row)
+
+    session = {
+        "job_id": job.id,
+        "shot_type": shot,
+        "segmentation": {k: v for k, v in segmentation.as_dict().items() if k != "deliveries"},
+        "deliveries": rows,
+        "session": session_stats(shot, rows),
+    }
+    path = result_dir(job.id) / f"{job.id}_session.json"
+    with timed_step("session", "json_write"), open(path, "w") as f:
+        json.dump(session, f, indent=2)
+    set_artifact(job.id, "session", str(path))
+
+    failed = session["session"]["failed"]
+    job_finished("session", time.perf_counter() - t0,
+                 error=f"{failed} of {len(rows)} deliveries failed" if failed == len(rows) else None,
+                 shot=shot, deliveries=len(rows))
+    return session
@@ -0,0 +1,253 @@
+# backend/app/similarity.py
+"""
+"Swings most like this one" and "players who share this pattern" over every
+analysed swing.
+
+Each analysis stores its swing embedding (app.processing.embedding) in
+swing_embeddings as it is saved, and logs the change in
+swing_embedding_changes. Each API process keeps one IVF index per shot and
+embedding layout (app.vector_index), loaded on first use and caught up before
+every query by re-reading the jobs changed since, so swings stored, replaced
+or deleted by any process or worker are reflected on the next query. Only the shot's current layout is indexed; swings embedded under an
+older one are left out until re-analysed.
+"""
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, select
+
+from app.analysis.registry import DEFAULT_SHOT, SHOTS, get_analyzer_class
+from app.db import SessionLocal
+from app.models.job import Job
+from app.models.similarity import SwingEmbedding, SwingEmbeddingChange
+from app.processing.embedding import DTYPE, dims, embed
+from app.telemetry import log
+from app.vector_index import NPROBE, IVFIndex
+
+# Rows read per round trip while loading an index
+SYNC_CHUNK = 10000
+# Changed jobs looked up per query while catching one up
+SYNC_JOBS_CHUNK = 500
+
+
+class StaleEmbedding(Exception):
+    """The job's embedding has an older layout than its shot's index; re-analyse it to search."""
+
+
+def current_dim(shot: str) -> int:
+    """Length of the shot's embeddings as analyses store them now."""
+    return dims(len(get_analyzer_class(shot if shot in SHOTS else DEFAULT_SHOT).acceptable_ranges))
+
+
+def embedding_for(shot: str, result: Dict[str, Any]) -> Optional[np.ndarray]:
+    """The swing embedding of an analysis result, or None without phases."""
+    analyzer_cls = get_analyzer_class(shot if shot in SHOTS else DEFAULT_SHOT)
+    return embed(result.get("phase_metrics"), result.get("phase_poses"), analyzer_cls.acceptable_ranges)
+
+
+def record(job_id: str, player_id: Optional[str], shot: str, result: Dict[str, Any]) -> bool:
+    """Store (or replace) a job's swing embedding. False when the swing has none."""
+    vector = embedding_for(shot, result)
+    with SessionLocal() as session:
+        previous = session.scalar(select(SwingEmbedding.shot).where(SwingEmbedding.job_id == job_id))
+        session.execute(delete(SwingEmbedding).where(SwingEmbedding.job_id == job_id))
+        if vector is not None:
+            session.add(SwingEmbedding(job_id=job_id, player_id=player_id, shot=shot,
+                                       dim=len(vector), vector=vector.tobytes()))
+        # Both shots' indexes re-read the job: it may have moved, or have no embedding now
+        changed = ({previous} if previous else set()) | ({shot} if vector is not None else set())
+        session.add_all(SwingEmbeddingChange(job_id=job_id, shot=s) for s in changed)
+        session.commit()
+    return vector is not None
+
+
+# ---------------------------------------------------------------------------
+# Per-process indexes
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ShotIndex:
+    dim: int
+    index: IVFIndex = field(init=False)
+    # Last change applied; None until the first load
+    synced: Optional[int] = None
+    players: Dict[str, Optional[str]] = field(default_factory=dict)
+    by_player: Dict[str, Set[str]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.index = IVFIndex(self.dim)
+
+    def sync(self, shot: str) -> int:
+        """
+        Load the shot's rows of this dim on first use, after that re-read the jobs
+        changed since the last sync; returns how many rows were added or removed.
+        """
+        with SessionLocal() as session:
+            if self.synced is None:
+                # Position first: a change committed during the load is applied next time
+                last = session.scalar(select(func.max(SwingEmbeddingChange.seq))) or 0
+                jobs, rows = None, self._load(session, shot)
+            else:
+                changes = session.execute(
+                    select(SwingEmbeddingChange.seq, SwingEmbeddingChange.job_id)
+                    .where(SwingEmbeddingChange.shot == shot, SwingEmbeddingChange.seq > self.synced)).all()
+                if not changes:
+                    return 0
+                last = max(c.seq for c in changes)
+                jobs = sorted({c.job_id for c in changes})
+                rows = []
+                for lo in range(0, len(jobs), SYNC_JOBS_CHUNK):
+                    rows.extend(session.execute(
+                        self._select(shot).where(SwingEmbedding.job_id.in_(jobs[lo:lo + SYNC_JOBS_CHUNK]))).all())
+        self.synced = last
+
+        # Jobs whose embedding was deleted, moved to another shot or re-embedded in another layout
+        removed = set(jobs or ()) - {r.job_id for r in rows}
+        for job_id in removed:
+            self.index.remove(job_id)
+            self._set_player(job_id, None)
+            self.players.pop(job_id, None)
+        if rows:
+            # One add, so a first load trains the index once
+            vectors = np.frombuffer(b"".join(r.vector for r in rows), dtype=DTYPE).reshape(len(rows), -1)
+            self.index.add_many([r.job_id for r in rows], vectors)
+        for r in rows:
+            self._set_player(r.job_id, r.player_id)
+        return len(rows) + len(removed)
+
+    def _select(self, shot: str):
+        return (select(SwingEmbedding.seq, SwingEmbedding.job_id, SwingEmbedding.player_id, SwingEmbedding.vector)
+                .where(SwingEmbedding.shot == shot, SwingEmbedding.dim == self.dim))
+
+    def _load(self, session, shot: str) -> List[Any]:
+        rows, after = [], 0
+        while True:
+            chunk = session.execute(self._select(shot).where(SwingEmbedding.seq > after)
+                                    .order_by(SwingEmbedding.seq).limit(SYNC_CHUNK)).all()
+            if not chunk:
+                return rows
+            rows.extend(chunk)
+            after = chunk[-1].seq
+
+    def _set_player(self, job_id: str, player_id: Optional[str]) -> None:
+        previous = self.players.get(job_id)
+        if previous:
+            self.by_player.get(previous, set()).discard(job_id)
+        self.players[job_id] = player_id
+        if player_id:
+            self.by_player.setdefault(player_id, set()).add(job_id)
+
+
+_indexes: Dict[Tuple[str, int], ShotIndex] = {}
+# One lock for every index: syncs and searches are short, and IVFIndex is not thread-safe
+_lock = threading.Lock()
+
+
+def _synced(shot: str) -> ShotIndex:
+    """The index of the shot's current embedding layout, caught up. Call with _lock held."""
+    dim = current_dim(shot)
+    entry = _indexes.get((shot, dim))
+    if entry is None:
+        entry = _indexes[(shot, dim)] = ShotIndex(dim)
+    entry.sync(shot)
+    return entry
+
+
+def _embedding(job_id: str) -> Optional[SwingEmbedding]:
+    with SessionLocal() as session:
+        return session.scalar(select(SwingEmbedding).where(SwingEmbedding.job_id == job_id))
+
+
+def similar(job_id: str, k: int = 10, player_id: Optional[str] = None,
+            exclude_player: Optional[str] = None, nprobe: int = NPROBE) -> Optional[Dict[str, Any]]:
+    """
+    The k swings most similar to a job's, by cosine similarity of their embeddings.
+    player_id searches only that player's swings (exactly); exclude_player leaves
+    one player's out. None if the job has no embedding; StaleEmbedding if it was
+    embedded under an older layout than the shot's index.
+    """
+    row = _embedding(job_id)
+    if row is None:
+        return None
+    query = np.frombuffer(row.vector, dtype=DTYPE)
+    t0 = time.perf_counter()
+    with _lock:
+        entry = _synced(row.shot)
+        if row.dim != entry.dim:
+            raise StaleEmbedding(f"Swing embedded with {row.dim} dims; {row.shot} swings now have "
+                                 f"{entry.dim}. Re-analyse the job to search it")
+        index = entry.index
+        if player_id:
+            found = index.search(query, k + 1, rows=index.rows_for(entry.by_player.get(player_id, ())))
+        else:
+            # Over-fetch so filtering still leaves k
+            fetch = k + 1 if not exclude_player else 4 * k + 1
+            found = index.search(query, fetch, nprobe)
+        matches = [{"job_id": other, "player_id": entry.players.get(other), "similarity": round(score, 4)}
+                   for other, score in found
+                   if other != job_id and (not exclude_player or entry.players.get(other) != exclude_player)][:k]
+        stats = index.stats()
+    return {"job_id": job_id, "shot": row.shot, "player_id": row.player_id, "matches": matches,
+            "index": stats, "query_ms": round((time.perf_counter() - t0) * 1000, 3)}
+
+
+def similar_players(job_id: str, k: int = 10, swings: int = 200,
+                    nprobe: int = NPROBE) -> Optional[Dict[str, Any]]:
+    """
+    Other players whose swings resemble this one: the `swings` nearest swings not
+    the job's own player's, grouped by player and ranked by how many of them are
+    theirs, then by their best similarity.
+    """
+    result = similar(job_id, swings, exclude_player=_embedding_player(job_id), nprobe=nprobe)
+    if result is None:
+        return None
+    players: Dict[str, Dict[str, Any]] = {}
+    for match in result["matches"]:
+        if not match["player_id"]:
+            continue
+        entry = players.setdefault(match["player_id"], {"player_id": match["player_id"], "swings": 0,
+                                                        "best": match["similarity"], "job_ids": []})
+        entry["swings"] += 1
+        if len(entry["job_ids"]) < 3:
+            entry["job_ids"].append(match["job_id"])
+    ranked = sorted(players.values(), key=lambda p: (-p["swings"], -p["best"]))[:k]
+    return {"job_id": job_id, "shot": result["shot"], "player_id": result["player_id"], "players": ranked,
+            "index": result["index"], "query_ms": result["query_ms"]}
+
+
+def _embedding_player(job_id: str) -> Optional[str]:
+    row = _embedding(job_id)
+    return row.player_id if row else None
+
+
+def status() -> Dict[str, Any]:
+    """Index sizes in this process, for /ready."""
+    with _lock:
+        return {shot: entry.index.stats() for (shot, _), entry in _indexes.items()}
+
+
+def backfill(limit: Optional[int] = None) -> Dict[str, int]:
+    """Embed analysed jobs that have no embedding yet (e.g. analysed before embeddings existed)."""
+    with SessionLocal() as session:
+        done = set(session.scalars(select(SwingEmbedding.job_id)))
+        jobs = [j for j in session.scalars(select(Job).where(Job.shot.is_not(None)))
+                if j.id not in done and (j.artifacts or {}).get("analysis")]
+    counts = {"jobs": 0, "embedded": 0, "skipped": 0}
+    for job in jobs[:limit]:
+        counts["jobs"] += 1
+        try:
+            result = json.loads(Path(job.artifacts["analysis"]).read_text())
+            if not result.get("error") and record(job.id, job.player_id, job.shot, result):
+                counts["embedded"] += 1
+            else:
+                counts["skipped"] += 1
+        except (OSError, ValueError) as e:
+            counts["skipped"] += 1
+            log("embedding_backfill_skipped", job_id=job.id, error=str(e))
+    log("embedding_backfill", **counts)
+    return counts
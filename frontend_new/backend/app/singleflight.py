@@ -0,0 +1,78 @@
+# backend/app/singleflight.py
+"""
+Single-flight execution of expensive, idempotent work keyed by what it computes
+(e.g. "analyze:<job>:<shot>"). Concurrent callers with the same key in this
+process wait for the first caller's computation and get its result (or its
+exception). Across API processes an flock on a per-key file serialises the
+leaders; a leader that had to wait asks `reuse` whether the process that held
+the lock already produced a result it can return instead of recomputing.
+"""
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing stays per-process
+    fcntl = None
+
+from app.storage import LOCK_DIR
+from app.telemetry import COALESCED, log
+
+_lock = threading.Lock()
+_inflight: Dict[str, Future] = {}
+
+
+@contextmanager
+def _process_lock(key: str):
+    if fcntl is None:
+        yield
+        return
+    name = hashlib.sha1(key.encode()).hexdigest()
+    with open(LOCK_DIR / f"{name}.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def run(key: str, fn: Callable[[], Any],
+        reuse: Optional[Callable[[float], Optional[Any]]] = None) -> Any:
+    """
+    fn() once per key at a time. reuse(started) is called with the lock held and the
+    wall-clock time this call started; returning non-None skips fn (the result was
+    produced by another process while this one waited). Blocks, so call it from a
+    worker thread rather than the event loop.
+    """
+    kind = key.split(":", 1)[0]
+    with _lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        COALESCED.labels(kind, "joined").inc()
+        log("singleflight_joined", key=key)
+        return future.result()
+
+    started = time.time()
+    try:
+        with _process_lock(key):
+            result = reuse(started) if reuse else None
+            if result is None:
+                result = fn()
+            else:
+                COALESCED.labels(kind, "reused").inc()
+                log("singleflight_reused", key=key)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
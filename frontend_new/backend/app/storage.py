@@ -1,27 +1,65 @@
 # backend/app/storage.py
 from pathlib import Path
 from fastapi import UploadFile
-import shutil
+from typing import BinaryIO, Tuple
+import hashlib
+import os
 import uuid
 
-BASE = Path(__file__).resolve().parents[1].parent / "storage"  # backend/storage
+# backend/storage unless STORAGE_DIR points elsewhere (e.g. a scratch dir for benchmarks)
+BASE = Path(os.getenv("STORAGE_DIR", Path(__file__).resolve().parents[1].parent / "storage"))
 UPLOAD_DIR = BASE / "uploads"
 RESULT_DIR = BASE / "results"
+# Lock files shared by API processes (app.singleflight)
+LOCK_DIR = BASE / "locks"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 RESULT_DIR.mkdir(parents=True, exist_ok=True)
+LOCK_DIR.mkdir(parents=True, exist_ok=True)
+
+CHUNK_SIZE = 1024 * 1024
 
 def gen_job_id() -> str:
     return uuid.uuid4().hex
 
-async def save_upload(job_id: str, upload_file: UploadFile) -> str:
-    """Save uploaded file to disk, return saved path (str)."""
-    dest = UPLOAD_DIR / f"{job_id}_{upload_file.filename}"
-    # stream write to file
+def shard_dir(root: Path, job_id: str) -> Path:
+    """Two-level fan-out (ab/cd/) so no single directory grows with the job count."""
+    d = root / job_id[:2] / job_id[2:4]
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+def upload_dir(job_id: str) -> Path:
+    return shard_dir(UPLOAD_DIR, job_id)
+
+def result_dir(job_id: str) -> Path:
+    return shard_dir(RESULT_DIR, job_id)
+
+def save_stream(job_id: str, filename: str, source: BinaryIO) -> Tuple[str, str, int]:
+    """Copy a file object into the job's upload directory, return (path, sha256 hex digest, size)."""
+    dest = upload_dir(job_id) / f"{job_id}_{Path(filename).name}"
+    digest = hashlib.sha256()
+    size = 0
+    # stream write to file, hashing as we go
     with dest.open("wb") as buffer:
-        shutil.copyfileobj(upload_file.file, buffer)
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            buffer.write(chunk)
+            size += len(chunk)
+    return str(dest), digest.hexdigest(), size
+
+async def save_upload(job_id: str, upload_file: UploadFile) -> Tuple[str, str, int]:
+    """Save uploaded file to disk, return (saved path, sha256 hex digest, size in bytes)."""
+    saved = save_stream(job_id, upload_file.filename, upload_file.file)
     # ensure file closed
     await upload_file.close()
-    return str(dest)
+    return saved
 
 def result_path(job_id: str) -> str:
-    return str(RESULT_DIR / f"{job_id}_landmarks.json")
+    """Landmarks as JSON Lines (app.processing.landmark_stream); older jobs have a _landmarks.json."""
+    return str(result_dir(job_id) / f"{job_id}_landmarks.jsonl")
+
+def static_url(path: str) -> str:
+    """Path relative to the /static mount, as the frontend expects (e.g. results/ab/cd/x.avi)."""
+    return Path(path).relative_to(BASE).as_posix()
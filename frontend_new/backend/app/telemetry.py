@@ -0,0 +1,179 @@
+# backend/app/telemetry.py
+"""
+Prometheus metrics and structured logs for the video pipeline.
+
+Frame loops time their steps with a StageClock: lap() after each step (decode,
+convert, inference, metrics, draw, encode, ...) and frame_done() at the end of a
+frame. finish() feeds the per-job histograms and logs one JSON line carrying the
+current job id. Pool workers share the metrics when PROMETHEUS_MULTIPROC_DIR is
+set (prometheus_client multiprocess mode); otherwise each process keeps its own.
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge,
+                               Histogram, generate_latest, multiprocess, REGISTRY)
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+FRAME_BUCKETS = (.001, .0025, .005, .01, .02, .04, .08, .16, .32, .64, 1.28)
+JOB_BUCKETS = (.05, .1, .25, .5, 1, 2.5, 5, 10, 20, 40, 80, 160, 320, 640)
+
+STAGE_SECONDS = Histogram(
+    "athleterise_stage_seconds", "Time per job spent in each step of a pipeline stage",
+    ["stage", "step"], buckets=JOB_BUCKETS)
+FRAME_SECONDS = Histogram(
+    "athleterise_frame_seconds", "Wall time to process one frame", ["stage"], buckets=FRAME_BUCKETS)
+JOB_SECONDS = Histogram(
+    "athleterise_job_seconds", "End-to-end job latency", ["kind"], buckets=JOB_BUCKETS)
+FRAMES = Counter("athleterise_frames_total", "Frames processed", ["stage"])
+MISSED_DETECTIONS = Counter(
+    "athleterise_missed_detections_total", "Frames where no pose was detected", ["stage"])
+JOBS = Counter("athleterise_jobs_total", "Jobs finished", ["kind", "status"])
+COALESCED = Counter("athleterise_coalesced_requests_total",
+                    "Duplicate requests served by another request's computation", ["kind", "how"])
+QUEUE_DEPTH = Gauge("athleterise_queue_depth", "CPU-heavy tasks submitted and not finished",
+                    multiprocess_mode="livemax")
+BATCHES_RUNNING = Gauge("athleterise_batches_running", "Batches not yet finalized",
+                        multiprocess_mode="livemax")
+QUEUE_WAIT = Histogram(
+    "athleterise_queue_wait_seconds", "Time a pool task waited for a worker", ["request_class"],
+    buckets=JOB_BUCKETS)
+QUEUED = Gauge("athleterise_queued_tasks", "Pool tasks waiting for a worker", ["request_class"],
+               multiprocess_mode="livemax")
+OLDEST_WAIT = Gauge("athleterise_queue_oldest_wait_seconds", "Longest wait among queued pool tasks",
+                    ["request_class"], multiprocess_mode="livemax")
+ANALYSIS_FAILURES = Counter("athleterise_analysis_failures_total",
+                            "Analysis steps that failed and fell back to a default", ["step"])
+ADMISSION_REJECTED = Counter("athleterise_admission_rejected_total",
+                             "Requests turned away by admission control", ["endpoint", "reason"])
+ADMISSION_BACKLOG = Gauge("athleterise_admission_backlog_seconds",
+                          "Estimated wall seconds of admitted work not yet done", multiprocess_mode="livemax")
+
+# ---------------------------------------------------------------------------
+# Structured logs
+# ---------------------------------------------------------------------------
+
+current_job: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_job", default=None)
+
+logger = logging.getLogger("athleterise")
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+            "job_id": getattr(record, "job_id", None),
+            "pid": record.process,
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(JsonFormatter())
+    logger.addHandler(_handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+
+def log(event: str, level: int = logging.INFO, job_id: Optional[str] = None, **fields: Any) -> None:
+    """One JSON line: event name, job id (explicit or from the current job context) and fields."""
+    logger.log(level, event, extra={"job_id": job_id or current_job.get(), "fields": fields})
+
+
+@contextmanager
+def job_context(job_id: Optional[str]):
+    """Tag logs emitted inside the block (same thread or task) with job_id."""
+    token = current_job.set(job_id)
+    try:
+        yield
+    finally:
+        current_job.reset(token)
+
+
+# ---------------------------------------------------------------------------
+# Per-stage timing
+# ---------------------------------------------------------------------------
+
+class StageClock:
+    """Lap timer for one pass of a frame loop."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.steps: Dict[str, float] = {}
+        self.frames = 0
+        self.missed = 0
+        self._start = self._last = self._frame_start = time.perf_counter()
+
+    def lap(self, step: str) -> float:
+        """Charge the time since the previous lap to step."""
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self.steps[step] = self.steps.get(step, 0.0) + elapsed
+        self._last = now
+        return elapsed
+
+    def frame_done(self, detected: Optional[bool] = None) -> None:
+        now = time.perf_counter()
+        FRAME_SECONDS.labels(self.stage).observe(now - self._frame_start)
+        self._frame_start = now
+        self.frames += 1
+        if detected is False:
+            self.missed += 1
+
+    def finish(self, **fields: Any) -> Dict[str, Any]:
+        total = time.perf_counter() - self._start
+        for step, seconds in self.steps.items():
+            STAGE_SECONDS.labels(self.stage, step).observe(seconds)
+        STAGE_SECONDS.labels(self.stage, "total").observe(total)
+        if self.frames:
+            FRAMES.labels(self.stage).inc(self.frames)
+        if self.missed:
+            MISSED_DETECTIONS.labels(self.stage).inc(self.missed)
+        summary = {
+            "stage": self.stage,
+            "seconds": round(total, 4),
+            "frames": self.frames,
+            "missed_detections": self.missed,
+            "steps": {k: round(v, 4) for k, v in self.steps.items()},
+            **fields,
+        }
+        log("stage_finished", **summary)
+        return summary
+
+
+@contextmanager
+def timed_step(stage: str, step: str):
+    """Time a single non-looping step (a JSON write, one metric computation, ...)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage, step).observe(time.perf_counter() - t0)
+
+
+def job_finished(kind: str, seconds: float, error: Optional[str] = None, **fields: Any) -> None:
+    status = "failed" if error else "completed"
+    JOB_SECONDS.labels(kind).observe(seconds)
+    JOBS.labels(kind, status).inc()
+    log("job_finished", level=logging.WARNING if error else logging.INFO,
+        kind=kind, status=status, seconds=round(seconds, 3), error=error, **fields)
+
+
+def render_metrics() -> bytes:
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
@@ -0,0 +1,76 @@
+# backend/app/threads.py
+"""
+Per-host CPU thread budget. Left alone, every worker process sizes OpenCV's
+thread pool, the BLAS library behind NumPy and MediaPipe's inference threads to
+the whole machine, so N workers run N x cores threads and spend their time
+contending. Here the host's CPU_BUDGET cores are split evenly over the worker
+processes (WORKER_THREADS each) and every library is held to that share:
+
+- BLAS/OpenMP: thread-count environment variables, exported before the pool
+  spawns its workers (they are only read when NumPy loads in the child)
+- OpenCV: cv2.setNumThreads in each worker's initializer
+- MediaPipe/TFLite: its Python API has no thread setting, so with
+  CPU_AFFINITY=1 each worker is pinned to its own WORKER_THREADS cores, which
+  also bounds the inference threads
+
+benchmarks/threads.py measures throughput over the possible splits.
+"""
+import os
+from typing import Any, Dict, List, Optional
+
+BLAS_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+            "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def available_cores() -> List[int]:
+    """CPUs this process may run on (the container's cpuset, not the host's count)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+CPU_BUDGET = int(os.getenv("CPU_BUDGET", str(len(available_cores()))))
+PIN_CPUS = os.getenv("CPU_AFFINITY", "0") == "1"
+
+
+def threads_per_worker(workers: int, budget: int = CPU_BUDGET) -> int:
+    """WORKER_THREADS, else an even share of the budget (at least one)."""
+    override = os.getenv("WORKER_THREADS")
+    if override:
+        return max(int(override), 1)
+    return max(budget // max(workers, 1), 1)
+
+
+def child_env(threads: int) -> Dict[str, str]:
+    """Environment that caps BLAS/OpenMP threads in processes started from now on."""
+    return {name: str(threads) for name in BLAS_ENV}
+
+
+def worker_cpus(slot: int, threads: int, cores: Optional[List[int]] = None) -> List[int]:
+    """The cores worker `slot` is pinned to: its own consecutive block, wrapping round."""
+    cores = cores or available_cores()
+    start = (slot * threads) % len(cores)
+    return [cores[(start + i) % len(cores)] for i in range(min(threads, len(cores)))]
+
+
+def apply(threads: int, slot: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Hold this process to `threads` threads: OpenCV's pool, and with CPU_AFFINITY and a
+    slot, the cores it may run on. Returns what was applied.
+    """
+    import cv2
+    cv2.setNumThreads(threads)
+    applied: Dict[str, Any] = {"threads": threads, "opencv_threads": cv2.getNumThreads()}
+    if PIN_CPUS and slot is not None and hasattr(os, "sched_setaffinity"):
+        cpus = worker_cpus(slot, threads)
+        os.sched_setaffinity(0, cpus)
+        applied["cpus"] = cpus
+    applied["blas_threads"] = os.getenv("OPENBLAS_NUM_THREADS") or os.getenv("OMP_NUM_THREADS")
+    return applied
+
+
+def plan(workers: int, budget: int = CPU_BUDGET) -> Dict[str, Any]:
+    """The split for /ready and the logs."""
+    threads = threads_per_worker(workers, budget)
+    return {"cpu_budget": budget, "workers": workers, "threads_per_worker": threads,
+            "pinned": PIN_CPUS, "oversubscribed": workers * threads > budget}
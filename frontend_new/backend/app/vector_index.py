@@ -0,0 +1,181 @@
+# backend/app/vector_index.py
+"""
+In-process approximate nearest-neighbour index over unit vectors (inner
+product = cosine similarity), as an inverted file (IVF):
+
+- Vectors live in one growing float32 array; ids map to rows, and replacing or
+  removing an id only marks its old row dead.
+- Once there are more than FLAT_MAX live vectors, spherical k-means over a
+  sample trains ~sqrt(n) centroids and every row is filed under its nearest.
+  A query scores the centroids, then only the rows in the NPROBE best lists,
+  so it reads about NPROBE / sqrt(n) of the data.
+- New vectors are filed under their nearest centroid as they are added; the
+  centroids are retrained when the index has grown RETRAIN_GROWTH-fold since,
+  so the lists stay balanced as the data drifts.
+
+Below FLAT_MAX the index is searched exhaustively, which is exact and, at that
+size, as fast. Not thread-safe; the caller (app.similarity) serialises access.
+"""
+import os
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+FLAT_MAX = int(os.getenv("SIMILARITY_FLAT_MAX", "5000"))
+NPROBE = int(os.getenv("SIMILARITY_NPROBE", "8"))
+RETRAIN_GROWTH = 4.0
+# k-means sample per centroid and iterations
+TRAIN_PER_LIST = 40
+TRAIN_ITERATIONS = 8
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+class _List:
+    """Row numbers filed under one centroid, in a doubling buffer."""
+
+    __slots__ = ("rows", "size")
+
+    def __init__(self, rows: Optional[np.ndarray] = None):
+        self.rows = rows if rows is not None else np.zeros(16, dtype=np.int64)
+        self.size = len(rows) if rows is not None else 0
+
+    def append(self, row: int) -> None:
+        if self.size == len(self.rows):
+            self.rows = np.concatenate([self.rows, np.zeros(max(len(self.rows), 16), dtype=np.int64)])
+        self.rows[self.size] = row
+        self.size += 1
+
+    def view(self) -> np.ndarray:
+        return self.rows[:self.size]
+
+
+class IVFIndex:
+    def __init__(self, dim: int, seed: int = 0):
+        self.dim = dim
+        self._data = np.zeros((1024, dim), dtype=np.float32)
+        self._alive = np.zeros(1024, dtype=bool)
+        self._ids: List[Hashable] = []
+        self._rows: Dict[Hashable, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[_List] = []
+        self._trained_at = 0
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._rows
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    # -- updates -----------------------------------------------------------
+
+    def add(self, key: Hashable, vector: np.ndarray) -> None:
+        """Insert or replace one vector."""
+        self.add_many([key], np.asarray(vector)[None])
+
+    def add_many(self, keys: List[Hashable], vectors: np.ndarray) -> None:
+        """Insert or replace vectors; trains or retrains at most once, after all are in."""
+        first = len(self._ids)
+        needed = first + len(keys)
+        if needed > len(self._data):
+            size = max(needed, 2 * len(self._data))
+            self._data = np.concatenate([self._data, np.zeros((size - len(self._data), self.dim), dtype=np.float32)])
+            self._alive = np.concatenate([self._alive, np.zeros(size - len(self._alive), dtype=bool)])
+        self._data[first:needed] = vectors
+        self._alive[first:needed] = True
+        for row, key in enumerate(keys, first):
+            self.remove(key)
+            self._ids.append(key)
+            self._rows[key] = row
+
+        if len(self) > FLAT_MAX and len(self) >= RETRAIN_GROWTH * max(self._trained_at, FLAT_MAX / RETRAIN_GROWTH):
+            self.train()
+        elif self.trained:
+            assign = np.argmax(self._data[first:needed] @ self._centroids.T, axis=1)
+            for row, c in enumerate(assign.tolist(), first):
+                self._lists[c].append(row)
+
+    def remove(self, key: Hashable) -> bool:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        self._alive[row] = False
+        return True
+
+    def vector(self, key: Hashable) -> Optional[np.ndarray]:
+        row = self._rows.get(key)
+        return None if row is None else self._data[row]
+
+    # -- training ----------------------------------------------------------
+
+    def _compact(self) -> None:
+        """Drop dead rows (done on retraining, when every row is refiled anyway)."""
+        live = np.flatnonzero(self._alive[:len(self._ids)])
+        self._data = np.concatenate([self._data[live], np.zeros((max(len(live), 1024), self.dim), dtype=np.float32)])
+        self._alive = np.zeros(len(self._data), dtype=bool)
+        self._alive[:len(live)] = True
+        self._ids = [self._ids[r] for r in live]
+        self._rows = {key: i for i, key in enumerate(self._ids)}
+
+    def train(self, nlist: Optional[int] = None) -> None:
+        """(Re)build the centroids by spherical k-means and refile every vector."""
+        self._compact()
+        n = len(self._ids)
+        nlist = nlist or int(np.clip(np.sqrt(n), 16, 4096))
+        data = self._data[:n]
+        sample = data[self._rng.choice(n, size=min(n, nlist * TRAIN_PER_LIST), replace=False)]
+        centroids = sample[self._rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(TRAIN_ITERATIONS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # An empty cluster keeps its old centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+
+        assign = np.empty(n, dtype=np.int64)
+        for lo in range(0, n, 65536):
+            assign[lo:lo + 65536] = np.argmax(data[lo:lo + 65536] @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        starts = np.searchsorted(assign[order], np.arange(nlist + 1))
+        self._lists = [_List(order[starts[c]:starts[c + 1]].copy()) for c in range(nlist)]
+        self._centroids = centroids.astype(np.float32)
+        self._trained_at = n
+
+    # -- search ------------------------------------------------------------
+
+    def candidates(self, query: np.ndarray, nprobe: int = NPROBE) -> np.ndarray:
+        """Rows to score for a query: all of them when untrained, else the nprobe closest lists."""
+        if not self.trained:
+            return np.flatnonzero(self._alive[:len(self._ids)])
+        probes = _top(self._centroids @ query, min(nprobe, len(self._lists)))
+        rows = np.concatenate([self._lists[c].view() for c in probes])
+        return rows[self._alive[rows]]
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: int = NPROBE,
+               rows: Optional[np.ndarray] = None) -> List[Tuple[Hashable, float]]:
+        """The k most similar (id, cosine similarity), best first; `rows` restricts the candidates."""
+        query = np.asarray(query, dtype=np.float32)
+        rows = self.candidates(query, nprobe) if rows is None else rows
+        if not len(rows):
+            return []
+        scores = self._data[rows] @ query
+        best = _top(scores, k)
+        return [(self._ids[rows[i]], float(scores[i])) for i in best]
+
+    def rows_for(self, keys) -> np.ndarray:
+        return np.array([self._rows[k] for k in keys if k in self._rows], dtype=np.int64)
+
+    def stats(self) -> Dict[str, int]:
+        return {"vectors": len(self), "lists": len(self._lists), "trained_at": self._trained_at}
@@ -0,0 +1,283 @@
+# backend/app/workers.py
+"""
+Shared process pool for CPU-heavy video work. Each worker process builds its
+pose estimator when it starts and reuses it for every clip it is handed.
+
+Tasks are not handed to the executor as they are submitted: they wait in a
+fair queue (app.scheduler) and are dispatched one per free worker, so the order
+is decided by priority class and tenant share at the moment a worker frees up.
+While interactive work is running outside the pool (an upload or /analyze in
+an API thread), up to INTERACTIVE_RESERVE workers are kept from batch and
+backfill tasks so the interactive job has the cores.
+
+Workers are sized from the host's CPU budget (app.threads): each is held to
+its share of threads for OpenCV, BLAS and, when pinned, MediaPipe.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app import threads
+from app.scheduler import FairQueue
+
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", str(max(1, threads.CPU_BUDGET - 1))))
+WORKER_THREADS = threads.threads_per_worker(WORKER_PROCESSES)
+# Spawn and warm the pool at API startup; /ready waits for it
+WARM_ON_START = os.getenv("WARM_WORKERS_ON_START", "1") == "1"
+INTERACTIVE_RESERVE = int(os.getenv("SCHEDULER_INTERACTIVE_RESERVE", str(max(1, WORKER_PROCESSES // 2))))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_lock = threading.RLock()
+_pending = 0
+_running = 0
+_interactive_outside = 0
+_queue = FairQueue()
+_warm_futures: List[Future] = []
+# Whether this (API) process's OpenCV pool has been held to a worker's share
+_api_threads_applied = False
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            # Read by BLAS when NumPy loads in each spawned worker; the API process's
+            # own NumPy is already loaded and keeps its settings
+            os.environ.update(threads.child_env(WORKER_THREADS))
+            # spawn, not fork: MediaPipe graphs and their threads do not survive a fork
+            context = multiprocessing.get_context("spawn")
+            _executor = ProcessPoolExecutor(
+                max_workers=WORKER_PROCESSES,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(context.Value("i", 0), WORKER_THREADS),
+            )
+        return _executor
+
+
+def _task_done(_: Future) -> None:
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+def submit(fn: Callable, *args: Any, request_class: str = "interactive", tenant: Optional[str] = None,
+           cost: float = 1.0, **kwargs: Any) -> Future:
+    """
+    Queue fn(*args) for the pool. fn must be a picklable module-level function.
+    request_class is an app.scheduler class, tenant the academy it is fair-shared
+    within, cost the estimated seconds of work.
+    """
+    global _pending
+    future: Future = Future()
+    future.add_done_callback(_task_done)
+    with _lock:
+        _pending += 1
+        _queue.push((future, fn, args, kwargs), request_class, tenant, cost)
+        _dispatch()
+    return future
+
+
+def _dispatch() -> None:
+    """Hand queued tasks to free workers. Called with _lock held."""
+    from app.telemetry import QUEUE_WAIT
+    global _running
+    while _running < WORKER_PROCESSES:
+        # Lower classes only get the workers not held back for interactive work outside the pool
+        reserved = min(_interactive_outside, INTERACTIVE_RESERVE)
+        task = _queue.pop(max_class=0) if _running + reserved >= WORKER_PROCESSES else _queue.pop()
+        if task is None:
+            return
+        future, fn, args, kwargs = task.payload
+        if not future.set_running_or_notify_cancel():
+            continue
+        QUEUE_WAIT.labels(task.request_class).observe(time.time() - task.enqueued_at)
+        _running += 1
+        try:
+            inner = _submit_to_pool(fn, args, kwargs)
+        except Exception as e:
+            _running -= 1
+            future.set_exception(e)
+            continue
+        inner.add_done_callback(lambda f, outer=future: _finished(f, outer))
+
+
+def _submit_to_pool(fn: Callable, args: Tuple, kwargs: Dict[str, Any]) -> Future:
+    global _executor
+    try:
+        return get_executor().submit(fn, *args, **kwargs)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); replace the pool rather than failing forever
+        _executor = None
+        return get_executor().submit(fn, *args, **kwargs)
+
+
+def _finished(inner: Future, outer: Future) -> None:
+    global _running
+    with _lock:
+        _running -= 1
+        _dispatch()
+    if inner.cancelled():
+        # outer is already running as far as its waiters know; fail it instead
+        outer.set_exception(CancelledError())
+    elif inner.exception() is not None:
+        outer.set_exception(inner.exception())
+    else:
+        outer.set_result(inner.result())
+
+
+@contextmanager
+def inflight(request_class: str = "interactive"):
+    """Count CPU-heavy work running outside the pool (e.g. in a request's background task)."""
+    global _pending, _interactive_outside, _api_threads_applied
+    interactive = request_class == "interactive"
+    with _lock:
+        # Uploads and /analyze decode on API threads alongside the workers: same share per
+        # process. Applied on first use, not at startup, so the API does not load cv2 until then
+        if not _api_threads_applied:
+            threads.apply(WORKER_THREADS)
+            _api_threads_applied = True
+        _pending += 1
+        _interactive_outside += interactive
+    try:
+        yield
+    finally:
+        with _lock:
+            _pending -= 1
+            _interactive_outside -= interactive
+            _dispatch()
+
+
+def queue_depth() -> int:
+    """Tasks submitted and not yet finished (running + waiting), in or out of the pool."""
+    return _pending
+
+
+def queued_by_class() -> Dict[str, Dict[str, float]]:
+    """Per scheduler class: tasks waiting for a worker and how long the oldest has waited."""
+    with _lock:
+        depth, oldest = _queue.depth(), _queue.oldest_wait()
+    return {c: {"queued": depth[c], "oldest_wait_s": round(oldest[c], 1)} for c in depth}
+
+
+def warm_up() -> None:
+    """
+    Start the pool now instead of on the first clip. Each worker builds and warms its
+    estimators in the initializer, which runs before any task, so once these no-op
+    tasks have completed the pool is ready.
+    """
+    executor = get_executor()
+    _warm_futures[:] = [executor.submit(os.getpid) for _ in range(WORKER_PROCESSES)]
+
+
+def warm_status() -> str:
+    """cold (never started), warming, ready or failed (a worker could not start)."""
+    if not _warm_futures:
+        return "cold"
+    if not all(f.done() for f in _warm_futures):
+        return "warming"
+    if any(f.exception() for f in _warm_futures):
+        return "failed"
+    return "ready"
+
+
+def shutdown() -> None:
+    global _executor
+    with _lock:
+        for task in _queue.drain():
+            task.payload[0].cancel()
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+# ---------------------------------------------------------------------------
+# Worker-process side
+# ---------------------------------------------------------------------------
+
+_estimators: Dict[str, Any] = {}
+
+
+def _init_worker(slots, worker_threads: int) -> None:
+    from app.processing.policy import default_config
+    from app.telemetry import log
+    # Each worker takes the next slot, so pinned workers get disjoint cores
+    with slots.get_lock():
+        slot = slots.value
+        slots.value += 1
+    applied = threads.apply(worker_threads, slot % WORKER_PROCESSES)
+    log("worker_started", pid=os.getpid(), slot=slot, **applied)
+    config = default_config("batch")
+    for c in (config, config.scan_config()):
+        worker_estimator(c).warm_up()
+
+
+def worker_estimator(config):
+    """This process's pose estimator for the config's tier and thresholds, built on first use."""
+    key = config.estimator_key()
+    if key not in _estimators:
+        _estimators[key] = config.create_estimator()
+    return _estimators[key]
+
+
+def analyze_clip(video_path: str, output_dir: str, shot: str,
+                 job_id: Optional[str] = None, config=None,
+                 frame_range: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+    """Run the shot analyzer for one clip (or one delivery's frame range) on this worker's warm pose estimator."""
+    from app.analysis.registry import get_analyzer_class
+    from app.processing.policy import default_config
+    from app.telemetry import job_context
+    # A session's deliveries share one job, whose status the caller tracks
+    if job_id and frame_range is None:
+        from app.jobs import mark_started
+        mark_started(job_id)
+    config = config or default_config("batch")
+    analyzer = get_analyzer_class(shot)(estimator=worker_estimator(config), config=config,
+                                        scan_estimator=worker_estimator(config.scan_config()))
+    with job_context(job_id):
+        return analyzer.analyze(video_path, output_dir, frame_range)
+
+
+def landmark_chunk(video_path: str, job_id: str, config, start: int, end: int,
+                   warmup_from: int, output_path: str, previews: bool = False) -> Dict[str, Any]:
+    """Landmarks for one chunk of a long clip (app.processing.chunked) on this worker's estimator."""
+    from app.processing.mediapipe_utils import analyze_chunk
+    from app.telemetry import job_context
+    with job_context(job_id):
+        return analyze_chunk(video_path, job_id, config, start, end, warmup_from, output_path,
+                             pose=worker_estimator(config), previews=previews)
+
+
+def segment_clip(video_path: str, landmarks_path: Optional[str] = None,
+                 job_id: Optional[str] = None):
+    """Split a session recording into deliveries (app.processing.segmentation)."""
+    from app.processing.segmentation import segment_session
+    from app.telemetry import job_context
+    with job_context(job_id):
+        return segment_session(video_path, landmarks_path)
+
+
+def regenerate_artifact(video_path: str, job_id: str, artifact: str, landmarks_path: str,
+                        rerun_landmarks: bool) -> Dict[str, Any]:
+    """Rebuild an evicted artifact (app.routes.storage), re-running the landmark pass first when asked."""
+    from app.pipeline import publish_track, regenerate_previews, render_overlay
+    from app.processing.mediapipe_utils import analyze_shot
+    from app.processing.policy import default_config
+    from app.telemetry import job_context
+    with job_context(job_id):
+        if rerun_landmarks:
+            analyze_shot(video_path, job_id, output_path=landmarks_path)
+        out = {"job_id": job_id, "landmarks": landmarks_path}
+        if artifact in ("landmarks", "track"):
+            out["track"] = publish_track(job_id, video_path, landmarks_path)["track"]
+        if artifact == "preview":
+            out["preview"] = regenerate_previews(job_id, video_path, landmarks_path)
+        if artifact in ("overlay", "issues", "evaluation"):
+            paths = render_overlay(job_id, video_path, landmarks_path, default_config("overlay"))
+            out.update({"issues": paths["issues"], "evaluation": paths["evaluation"]})
+        return out
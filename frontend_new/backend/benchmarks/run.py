@@ -0,0 +1,174 @@
+# backend/benchmarks/run.py
+"""
+Backend performance benchmarks.
+
+    cd backend
+    python -m benchmarks.run                               # quick profile, all stages
+    python -m benchmarks.run --profile full --output out.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json   # exit 1 on regression
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+
+Every (clip, stage) pair runs in its own spawned process with storage and the
+database redirected to a scratch directory, so timings do not share warm caches
+and peak RSS is that stage's alone. Clips are the deterministic synthetic set of
+the chosen profile plus any videos found in the samples directory.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.synthetic import PROFILES, make_clip
+
+SAMPLES_DIR = Path(__file__).resolve().parent / "samples"
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi", ".webm")
+
+# Metric -> which direction is better; a change past the threshold the other way fails
+REGRESSION_METRICS = {"wall_s": "lower", "fps": "higher", "peak_rss_mb": "lower"}
+DEFAULT_THRESHOLD = 0.2
+
+
+def _run_stage(stage: str, clip: str, workdir: str) -> Dict[str, Any]:
+    # Child process: isolate storage and DB before any app module is imported
+    os.environ["STORAGE_DIR"] = str(Path(workdir) / "storage")
+    os.environ.pop("DATABASE_URL", None)
+    os.environ["RETENTION_SWEEP_INTERVAL_S"] = "0"
+    from benchmarks.stages import CLIP_INDEPENDENT, STAGES
+    # The app's progress prints would otherwise interleave with the JSON report on stdout
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = STAGES[stage](clip, Path(workdir))
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["peak_rss_mb"] = round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return result
+
+
+def run_isolated(stage: str, clip: str) -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            return pool.submit(_run_stage, stage, clip, workdir).result()
+
+
+def collect_clips(profile: str, samples: Optional[Path]) -> List[Dict[str, Any]]:
+    clips = [{"name": spec.name, "path": str(make_clip(spec)), "source": "synthetic",
+              "width": spec.width, "height": spec.height, "fps": spec.fps, "seconds": spec.seconds}
+             for spec in PROFILES[profile]]
+    if samples and samples.is_dir():
+        for path in sorted(samples.iterdir()):
+            if path.suffix.lower() in VIDEO_EXTENSIONS:
+                clips.append({"name": f"sample_{path.stem}", "path": str(path), "source": "sample"})
+    return clips
+
+
+def environment() -> Dict[str, Any]:
+    import cv2
+    import mediapipe
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "mediapipe": mediapipe.__version__,
+        "commit": commit,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any],
+            threshold: float) -> List[Dict[str, Any]]:
+    """Rows whose metrics moved past the threshold in the wrong direction."""
+    base = {(r["clip"], r["stage"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for row in results:
+        ref = base.get((row["clip"], row["stage"]))
+        if ref is None:
+            continue
+        for metric, better in REGRESSION_METRICS.items():
+            new, old = row.get(metric), ref.get(metric)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            if (better == "lower" and change > threshold) or (better == "higher" and change < -threshold):
+                regressions.append({"clip": row["clip"], "stage": row["stage"], "metric": metric,
+                                    "baseline": old, "current": new, "change": round(change, 3)})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from benchmarks.stages import CLIP_INDEPENDENT, STAGES
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument("--samples", type=Path, default=SAMPLES_DIR,
+                        help="directory of extra (licensed) sample clips")
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", type=Path, help="fail if results regress against this report")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative change before a metric counts as regressed")
+    parser.add_argument("--save-baseline", type=Path, help="also write the report as the new baseline")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {sorted(unknown)}")
+
+    clips = collect_clips(args.profile, args.samples)
+    results = []
+    for stage in [s for s in stages if s in CLIP_INDEPENDENT]:
+        print(f"[Bench] {stage}", file=sys.stderr)
+        try:
+            row = run_isolated(stage, "")
+        except Exception as e:
+            row = {"error": str(e)}
+        results.append({"clip": None, "stage": stage, **row})
+    for clip in clips:
+        for stage in [s for s in stages if s not in CLIP_INDEPENDENT]:
+            print(f"[Bench] {clip['name']} / {stage}", file=sys.stderr)
+            try:
+                row = run_isolated(stage, clip["path"])
+            except Exception as e:
+                row = {"error": str(e)}
+            results.append({"clip": clip["name"], "stage": stage, **row})
+
+    report = {"environment": environment(), "profile": args.profile, "clips": clips, "results": results}
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        report["regressions"] = compare(results, baseline, args.threshold)
+        report["threshold"] = args.threshold
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+    if args.save_baseline:
+        args.save_baseline.write_text(text)
+
+    failed = [r for r in results if "error" in r]
+    for row in failed:
+        print(f"[Bench] {row['clip']} / {row['stage']} failed: {row['error']}", file=sys.stderr)
+    for reg in report.get("regressions", []):
+        print(f"[Bench] Regression {reg['clip']} / {reg['stage']} {reg['metric']}: "
+              f"{reg['baseline']} -> {reg['current']} ({reg['change']:+.0%})", file=sys.stderr)
+    return 1 if failed or report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
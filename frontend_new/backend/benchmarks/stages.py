@@ -0,0 +1,207 @@
+# backend/benchmarks/stages.py
+"""
+One function per benchmarked stage. Each takes a clip and a scratch directory and
+returns a flat dict of measurements; run.py calls them in a fresh process so the
+peak RSS belongs to that stage alone. App modules are imported inside the
+functions, after run.py has pointed STORAGE_DIR at the scratch directory.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+# Shape of an issues log as written by generate_overlay_video
+SAMPLE_ISSUES = {
+    "Elbow angle needs improvement": [0.4, 0.8, 1.2],
+    "Posture is inconsistent": [1.6],
+    "Front foot alignment off": [0.2, 0.6, 1.0, 1.4, 1.8, 2.2],
+}
+
+
+def _timed(fn: Callable, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+
+def _fps(frames: int, seconds: float) -> float:
+    return round(frames / seconds, 2) if seconds else None
+
+
+def bench_landmarks(clip: str, workdir: Path) -> Dict[str, Any]:
+    from app.processing.landmark_stream import iter_frames
+    from app.processing.mediapipe_utils import analyze_shot
+    out = workdir / "landmarks.jsonl"
+    result, wall = _timed(analyze_shot, clip, "bench", output_path=str(out))
+    frames = result["frames_written"]
+    inference = result["pose_model"]["seconds"]
+    return {
+        "wall_s": round(wall, 4),
+        "frames": frames,
+        "fps": _fps(frames, wall),
+        "detections": sum(1 for f in iter_frames(str(out)) if f["pose"]),
+        "stages": {
+            "inference_s": round(inference, 4),
+            "decode_convert_write_s": round(wall - inference, 4),
+            "output_mb": round(out.stat().st_size / 1e6, 3),
+        },
+    }
+
+
+def bench_overlay(clip: str, workdir: Path) -> Dict[str, Any]:
+    from app.processing.mediapipe_utils import probe_video
+    from app.processing.overlay_utils import generate_overlay_video
+    frames = probe_video(clip)["frame_count"]
+    _, wall = _timed(generate_overlay_video, clip, str(workdir / "landmarks.jsonl"),
+                     str(workdir / "overlay.mp4"))
+    return {"wall_s": round(wall, 4), "frames": frames, "fps": _fps(frames, wall)}
+
+
+def bench_evaluation(clip: str, workdir: Path, repeat: int = 200) -> Dict[str, Any]:
+    from app.processing.overlay_utils import generate_evaluation_json
+    issues = workdir / "sample.issues.json"
+    issues.write_text(json.dumps(SAMPLE_ISSUES))
+    times = []
+    for _ in range(repeat):
+        _, t = _timed(generate_evaluation_json, str(issues), str(workdir / "evaluation.json"))
+        times.append(t)
+    return {"wall_s": round(sum(times), 4), "calls": repeat,
+            "p50_ms": round(statistics.median(times) * 1000, 3)}
+
+
+def _fallback_landmarks():
+    # Upright figure used when the synthetic clip yields no detection at the keyframe
+    from app.processing.pose import NUM_JOINTS, Pose
+    return Pose.from_dicts([{"x": 0.5 + 0.01 * (i % 5), "y": 0.2 + 0.02 * i, "z": 0.0, "visibility": 1.0}
+                            for i in range(NUM_JOINTS)])
+
+
+def bench_analyzers(clip: str, workdir: Path, repeat: int = 200) -> Dict[str, Any]:
+    from app.analysis.registry import SHOTS, get_analyzer_class
+    from app.processing.mediapipe_utils import probe_video
+    frames = probe_video(clip)["frame_count"]
+    out: Dict[str, Any] = {"frames": frames, "stages": {}}
+    total = 0.0
+    for shot in SHOTS:
+        analyzer = get_analyzer_class(shot)()
+        (idx, keyframe), detect_s = _timed(analyzer.detect_keyframe, clip)
+        landmarks = analyzer.keyframe_landmarks(idx, keyframe) or _fallback_landmarks()
+        _, metrics_s = _timed(lambda: [analyzer.calculate_metrics(landmarks, keyframe.shape[:2])
+                                       for _ in range(repeat)])
+        _, phases_s = _timed(lambda: [analyzer.phase_analysis() for _ in range(repeat)])
+        cascade = analyzer.cascade.summary()
+        analyzer.pose.close()
+        analyzer.scan_pose.close()
+        total += detect_s
+        out["stages"][shot] = {
+            "detect_keyframe_s": round(detect_s, 4),
+            "calculate_metrics_us": round(metrics_s / repeat * 1e6, 2),
+            "phase_analysis_ms": round(phases_s / repeat * 1e3, 3),
+            "scan_frames": cascade["scan"]["frames"],
+            "refine_frames": cascade["refine"]["frames"],
+        }
+    out["wall_s"] = round(total, 4)
+    out["fps"] = _fps(frames * len(SHOTS), total)
+    return out
+
+
+def bench_http(clip: str, workdir: Path, health_calls: int = 50) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    stages: Dict[str, Any] = {}
+    with TestClient(app) as client:
+        # Background tasks run before TestClient returns, so this covers the whole pipeline
+        with open(clip, "rb") as f:
+            resp, stages["upload_pipeline_s"] = _timed(
+                client.post, "/upload", files={"file": (Path(clip).name, f, "video/mp4")})
+        resp.raise_for_status()
+        job_id = resp.json()["job_id"]
+
+        job, stages["jobs_s"] = _timed(client.get, f"/jobs/{job_id}")
+        status = job.json()["status"]
+        _, stages["result_s"] = _timed(client.get, f"/result/{job_id}")
+        resp, stages["analyze_s"] = _timed(client.post, "/analyze/",
+                                           json={"job_id": job_id, "shot": "cover_drive"})
+        resp.raise_for_status()
+
+        health = [_timed(client.get, "/health")[1] for _ in range(health_calls)]
+        stages["health_p50_ms"] = statistics.median(health) * 1000
+
+    stages = {k: round(v, 4) for k, v in stages.items()}
+    return {
+        "wall_s": round(stages["upload_pipeline_s"] + stages["analyze_s"], 4),
+        "job_status": status,
+        "stages": stages,
+    }
+
+
+# Runs in a fresh interpreter so nothing is imported yet
+_STARTUP_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+heavy = [m for m in ("cv2", "mediapipe") if m in sys.modules]
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    t2 = time.perf_counter()
+    status = None
+    while time.perf_counter() - t2 < 600:
+        status = client.get("/ready").json()["checks"]["workers"]
+        if status in ("ready", "failed", "cold"):
+            break
+        time.sleep(0.05)
+    t3 = time.perf_counter()
+print(json.dumps({"import_s": t1 - t0, "startup_s": t2 - t1, "ready_s": t3 - t2,
+                  "workers": status, "heavy_modules_at_import": heavy}))
+"""
+
+
+def bench_startup(clip: str, workdir: Path, top: int = 10) -> Dict[str, Any]:
+    """Cold start of the API: import time (with the slowest imports), startup, and time to /ready."""
+    env = {**os.environ, "WORKER_PROCESSES": "1"}
+    backend = Path(__file__).resolve().parents[1]
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT],
+                          cwd=backend, env=env, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - t0
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    # Separate run for the per-module breakdown; -X importtime is inherited by pool workers
+    profile = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                             cwd=backend, env=env, capture_output=True, text=True, check=True)
+    imports = []
+    for line in profile.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"; nested imports are
+        # included in their parent's cumulative time, so the top entries form a chain
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative), name.strip()))
+    imports.sort(reverse=True)
+
+    return {
+        "wall_s": round(wall, 4),
+        "workers": result["workers"],
+        "heavy_modules_at_import": result["heavy_modules_at_import"],
+        "stages": {k: round(result[k], 4) for k in ("import_s", "startup_s", "ready_s")},
+        "slowest_imports_ms": {name: round(us / 1000, 1) for us, name in imports[:top]},
+    }
+
+
+# Stages that do not depend on a clip; run.py runs them once per report
+CLIP_INDEPENDENT = {"startup"}
+
+STAGES: Dict[str, Callable[[str, Path], Dict[str, Any]]] = {
+    "startup": bench_startup,
+    "landmarks": bench_landmarks,
+    "overlay": bench_overlay,
+    "evaluation": bench_evaluation,
+    "analyzers": bench_analyzers,
+    "http": bench_http,
+}
@@ -0,0 +1,108 @@
+# backend/benchmarks/synthetic.py
+"""
+Deterministic synthetic clips. A stick-figure batter swings once per clip over a
+seeded noise background, so every run decodes, infers and encodes exactly the
+same pixels. The figure is not meant to be detected reliably; it keeps the
+decode/inference/encode cost realistic and reproducible.
+"""
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+CACHE_DIR = Path(__file__).resolve().parent / ".cache"
+
+
+@dataclass(frozen=True)
+class ClipSpec:
+    width: int
+    height: int
+    fps: int
+    seconds: float
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        return f"synthetic_{self.height}p{self.fps}_{self.seconds:g}s"
+
+    @property
+    def frame_count(self) -> int:
+        return int(round(self.fps * self.seconds))
+
+
+PROFILES: Dict[str, List[ClipSpec]] = {
+    "quick": [
+        ClipSpec(640, 360, 25, 2),
+        ClipSpec(1280, 720, 30, 3),
+    ],
+    "full": [
+        ClipSpec(640, 360, 25, 2),
+        ClipSpec(854, 480, 25, 8),
+        ClipSpec(1280, 720, 30, 3),
+        ClipSpec(1280, 720, 60, 4),
+        ClipSpec(1920, 1080, 30, 5),
+    ],
+}
+
+
+def _joints(t: float, w: int, h: int) -> Dict[str, Tuple[int, int]]:
+    """Figure joints at swing phase t in [0, 1]: stance, backlift, downswing, follow-through."""
+    s = min(w, h) / 720
+    hip = (w * 0.5, h * 0.55)
+    shoulder = (hip[0] + 20 * s, hip[1] - 170 * s)
+    # Bat arm angle sweeps from behind the head down through impact and up again
+    swing = math.radians(-120 + 300 * (0.5 - 0.5 * math.cos(math.pi * min(max(t, 0), 1))))
+    elbow = (shoulder[0] + 70 * s * math.cos(swing), shoulder[1] + 70 * s * math.sin(swing))
+    wrist = (elbow[0] + 65 * s * math.cos(swing + 0.4), elbow[1] + 65 * s * math.sin(swing + 0.4))
+    stride = 40 * s * min(t * 2, 1)
+    pts = {
+        "head": (shoulder[0] + 5 * s, shoulder[1] - 45 * s),
+        "shoulder": shoulder,
+        "elbow": elbow,
+        "wrist": wrist,
+        "hip": hip,
+        "front_knee": (hip[0] + 45 * s + stride / 2, hip[1] + 95 * s),
+        "front_ankle": (hip[0] + 60 * s + stride, hip[1] + 190 * s),
+        "back_knee": (hip[0] - 35 * s, hip[1] + 95 * s),
+        "back_ankle": (hip[0] - 50 * s, hip[1] + 190 * s),
+        "bat_tip": (wrist[0] + 110 * s * math.cos(swing + 0.9), wrist[1] + 110 * s * math.sin(swing + 0.9)),
+    }
+    return {k: (int(x), int(y)) for k, (x, y) in pts.items()}
+
+
+def render_frame(spec: ClipSpec, idx: int, background: np.ndarray) -> np.ndarray:
+    frame = background.copy()
+    # One swing centred in the clip, with still stance and finish either side
+    t = (idx / max(spec.frame_count - 1, 1) - 0.3) / 0.4
+    j = _joints(t, spec.width, spec.height)
+    s = max(int(min(spec.width, spec.height) / 720 * 14), 2)
+    skin, kit = (150, 180, 220), (240, 240, 240)
+    for a, b in (("shoulder", "hip"), ("hip", "front_knee"), ("front_knee", "front_ankle"),
+                 ("hip", "back_knee"), ("back_knee", "back_ankle")):
+        cv2.line(frame, j[a], j[b], kit, s * 2, cv2.LINE_AA)
+    for a, b in (("shoulder", "elbow"), ("elbow", "wrist")):
+        cv2.line(frame, j[a], j[b], skin, s, cv2.LINE_AA)
+    cv2.line(frame, j["wrist"], j["bat_tip"], (60, 120, 170), s, cv2.LINE_AA)
+    cv2.circle(frame, j["head"], s * 3, skin, -1, cv2.LINE_AA)
+    return frame
+
+
+def make_clip(spec: ClipSpec, directory: Path = CACHE_DIR) -> Path:
+    """Write (or reuse) the clip for spec; identical specs always give identical frames."""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{spec.name}_seed{spec.seed}.mp4"
+    if path.exists():
+        return path
+    rng = np.random.default_rng(spec.seed)
+    background = rng.integers(60, 110, size=(spec.height, spec.width, 3), dtype=np.uint8)
+    background = cv2.GaussianBlur(background, (0, 0), 3)
+    tmp = path.with_suffix(".tmp.mp4")
+    out = cv2.VideoWriter(str(tmp), cv2.VideoWriter_fourcc(*"mp4v"), spec.fps, (spec.width, spec.height))
+    for idx in range(spec.frame_count):
+        out.write(render_frame(spec, idx, background))
+    out.release()
+    tmp.replace(path)
+    return path
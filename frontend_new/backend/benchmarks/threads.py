@@ -0,0 +1,151 @@
+# backend/benchmarks/threads.py
+"""
+Find the best split of this host's CPU budget between worker processes and
+threads per worker.
+
+    cd backend
+    python -m benchmarks.threads                          # every split of CPU_BUDGET
+    python -m benchmarks.threads --budget 8 --pin --clips 16 --output threads.json
+
+For each split (workers x threads) a fresh spawned pool is held to the budget
+the way app.workers does it (BLAS environment, cv2.setNumThreads, optional
+pinning) and decodes and infers the same synthetic clips. One "unmanaged" run
+per worker count leaves every library at its default, for comparison. The
+best split by throughput is printed as the WORKER_PROCESSES / WORKER_THREADS
+to deploy with.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.synthetic import PROFILES, make_clip
+
+_estimator = None
+
+
+def _init(slots, threads: Optional[int], workers: int, tier: str, pin: bool) -> None:
+    global _estimator
+    from app import threads as budget
+    from app.processing.pose_estimator import create_estimator
+    if threads is not None:
+        with slots.get_lock():
+            slot = slots.value
+            slots.value += 1
+        budget.PIN_CPUS = pin
+        budget.apply(threads, slot % workers)
+    _estimator = create_estimator(tier)
+    _estimator.warm_up()
+
+
+def _infer_clip(path: str) -> Dict[str, Any]:
+    """Decode, convert and infer every frame, as the landmarks pass does."""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    frames, t0 = 0, time.perf_counter()
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        _estimator.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        frames += 1
+    cap.release()
+    _estimator.reset()
+    return {"frames": frames, "seconds": time.perf_counter() - t0}
+
+
+def run_split(workers: int, threads: Optional[int], clips: List[str], tier: str,
+              pin: bool) -> Dict[str, Any]:
+    """Throughput of one split; threads=None leaves the libraries unmanaged."""
+    from app.threads import BLAS_ENV, child_env
+    saved = {name: os.environ.get(name) for name in BLAS_ENV}
+    for name in BLAS_ENV:
+        os.environ.pop(name, None)
+    if threads is not None:
+        os.environ.update(child_env(threads))
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init,
+                                 initargs=(context.Value("i", 0), threads, workers, tier, pin)) as pool:
+            # Start and warm every worker before the clock starts
+            [f.result() for f in [pool.submit(os.getpid) for _ in range(workers)]]
+            t0 = time.perf_counter()
+            results = list(pool.map(_infer_clip, clips))
+            wall = time.perf_counter() - t0
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    frames = sum(r["frames"] for r in results)
+    latencies = sorted(r["seconds"] for r in results)
+    return {
+        "workers": workers,
+        "threads": threads,
+        "managed": threads is not None,
+        "wall_s": round(wall, 3),
+        "fps": round(frames / wall, 2) if wall else None,
+        "clip_latency_p50_s": round(latencies[len(latencies) // 2], 3),
+        "clip_latency_max_s": round(latencies[-1], 3),
+    }
+
+
+def splits(budget: int) -> List[Dict[str, Any]]:
+    """Every workers x threads that fits the budget, plus an unmanaged run per worker count."""
+    out = []
+    for workers in range(1, budget + 1):
+        out.append({"workers": workers, "threads": None})
+        for threads in range(1, budget // workers + 1):
+            out.append({"workers": workers, "threads": threads})
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from app.processing.pose_estimator import tier_for_stage
+    from app.threads import CPU_BUDGET
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--budget", type=int, default=CPU_BUDGET, help="cores to split (CPU_BUDGET)")
+    parser.add_argument("--clips", type=int, help="clips per split (default: 2 x budget)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick",
+                        help="synthetic clip set; its first clip is used")
+    parser.add_argument("--tier", help="pose tier (default: the batch stage's)")
+    parser.add_argument("--pin", action="store_true", help="pin workers to cores, as CPU_AFFINITY=1")
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    tier = args.tier or tier_for_stage("batch")
+    clip = str(make_clip(PROFILES[args.profile][0]))
+    clips = [clip] * (args.clips or 2 * args.budget)
+    results = []
+    for split in splits(args.budget):
+        label = f"{split['workers']}x{split['threads'] or 'default'}"
+        print(f"[Bench] threads {label}", file=sys.stderr)
+        try:
+            results.append(run_split(split["workers"], split["threads"], clips, tier, args.pin))
+        except Exception as e:
+            results.append({**split, "error": str(e)})
+
+    ok = [r for r in results if r.get("managed") and r.get("fps")]
+    best = max(ok, key=lambda r: r["fps"]) if ok else None
+    report = {"budget": args.budget, "cpu_count": os.cpu_count(), "tier": tier, "pinned": args.pin,
+              "clip": clip, "clips": len(clips), "results": results, "best": best}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+    if best:
+        print(f"[Bench] Best: WORKER_PROCESSES={best['workers']} WORKER_THREADS={best['threads']} "
+              f"({best['fps']} fps)", file=sys.stderr)
+    return 0 if best else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())